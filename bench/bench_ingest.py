@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Пропускная способность и лаги telemetry_ingest: 1k бортов × 4 Hz pose + 1 Hz fleet/active.
+
+Поток-продюсер имитирует paho-поток (включая json.loads payload, как в MqttBus)
+и зовёт TelemetryIngest.on_message; event loop работает как в проде.
+
+    python bench/bench_ingest.py --vehicles 1000 --hz 4 --seconds 10
+    python bench/bench_ingest.py --max           # без ограничения темпа
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from drone_core.infra.messaging.bus import Message
+from drone_core.infra.repositories.fleet_mem import FleetMem
+from drone_core.utils.metrics import REGISTRY
+from drone_core.workers.telemetry_ingest import TelemetryIngest
+
+
+class _LocalBus:
+    """Бус без брокера: сообщения подаёт продюсер бенчмарка."""
+    def start(self): pass
+    def stop(self): pass
+    def publish(self, topic, payload, qos=1, retain=False): pass
+    def subscribe(self, topic, handler, qos=1): pass
+    def unsubscribe(self, topic, handler=None): pass
+
+
+def producer(ingest: TelemetryIngest, vehicles: int, hz: float, seconds: float, unlimited: bool,
+             stop: threading.Event) -> None:
+    ids = [f"veh_{i}" for i in range(vehicles)]
+    pose_raw = [json.dumps({"lat": 43.07, "lon": -89.38, "alt": 60.0, "ts": 0.0}).encode() for _ in ids]
+    period = 1.0 / hz
+    t_start = time.monotonic()
+    tick = 0
+    while not stop.is_set() and time.monotonic() - t_start < seconds:
+        now = time.time()
+        for vid, raw in zip(ids, pose_raw):
+            pose = json.loads(raw)
+            pose["ts"] = now
+            ingest.on_message(Message(f"telem/{vid}/pose", pose, 0, False, time.time()))
+        if tick % max(1, int(hz)) == 0:
+            for vid in ids:
+                body = json.dumps({"id": vid, "name": vid, "status": "FLYING",
+                                   "lat": 43.07, "lon": -89.38, "alt": 60.0, "soc": 90.0, "ts": now})
+                ingest.on_message(Message("fleet/active", json.loads(body), 0, False, time.time()))
+        tick += 1
+        if not unlimited:
+            next_t = t_start + tick * period
+            time.sleep(max(0.0, next_t - time.monotonic()))
+
+
+async def main_async(args) -> None:
+    logging.getLogger("telemetry-ingest").setLevel(logging.WARNING)
+    ingest = TelemetryIngest(bus=_LocalBus(), fleet_repo=FleetMem(), tick_s=args.tick,
+                             shm_name=f"bench_fleet_{os.getpid()}")
+    stop = threading.Event()
+    th = threading.Thread(target=producer, daemon=True,
+                          args=(ingest, args.vehicles, args.hz, args.seconds, args.max, stop))
+    consumer = asyncio.create_task(ingest.consume())
+    t0 = time.perf_counter()
+    th.start()
+    while th.is_alive():
+        await asyncio.sleep(0.2)
+    # дожидаемся, пока очередь разгребётся
+    while ingest._queue:
+        await asyncio.sleep(ingest.tick_s)
+    dt = time.perf_counter() - t0
+    consumer.cancel()
+    ingest.shm.close()
+
+    target = args.vehicles * (args.hz + 1)
+    print(f"vehicles={args.vehicles} hz={args.hz} target={'max' if args.max else f'{target:,.0f} msg/s'}")
+    print(f"received={ingest.received:,} processed={ingest.processed:,} dropped={ingest.dropped:,}")
+    print(f"sustained: {ingest.processed / dt:,.0f} msg/s over {dt:.1f}s; repo batches={ingest.repo_writes}")
+    for name, h in sorted(REGISTRY.snapshot("hop.")["histograms"].items()):
+        print(f"  {name:28} n={h['count']:>8,} p50={h['p50_ms']}ms p99={h['p99_ms']}ms max={h['max_ms']}ms")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--vehicles", type=int, default=1000)
+    ap.add_argument("--hz", type=float, default=4.0)
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--tick", type=float, default=0.1)
+    ap.add_argument("--max", action="store_true", help="без ограничения темпа продюсера")
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
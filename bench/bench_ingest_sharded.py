@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Масштабирование шардированного telemetry_ingest: 1…8 воркеров-процессов.
+
+Брокер не нужен: в каждом воркере поток-продюсер играет роль paho-потока.
+  hash  — воркер видит весь поток telem/<id>/pose, чужие борта отсекаются
+          TelemetryIngest.owns_topic до json.loads (как в MqttBus);
+  share — брокер раздаёт сообщения по очереди, воркер получает 1/N потока.
+Итог — суммарно обработанные msg/s и число бортов в агрегированном shm-виде.
+
+    python bench/bench_ingest_sharded.py --workers 1,2,4,8 --seconds 5
+    python bench/bench_ingest_sharded.py --mode share
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from drone_core.infra.messaging.bus import Message
+from drone_core.infra.repositories.fleet_mem import FleetMem
+from drone_core.infra.telemetry.shm_snapshot import FleetShmView
+from drone_core.workers.telemetry_ingest import TelemetryIngest
+
+
+class _LocalBus:
+    def start(self): pass
+    def stop(self): pass
+    def publish(self, topic, payload, qos=1, retain=False): pass
+    def subscribe(self, topic, handler, qos=1): pass
+    def unsubscribe(self, topic, handler=None): pass
+
+
+def producer(ingest: TelemetryIngest, vehicles: int, shards: int, mode: str, stop: threading.Event) -> None:
+    ids = [f"veh_{i}" for i in range(vehicles)]
+    if mode == "share":
+        ids = ids[ingest.shard::shards]
+    raw = {vid: json.dumps({"lat": 43.07, "lon": -89.38, "alt": 60.0, "ts": 0.0}).encode() for vid in ids}
+    topics = {vid: f"telem/{vid}/pose" for vid in ids}
+    k = 0
+    while not stop.is_set():
+        k += 1
+        for vid in ids:
+            topic = topics[vid]
+            if not ingest.owns_topic(topic):
+                continue
+            payload = json.loads(raw[vid])
+            payload["ts"] = float(k)
+            ingest.on_message(Message(topic, payload, 0, False, time.time()))
+        # не даём очереди разрастись до вытеснения: меряем обработку, а не drop
+        while len(ingest._queue) > 20_000 and not stop.is_set():
+            time.sleep(0.001)
+
+
+def worker(shard: int, shards: int, mode: str, vehicles: int, seconds: float, shm_name: str,
+           start_evt, release_evt, results) -> None:
+    logging.getLogger("telemetry-ingest").setLevel(logging.WARNING)
+
+    async def run() -> int:
+        ingest = TelemetryIngest(bus=_LocalBus(), fleet_repo=FleetMem(), shm_name=shm_name,
+                                 shard=shard, shards=shards, shard_mode=mode)
+        stop = threading.Event()
+        th = threading.Thread(target=producer, args=(ingest, vehicles, shards, mode, stop), daemon=True)
+        start_evt.wait()
+        th.start()
+        t_end = time.monotonic() + seconds
+        while time.monotonic() < t_end:
+            await ingest.step()
+            await asyncio.sleep(0)
+        stop.set()
+        th.join()
+        results.put(ingest.processed)
+        # сегмент живёт, пока родитель не прочитает агрегированный вид
+        release_evt.wait()
+        ingest.shm.close()
+        return ingest.processed
+
+    asyncio.run(run())
+
+
+def run_case(shards: int, args) -> None:
+    ctx = mp.get_context("spawn")
+    start_evt = ctx.Event()
+    release_evt = ctx.Event()
+    results = ctx.Queue()
+    shm_name = f"bench_ingest_{os.getpid()}_{shards}"
+    procs = [
+        ctx.Process(target=worker, args=(i, shards, args.mode, args.vehicles, args.seconds, shm_name,
+                                         start_evt, release_evt, results), daemon=True)
+        for i in range(shards)
+    ]
+    for p in procs:
+        p.start()
+    time.sleep(1.0 + 0.3 * shards)  # импорт numpy/pydantic в spawn-процессах
+    start_evt.set()
+    counts = [results.get() for _ in procs]
+    view = FleetShmView(shm_name, max_shards=shards)
+    snap = view.snapshot()
+    seen = len(snap) if snap is not None else 0
+    view.close()
+    release_evt.set()
+    for p in procs:
+        p.join()
+    total = sum(counts)
+    print(f"{shards:7d} {total / args.seconds:14,.0f} {seen:9d}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", default="1,2,4,8")
+    ap.add_argument("--mode", choices=("hash", "share"), default="hash")
+    ap.add_argument("--vehicles", type=int, default=1000)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    args = ap.parse_args()
+    print(f"mode={args.mode} vehicles={args.vehicles} cpus={os.cpu_count()}")
+    print(f"{'workers':>7} {'msg/s':>14} {'vehicles':>9}")
+    for n in (int(x) for x in args.workers.split(",")):
+        run_case(n, args)
+
+
+if __name__ == "__main__":
+    main()
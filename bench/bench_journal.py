@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Бенчмарк журнала mem-репозиториев: мутации/сек и время восстановления.
+
+    python bench/bench_journal.py --missions 1000000
+"""
+import argparse
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from drone_core.domain.models import LLA, Mission, MissionStatus, Waypoint
+from drone_core.infra.repositories.journal import Journal
+from drone_core.infra.repositories.missions_mem import MissionsMem
+
+
+def make_mission(i: int, n_wp: int) -> Mission:
+    wps = [Waypoint(pos=LLA(lat=43.07 + j * 1e-3, lon=-89.38, alt=60.0)) for j in range(n_wp)]
+    return Mission(id=f"mis_{i:08d}", waypoints=wps, status=MissionStatus.PLANNED)
+
+
+async def run_writes(repo: MissionsMem, n: int, n_wp: int, chunk: int = 10_000) -> float:
+    """Время только на вызовы репозитория: create + assign + 2×set_status на миссию."""
+    spent = 0.0
+    for start in range(0, n, chunk):
+        batch = [make_mission(i, n_wp) for i in range(start, min(start + chunk, n))]
+        t0 = time.perf_counter()
+        for m in batch:
+            await repo.create(m)
+            await repo.assign_vehicle(m.id, "veh_0")
+            await repo.set_status(m.id, MissionStatus.IN_PROGRESS)
+            await repo.set_status(m.id, MissionStatus.COMPLETED)
+        spent += time.perf_counter() - t0
+    return spent
+
+
+async def main_async(args) -> None:
+    n = args.missions
+    muts = n * 4
+
+    volatile = MissionsMem()
+    t_mem = await run_writes(volatile, n, args.waypoints)
+    print(f"mem (volatile):   {muts / t_mem:12,.0f} mutations/s")
+    del volatile
+
+    root = Path(args.dir or tempfile.mkdtemp(prefix="journal-bench-"))
+    try:
+        j = Journal(root, fsync_interval=args.fsync_ms / 1000, snapshot_every=args.snapshot_every)
+        repo = MissionsMem(j)
+        t_j = await run_writes(repo, n, args.waypoints)
+        j.close()
+        print(f"mem + journal:    {muts / t_j:12,.0f} mutations/s "
+              f"(fsync every {args.fsync_ms} ms, snapshot every {args.snapshot_every:,})")
+        del repo
+
+        size = sum(p.stat().st_size for p in root.iterdir())
+        t0 = time.perf_counter()
+        j = Journal(root)
+        repo = MissionsMem(j)
+        t_rec = time.perf_counter() - t0
+        assert len(repo._store) == n, len(repo._store)
+        j.close()
+        print(f"recovery:         {t_rec:8.2f} s for {n:,} missions ({size / 2**20:,.0f} MiB on disk)")
+    finally:
+        if not args.dir:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--missions", type=int, default=1_000_000)
+    ap.add_argument("--waypoints", type=int, default=0, help="waypoints per mission")
+    ap.add_argument("--fsync-ms", type=float, default=50.0)
+    ap.add_argument("--snapshot-every", type=int, default=1_000_000)
+    ap.add_argument("--dir", default=None)
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
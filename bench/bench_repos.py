@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Сравнение бэкендов репозиториев: mem / sqlite / pg — записи в секунду.
+
+    python bench/bench_repos.py --writes 20000 --concurrency 64
+    python bench/bench_repos.py --backends mem,sqlite,pg     # pg: нужен DB_URL и sqlmodel/asyncpg
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from drone_core.domain.models import LLA, Mission, MissionStatus, Vehicle, VehicleStatus
+
+
+async def make_backend(name: str, tmpdir: str):
+    if name == "mem":
+        from drone_core.infra.repositories.fleet_mem import FleetMem
+        from drone_core.infra.repositories.missions_mem import MissionsMem
+        return FleetMem(), MissionsMem(), None
+    if name == "sqlite":
+        from drone_core.infra.db.sqlite import SqliteDb
+        from drone_core.infra.repositories.fleet_sqlite import FleetSqlite, SCHEMA as FS
+        from drone_core.infra.repositories.missions_sqlite import MissionsSqlite, SCHEMA as MS
+        db = SqliteDb(os.path.join(tmpdir, "bench.sqlite3"))
+        await db.executescript(FS + MS)
+        return FleetSqlite(db), MissionsSqlite(db), db.close
+    if name == "pg":
+        from drone_core.infra.repositories import init_repos
+        from drone_core.infra.repositories.fleet_pg import FleetPg
+        from drone_core.infra.repositories.missions_pg import MissionsPg
+        from drone_core.infra.db.postgres import dispose_engine
+        os.environ["REPO_IMPL"] = "pg"
+        await init_repos()
+        return FleetPg(), MissionsPg(), dispose_engine
+    raise ValueError(name)
+
+
+async def run(fleet, missions, writes: int, concurrency: int, vehicles: int) -> float:
+    """Половина записей — апдейты телеметрии борта, половина — create/set_status миссий."""
+    per_worker = writes // concurrency
+
+    async def worker(w: int) -> None:
+        for i in range(per_worker):
+            if i % 2 == 0:
+                vid = f"veh_{(w * per_worker + i) % vehicles}"
+                await fleet.update(Vehicle(
+                    id=vid, name=vid, status=VehicleStatus.FLYING,
+                    pos=LLA(lat=43.07 + i * 1e-6, lon=-89.38, alt=60.0), soc=80.0, last_ts=time.time(),
+                ))
+            elif i % 4 == 1:
+                await missions.create(Mission(id=f"mis_{w}_{i}", status=MissionStatus.PLANNED))
+            else:
+                await missions.set_status(f"mis_{w}_{i - 2}", MissionStatus.IN_PROGRESS)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    return per_worker * concurrency / (time.perf_counter() - t0)
+
+
+async def main_async(args) -> None:
+    print(f"{'backend':8} {'conc':>5} {'writes/s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.backends.split(","):
+            for conc in (1, args.concurrency):
+                try:
+                    fleet, missions, close = await make_backend(name, tmp)
+                except Exception as e:
+                    print(f"{name:8} skipped: {e!r}")
+                    break
+                try:
+                    rate = await run(fleet, missions, args.writes, conc, args.vehicles)
+                    print(f"{name:8} {conc:5d} {rate:12,.0f}")
+                finally:
+                    if close is not None:
+                        res = close()
+                        if asyncio.iscoroutine(res):
+                            await res
+                if name == "sqlite":
+                    os.remove(os.path.join(tmp, "bench.sqlite3"))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", default="mem,sqlite")
+    ap.add_argument("--writes", type=int, default=20_000)
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--vehicles", type=int, default=1000)
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
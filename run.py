@@ -89,9 +89,11 @@ async def main():
     )
     time.sleep(0.4)
 
+    # UI_WORKERS > 1 — несколько воркеров uvicorn с общим состоянием (web_ui/shared_state.py)
     web_ui = run_component(
         "Web UI",
-        ["uvicorn", "web_ui.main:app", "--port", "8000", "--log-level", "info"],
+        ["uvicorn", "web_ui.main:app", "--port", "8000", "--log-level", "info",
+         "--workers", str(max(1, settings.UI_WORKERS))],
         cwd="src",
     )
 
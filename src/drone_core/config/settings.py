@@ -10,6 +10,56 @@ class Settings(BaseSettings):
     SLA_WAIT_PICKUP_SEC: int = 60
     SLA_WAIT_DROPOFF_SEC: int = 60
     REPO_IMPL: str = "mem"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE_SEC: int = 1800
+    DB_POOL_TIMEOUT_SEC: float = 10.0
+    DB_STATEMENT_CACHE_SIZE: int = 256
+    DB_COMMAND_TIMEOUT_SEC: float = 10.0
+    DB_CONNECT_TIMEOUT_SEC: float = 5.0
+    SQLITE_PATH: str = "data/drones.sqlite3"
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL"] = "NORMAL"
+    SQLITE_BATCH_MAX: int = 256
+    REPO_JOURNAL_DIR: str = ""
+    REPO_JOURNAL_FSYNC_SEC: float = 0.05
+    REPO_JOURNAL_SNAPSHOT_EVERY: int = 200_000
+    TELEM_RING_BYTES_PER_VEHICLE: int = 4 * 1024 * 1024
+    TELEM_SHM_NAME: str = "drone_fleet"
+    TELEM_SHM_CAPACITY: int = 4096
+    TELEM_ARCHIVE_DIR: str = ""
+    # ожидание ответа ingest на telem_query/request
+    TELEM_QUERY_TIMEOUT_SEC: float = 1.0
+    TELEM_ARCHIVE_FLUSH_SEC: float = 30.0
+    TELEM_ARCHIVE_FILE_MB: int = 64
+    BATTERY_CAPACITY_AH: float = 5.0
+    # банок в батарее (0 — определять по напряжению; поле cells в telem/<id>/battery важнее)
+    BATTERY_CELLS: int = 0
+    BATTERY_PUBLISH_SEC: float = 1.0
+    INGEST_SHARDS: int = 1
+    # состояние по борту (SoC, аномалии, история) корректно только в hash — см. TelemetryIngest
+    INGEST_SHARD_MODE: Literal["hash", "share"] = "hash"
+    METRICS_PUBLISH_SEC: float = 10.0
+    WS_QUEUE_MAX: int = 4096
+    WS_SEND_TIMEOUT_SEC: float = 5.0
+    WS_SLOW_CLIENT_SEC: float = 10.0
+    UI_FRAME_HZ: float = 5.0
+    UI_WORKERS: int = 1
+    UI_STATE_SHM: str = "drone_ui"
+    UI_RING_MB: int = 16
+    UI_SNAPSHOT_MB: int = 8
+    UI_SNAPSHOT_SEC: float = 1.0
+    UI_TRACK_BYTES_PER_VEHICLE: int = 512 * 1024
+    SSE_LOG_MAX: int = 10_000
+    SSE_HEARTBEAT_SEC: float = 15.0
+    SSE_POSE_SEC: float = 1.0
+    # POST /api/orders/batch: заказов в пакете, кусок валидации/публикации, окно QoS1 без PUBACK
+    ORDERS_BATCH_MAX: int = 10_000
+    ORDERS_BATCH_CHUNK: int = 1000
+    UI_MQTT_MAX_INFLIGHT: int = 1000
+    REPO_CACHE: bool = False
+    REPO_CACHE_SIZE: int = 1024
+    REPO_CACHE_TTL_SEC: float = 2.0
     SYSTEM_MODE: Literal["test", "preflight", "full"] = "test"
 
     class Config:
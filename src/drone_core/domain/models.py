@@ -70,6 +70,8 @@ class Mission(BaseModel):
     vehicle_id: Optional[str] = None
     status: MissionStatus = MissionStatus.CREATED
     waypoints: List[Waypoint] = Field(default_factory=list)
+    # оценка длительности полёта по плану, с (plan_order)
+    eta_s: Optional[float] = None
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
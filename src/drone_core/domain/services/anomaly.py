@@ -0,0 +1,289 @@
+"""
+anomaly.py — потоковый детектор аномалий телеметрии, O(1) памяти на борт.
+
+По каждому pose-сэмплу борта с активной миссией:
+- ALT_DRIFT   — двусторонний CUSUM по отклонению высоты от EWMA-тренда
+                (медленный увод / провал высоты без команды);
+- UNEXPECTED_LANDING — высота < landing_alt_m посреди миссии (не на последних
+                waypoints) — тот самый false-positive landing-detector PX4;
+- GPS_GLITCH  — скачок позиции с физически невозможной скоростью;
+- STUCK       — в воздухе, но почти стоит дольше stuck_s;
+- ETA_OVERRUN — с начала миссии прошло больше eta_factor × ETA плана;
+- TELEMETRY_LOST — нет pose дольше lost_s (проверяется sweep()).
+
+Алерт отдаётся тем же вызовом update()/sweep(), что увидел сэмпл, —
+задержка ограничена тиком вызывающего. На (борт, вид) действует cooldown.
+"""
+from __future__ import annotations
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+_R = 6_371_000.0
+
+
+def _dist_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return math.hypot(x, y) * _R
+
+
+class Ewma:
+    """EWMA среднего и дисперсии с постоянной времени tau_s (неравномерный шаг)."""
+
+    __slots__ = ("tau_s", "mean", "var")
+
+    def __init__(self, tau_s: float) -> None:
+        self.tau_s = tau_s
+        self.mean: Optional[float] = None
+        self.var = 0.0
+
+    def update(self, x: float, dt: float) -> float:
+        if self.mean is None:
+            self.mean = x
+            return x
+        a = 1.0 - math.exp(-dt / self.tau_s) if dt > 0 else 0.0
+        d = x - self.mean
+        self.mean += a * d
+        self.var = (1.0 - a) * (self.var + a * d * d)
+        return self.mean
+
+
+class Cusum:
+    """Двусторонний CUSUM: срабатывает, когда накопленный сдвиг > h (k — допуск)."""
+
+    __slots__ = ("k", "h", "pos", "neg")
+
+    def __init__(self, k: float, h: float) -> None:
+        self.k = k
+        self.h = h
+        self.pos = 0.0
+        self.neg = 0.0
+
+    def update(self, x: float) -> int:
+        self.pos = max(0.0, self.pos + x - self.k)
+        self.neg = max(0.0, self.neg - x - self.k)
+        if self.pos > self.h:
+            self.reset()
+            return 1
+        if self.neg > self.h:
+            self.reset()
+            return -1
+        return 0
+
+    def reset(self) -> None:
+        self.pos = self.neg = 0.0
+
+
+@dataclass
+class Alert:
+    kind: str
+    vehicle_id: str
+    mission_id: Optional[str]
+    ts: float
+    details: Dict[str, Any] = field(default_factory=dict)
+
+    def event_payload(self) -> Dict[str, Any]:
+        """Формат mission/{id}/events (как _publish_mission_event в bridge)."""
+        return {
+            "mission_id": self.mission_id,
+            "vehicle_id": self.vehicle_id,
+            "event": f"ANOMALY_{self.kind}",
+            "ts": self.ts,
+            "details": self.details,
+        }
+
+
+@dataclass
+class DetectorConfig:
+    alt_tau_s: float = 20.0
+    alt_cusum_k_m: float = 1.0
+    alt_cusum_h_m: float = 15.0
+    landing_alt_m: float = 2.0
+    max_speed_mps: float = 60.0
+    stuck_speed_mps: float = 0.5
+    stuck_s: float = 30.0
+    eta_factor: float = 1.5
+    lost_s: float = 10.0
+    cooldown_s: float = 30.0
+
+
+class VehicleMonitor:
+    """Состояние одного борта: фиксированный набор скаляров."""
+
+    __slots__ = ("vehicle_id", "cfg", "mission_id", "mission_started", "eta_s", "wp_current", "wp_total",
+                 "last_ts", "last_lat", "last_lon", "alt", "alt_cusum", "speed", "slow_since",
+                 "in_air", "_fired")
+
+    def __init__(self, vehicle_id: str, cfg: DetectorConfig) -> None:
+        self.vehicle_id = vehicle_id
+        self.cfg = cfg
+        self.mission_id: Optional[str] = None
+        self.mission_started: Optional[float] = None
+        self.eta_s: Optional[float] = None
+        self.wp_current = 0
+        self.wp_total = 0
+        self.last_ts: Optional[float] = None
+        self.last_lat = self.last_lon = 0.0
+        self.alt = Ewma(cfg.alt_tau_s)
+        self.alt_cusum = Cusum(cfg.alt_cusum_k_m, cfg.alt_cusum_h_m)
+        self.speed = Ewma(3.0)
+        self.slow_since: Optional[float] = None
+        self.in_air = False
+        self._fired: Dict[str, float] = {}
+
+    def _alert(self, out: List[Alert], kind: str, ts: float, **details: Any) -> None:
+        last = self._fired.get(kind)
+        if last is not None and ts - last < self.cfg.cooldown_s:
+            return
+        self._fired[kind] = ts
+        out.append(Alert(kind, self.vehicle_id, self.mission_id, ts,
+                         {k: (round(v, 3) if isinstance(v, float) else v) for k, v in details.items()}))
+
+    @property
+    def flying_mission(self) -> bool:
+        return self.mission_id is not None and self.mission_started is not None
+
+    def start_mission(self, mission_id: str, ts: float, eta_s: Optional[float]) -> None:
+        self.mission_id = mission_id
+        self.mission_started = ts
+        if eta_s is not None:
+            self.eta_s = eta_s
+        self.wp_current = self.wp_total = 0
+        self.alt_cusum.reset()
+        self.slow_since = None
+        self._fired.clear()
+
+    def end_mission(self) -> None:
+        self.mission_id = None
+        self.mission_started = None
+        self.eta_s = None
+        self.slow_since = None
+
+    def update_pose(self, ts: float, lat: float, lon: float, alt: float) -> List[Alert]:
+        out: List[Alert] = []
+        cfg = self.cfg
+        prev_ts = self.last_ts
+        if prev_ts is not None and ts <= prev_ts:
+            return out
+        dt = ts - prev_ts if prev_ts is not None else 0.0
+        speed = None
+        if prev_ts is not None and dt > 0:
+            d = _dist_m(self.last_lat, self.last_lon, lat, lon)
+            speed = d / dt
+        self.last_ts, self.last_lat, self.last_lon = ts, lat, lon
+
+        trend = self.alt.mean
+        self.alt.update(alt, dt)
+        self.in_air = alt > cfg.landing_alt_m
+        if not self.flying_mission:
+            return out
+
+        if speed is not None:
+            if speed > cfg.max_speed_mps:
+                # не даём выбросу испортить EWMA скорости
+                self._alert(out, "GPS_GLITCH", ts, speed_mps=speed, dt_s=dt)
+            else:
+                v = self.speed.update(speed, dt)
+                if self.in_air and v < cfg.stuck_speed_mps:
+                    if self.slow_since is None:
+                        self.slow_since = ts
+                    elif ts - self.slow_since >= cfg.stuck_s:
+                        self._alert(out, "STUCK", ts, speed_mps=v, for_s=ts - self.slow_since)
+                else:
+                    self.slow_since = None
+
+        if trend is not None and self.in_air:
+            side = self.alt_cusum.update(alt - trend)
+            if side:
+                self._alert(out, "ALT_DRIFT", ts, direction="up" if side > 0 else "down",
+                            alt_m=alt, trend_m=trend)
+
+        # посадка посреди маршрута: последние два WP — заход на базу и LAND
+        mid_route = self.wp_total > 0 and 0 < self.wp_current < self.wp_total - 2
+        if mid_route and alt < cfg.landing_alt_m and trend is not None and trend > cfg.landing_alt_m:
+            self._alert(out, "UNEXPECTED_LANDING", ts, alt_m=alt,
+                        wp=f"{self.wp_current}/{self.wp_total}")
+
+        self._check_eta(out, ts)
+        return out
+
+    def _check_eta(self, out: List[Alert], now: float) -> None:
+        if self.eta_s and self.mission_started is not None:
+            elapsed = now - self.mission_started
+            if elapsed > self.cfg.eta_factor * self.eta_s:
+                self._alert(out, "ETA_OVERRUN", now, elapsed_s=elapsed, eta_s=self.eta_s,
+                            wp=f"{self.wp_current}/{self.wp_total}")
+
+    def sweep(self, now: float) -> List[Alert]:
+        out: List[Alert] = []
+        if not self.flying_mission:
+            return out
+        if self.last_ts is not None and now - self.last_ts > self.cfg.lost_s:
+            self._alert(out, "TELEMETRY_LOST", now, silent_s=now - self.last_ts)
+        self._check_eta(out, now)
+        return out
+
+
+class AnomalyDetector:
+    """Мониторы по бортам + привязка миссий (planned → ETA, assigned → борт)."""
+
+    def __init__(self, cfg: Optional[DetectorConfig] = None) -> None:
+        self.cfg = cfg or DetectorConfig()
+        self._vehicles: Dict[str, VehicleMonitor] = {}
+        self._mission_eta: Dict[str, float] = {}
+        self._mission_vehicle: Dict[str, str] = {}
+        self.samples = 0
+
+    def monitor(self, vehicle_id: str) -> VehicleMonitor:
+        m = self._vehicles.get(vehicle_id)
+        if m is None:
+            m = self._vehicles[vehicle_id] = VehicleMonitor(vehicle_id, self.cfg)
+        return m
+
+    # --- жизненный цикл миссии ---
+    def on_planned(self, mission_id: str, eta_s: Optional[float]) -> None:
+        if eta_s:
+            self._mission_eta[mission_id] = float(eta_s)
+            # ETA копятся только до назначения — держим словарь ограниченным
+            while len(self._mission_eta) > 10_000:
+                self._mission_eta.pop(next(iter(self._mission_eta)))
+
+    def on_assigned(self, mission_id: str, vehicle_id: str) -> None:
+        self._mission_vehicle[mission_id] = vehicle_id
+
+    def vehicle_of(self, mission_id: str) -> Optional[str]:
+        """Борт, назначенный на миссию (по on_assigned)."""
+        return self._mission_vehicle.get(mission_id)
+
+    def on_status(self, mission_id: str, status: str, ts: float, vehicle_id: Optional[str] = None) -> None:
+        vid = vehicle_id or self._mission_vehicle.get(mission_id)
+        if vid is None:
+            if status in ("COMPLETED", "ABORTED", "START_FAILED", "UPLOAD_FAILED"):
+                self._mission_eta.pop(mission_id, None)
+            return
+        m = self.monitor(vid)
+        if status in ("STARTED", "IN_PROGRESS"):
+            if m.mission_id != mission_id:
+                m.start_mission(mission_id, ts, self._mission_eta.pop(mission_id, None))
+        elif status in ("COMPLETED", "ABORTED", "START_FAILED", "UPLOAD_FAILED"):
+            if m.mission_id == mission_id:
+                m.end_mission()
+            self._mission_vehicle.pop(mission_id, None)
+            self._mission_eta.pop(mission_id, None)
+
+    def on_progress(self, vehicle_id: str, current: int, total: int) -> None:
+        m = self.monitor(vehicle_id)
+        m.wp_current, m.wp_total = current, total
+
+    # --- сэмплы ---
+    def on_pose(self, vehicle_id: str, ts: float, lat: float, lon: float, alt: float) -> List[Alert]:
+        self.samples += 1
+        return self.monitor(vehicle_id).update_pose(ts, lat, lon, alt)
+
+    def sweep(self, now: float) -> List[Alert]:
+        out: List[Alert] = []
+        for m in self._vehicles.values():
+            if m.mission_id is not None:
+                out.extend(m.sweep(now))
+        return out
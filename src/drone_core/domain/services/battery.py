@@ -0,0 +1,181 @@
+"""
+battery.py — онлайн-оценка SoC и остатка полётного времени по telem/<id>/battery.
+
+На каждый сэмпл (voltage_v, current_a, remaining_pct) — O(1):
+- прогноз: кулоновский счёт, soc -= I·dt / C;
+- коррекция: одномерный фильтр Калмана по двум измерениям —
+  SoC по напряжению (OCV-кривая LiPo с поправкой на просадку I·R; под
+  нагрузкой ему доверяем меньше) и remaining_pct автопилота, если он есть;
+- EWMA тока (tau ~30 с) -> оставшееся время полёта.
+"""
+from __future__ import annotations
+import math
+from typing import Any, Dict, Mapping, Optional
+
+# OCV одной банки LiPo: (напряжение, SoC %)
+_OCV = (
+    (3.27, 0.0), (3.61, 5.0), (3.69, 10.0), (3.71, 15.0), (3.73, 20.0),
+    (3.75, 25.0), (3.77, 30.0), (3.79, 35.0), (3.80, 40.0), (3.82, 45.0),
+    (3.84, 50.0), (3.85, 55.0), (3.87, 60.0), (3.91, 65.0), (3.95, 70.0),
+    (3.98, 75.0), (4.02, 80.0), (4.08, 85.0), (4.11, 90.0), (4.15, 95.0),
+    (4.20, 100.0),
+)
+
+
+_CELL_MAX_V = _OCV[-1][0]
+# допуск на заряд выше номинала и шум датчика напряжения
+_CELL_SLACK_V = 0.05
+
+
+def cells_for_voltage(v: float) -> int:
+    """
+    Минимальное число банок, при котором v не выше полного заряда банки.
+    Точно для заряженной батареи (25.2 В -> 6S); разряженную 6S по одному
+    сэмплу не отличить от 5S — такую оценку поправит следующий сэмпл выше
+    (см. SocEstimator.update) либо явное число банок.
+    """
+    return max(1, math.ceil(v / (_CELL_MAX_V + _CELL_SLACK_V)))
+
+
+def soc_from_cell_voltage(v: float) -> float:
+    if v <= _OCV[0][0]:
+        return 0.0
+    for (v0, s0), (v1, s1) in zip(_OCV, _OCV[1:]):
+        if v <= v1:
+            return s0 + (s1 - s0) * (v - v0) / (v1 - v0)
+    return 100.0
+
+
+class SocEstimator:
+    """Оценка состояния одной батареи."""
+
+    def __init__(
+        self,
+        capacity_ah: float = 5.0,
+        cells: Optional[int] = None,
+        r_internal_ohm: float = 0.02,
+        current_tau_s: float = 30.0,
+        process_var: float = 0.01,
+        voltage_var: float = 25.0,
+        reported_var: float = 4.0,
+    ) -> None:
+        self.capacity_ah = capacity_ah
+        # None — по напряжению (cells_for_voltage), иначе задано конфигурацией борта
+        self.cells = cells
+        self.cells_fixed = cells is not None
+        self.r_internal_ohm = r_internal_ohm
+        self.current_tau_s = current_tau_s
+        self.process_var = process_var
+        self.voltage_var = voltage_var
+        self.reported_var = reported_var
+        self.soc: Optional[float] = None
+        self.var = 100.0
+        self.current_avg_a: Optional[float] = None
+        self.voltage_v: Optional[float] = None
+        self.ts: Optional[float] = None
+        self.samples = 0
+
+    def _correct(self, z: float, r: float) -> None:
+        k = self.var / (self.var + r)
+        self.soc += k * (z - self.soc)
+        self.var *= 1.0 - k
+
+    def update(self, ts: float, voltage_v: Optional[float] = None, current_a: Optional[float] = None,
+               remaining_pct: Optional[float] = None) -> None:
+        self.samples += 1
+        current = current_a if current_a is not None and current_a >= 0 else None
+        soc_v = None
+        if voltage_v is not None and voltage_v > 0:
+            self.voltage_v = voltage_v
+            if not self.cells_fixed and (self.cells is None or voltage_v > self.cells * (_CELL_MAX_V + _CELL_SLACK_V)):
+                self.cells = cells_for_voltage(voltage_v)
+            v_ocv = voltage_v / self.cells + (current or 0.0) * self.r_internal_ohm
+            soc_v = soc_from_cell_voltage(v_ocv)
+
+        if self.soc is None:
+            # первая оценка — по автопилоту, иначе по напряжению
+            init = remaining_pct if remaining_pct is not None else soc_v
+            if init is None:
+                return
+            self.soc = float(init)
+            self.var = self.reported_var if remaining_pct is not None else self.voltage_var
+            self.ts = ts
+            self.current_avg_a = current
+            return
+
+        dt = max(0.0, ts - self.ts) if self.ts is not None else 0.0
+        self.ts = ts
+        if current is not None:
+            # прогноз по току
+            self.soc -= current * dt / (self.capacity_ah * 3600.0) * 100.0
+            a = 1.0 - math.exp(-dt / self.current_tau_s) if dt > 0 else 1.0
+            self.current_avg_a = current if self.current_avg_a is None else (
+                self.current_avg_a + a * (current - self.current_avg_a)
+            )
+        self.var += self.process_var * dt
+
+        if soc_v is not None:
+            # под нагрузкой напряжение проседает нелинейно — доверие ниже
+            load = (current or 0.0) / max(self.capacity_ah, 1e-6)  # C-rate
+            self._correct(soc_v, self.voltage_var * (1.0 + 4.0 * load))
+        if remaining_pct is not None:
+            self._correct(float(remaining_pct), self.reported_var)
+        self.soc = min(100.0, max(0.0, self.soc))
+
+    def remaining_s(self) -> Optional[float]:
+        """Оставшееся время при текущем среднем токе (None — ток неизвестен/нулевой)."""
+        if self.soc is None or not self.current_avg_a or self.current_avg_a < 0.1:
+            return None
+        return self.soc / 100.0 * self.capacity_ah * 3600.0 / self.current_avg_a
+
+    def snapshot(self) -> Dict[str, Any]:
+        rem = self.remaining_s()
+        return {
+            "soc": None if self.soc is None else round(self.soc, 2),
+            "soc_std": round(math.sqrt(self.var), 2),
+            "remaining_s": None if rem is None else round(rem, 1),
+            "current_avg_a": None if self.current_avg_a is None else round(self.current_avg_a, 3),
+            "voltage_v": self.voltage_v,
+            "ts": self.ts,
+        }
+
+
+def _num(payload: Mapping[str, Any], key: str) -> Optional[float]:
+    v = payload.get(key)
+    try:
+        return float(v) if v is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class BatteryBook:
+    """
+    Оценщики по бортам. Число банок: поле cells сэмпла (борт знает свою
+    батарею), иначе общее cells, иначе — по напряжению.
+    """
+
+    def __init__(self, capacity_ah: float = 5.0, cells: Optional[int] = None) -> None:
+        self.capacity_ah = capacity_ah
+        self.cells = cells or None
+        self._est: Dict[str, SocEstimator] = {}
+
+    def update(self, veh_id: str, ts: float, payload: Mapping[str, Any]) -> SocEstimator:
+        est = self._est.get(veh_id)
+        cells = _num(payload, "cells")
+        cells = int(cells) if cells is not None and cells >= 1 else None
+        if est is None:
+            est = self._est[veh_id] = SocEstimator(self.capacity_ah, cells=cells or self.cells)
+        elif cells is not None and cells != est.cells:
+            est.cells, est.cells_fixed = cells, True
+        est.update(ts, _num(payload, "voltage_v"), _num(payload, "current_a"), _num(payload, "remaining_pct"))
+        return est
+
+    def get(self, veh_id: str) -> Optional[SocEstimator]:
+        return self._est.get(veh_id)
+
+    def soc(self, veh_id: str) -> Optional[float]:
+        est = self._est.get(veh_id)
+        return est.soc if est is not None else None
+
+    def items(self):
+        return self._est.items()
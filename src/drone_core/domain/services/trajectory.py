@@ -0,0 +1,333 @@
+"""
+trajectory.py — потоковое упрощение траекторий и многоуровневые треки.
+
+StreamingSimplifier — онлайн-упрощение с гарантированным допуском: любая
+выброшенная точка лежит не дальше eps_m от прямой своего отрезка итоговой
+ломаной. O(1) памяти и времени на точку, вершины отдаются сразу.
+
+MultiResTrajectory — каскад уровней (eps 2 / 10 / 50 / 250 м), уровень k
+упрощает выход уровня k-1 (ошибка уровня не больше суммы eps). Запрос
+берёт самый детальный уровень, укладывающийся в бюджет точек, и при
+необходимости дожимает его до бюджета Douglas-Peucker'ом на NumPy.
+"""
+from __future__ import annotations
+import heapq
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (ts, lat, lon, alt)
+Point = Tuple[float, float, float, float]
+
+_R = 6_371_000.0
+DEFAULT_LEVELS_M: Tuple[float, ...] = (2.0, 10.0, 50.0, 250.0)
+# больший бюджет downsample() набирает без Douglas-Peucker'а
+DP_MAX_POINTS = 500
+
+
+def _xy(lat: float, lon: float, lat0: float) -> Tuple[float, float]:
+    """Равнопромежуточная проекция (метры) — на масштабах полёта достаточно."""
+    return (math.radians(lon) * math.cos(math.radians(lat0)) * _R, math.radians(lat) * _R)
+
+
+class StreamingSimplifier:
+    """
+    Онлайн-упрощение потока точек с допуском eps_m метров (алгоритм «конуса»,
+    Zhao-Saalfeld): от якоря держится сектор допустимых направлений; каждая
+    точка дальше eps_m сужает его на ±asin(eps/d). Точка вне сектора закрывает
+    отрезок — предыдущая точка становится вершиной и новым якорем. O(1) на точку.
+    """
+
+    def __init__(self, eps_m: float, max_run: int = 4096) -> None:
+        self.eps_m = eps_m
+        self.max_run = max_run
+        self._lat0: Optional[float] = None
+        self._anchor: Optional[Tuple[Point, float, float]] = None
+        self._last: Optional[Tuple[Point, float, float]] = None
+        self._ref = 0.0
+        self._lo = self._hi = None
+        self._run = 0
+
+    def _reset(self, anchor: Tuple[Point, float, float]) -> None:
+        self._anchor = anchor
+        self._lo = self._hi = None
+        self._run = 0
+
+    def _fits(self, x: float, y: float) -> bool:
+        """Сузить сектор точкой (x, y); False — точка вне сектора."""
+        _, ax, ay = self._anchor
+        d = math.hypot(x - ax, y - ay)
+        if d <= self.eps_m:
+            return True
+        theta = math.atan2(y - ay, x - ax)
+        half = math.asin(self.eps_m / d)
+        if self._lo is None:
+            self._ref = theta
+            self._lo, self._hi = -half, half
+            return True
+        rel = (theta - self._ref + math.pi) % (2 * math.pi) - math.pi
+        if rel < self._lo or rel > self._hi:
+            return False
+        self._lo = max(self._lo, rel - half)
+        self._hi = min(self._hi, rel + half)
+        return True
+
+    def push(self, p: Point) -> List[Point]:
+        """Добавить точку; возвращает точки, ставшие вершинами ломаной."""
+        if self._lat0 is None:
+            self._lat0 = p[1]
+        x, y = _xy(p[1], p[2], self._lat0)
+        item = (p, x, y)
+        if self._anchor is None:
+            self._reset(item)
+            return [p]
+        out: List[Point] = []
+        self._run += 1
+        if self._run > self.max_run or not self._fits(x, y):
+            # последняя принятая точка становится вершиной и новым якорем
+            self._reset(self._last)
+            out.append(self._last[0])
+            self._run = 1
+            self._fits(x, y)
+        self._last = item
+        return out
+
+    def tail(self) -> Optional[Point]:
+        """Последняя принятая точка (в ломаную попадёт позже или станет концом)."""
+        return self._last[0] if self._last is not None else None
+
+
+def simplify_to_budget(points: np.ndarray, max_points: int, lat0: Optional[float] = None) -> np.ndarray:
+    """
+    Douglas-Peucker до бюджета: точки добавляются в порядке убывания отклонения,
+    пока не наберётся max_points. points — массив (N, 4) [ts, lat, lon, alt].
+    """
+    n = len(points)
+    if n <= max_points or max_points < 2:
+        return points if max_points >= 2 else points[-1:]
+    lat0 = float(points[0, 1]) if lat0 is None else lat0
+    x = np.radians(points[:, 2]) * math.cos(math.radians(lat0)) * _R
+    y = np.radians(points[:, 1]) * _R
+
+    def farthest(i: int, j: int) -> Tuple[float, int]:
+        if j - i < 2:
+            return -1.0, -1
+        px, py = x[i + 1:j], y[i + 1:j]
+        ax, ay, bx, by = x[i], y[i], x[j], y[j]
+        dx, dy = bx - ax, by - ay
+        L2 = dx * dx + dy * dy
+        if L2 == 0.0:
+            d = np.hypot(px - ax, py - ay)
+        else:
+            t = np.clip(((px - ax) * dx + (py - ay) * dy) / L2, 0.0, 1.0)
+            d = np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+        k = int(np.argmax(d))
+        return float(d[k]), i + 1 + k
+
+    keep = {0, n - 1}
+    heap: List[Tuple[float, int, int, int]] = []
+    d, k = farthest(0, n - 1)
+    if k >= 0:
+        heap.append((-d, k, 0, n - 1))
+    while heap and len(keep) < max_points:
+        _, k, i, j = heapq.heappop(heap)
+        keep.add(k)
+        for a, b in ((i, k), (k, j)):
+            d, m = farthest(a, b)
+            if m >= 0:
+                heapq.heappush(heap, (-d, m, a, b))
+    return points[np.fromiter(sorted(keep), dtype=np.int64)]
+
+
+def bucket_reduce(points: np.ndarray, buckets: int, lat0: Optional[float] = None) -> np.ndarray:
+    """
+    Векторное прореживание перед Douglas-Peucker'ом: points делятся на buckets
+    равных по числу точек корзин, от каждой остаются первая точка и самая
+    далёкая от хорды корзины (+ последняя точка трека). O(N) на NumPy.
+    """
+    n = len(points)
+    if n <= 2 * buckets or buckets < 1:
+        return points
+    lat0 = float(points[0, 1]) if lat0 is None else lat0
+    size = -(-n // buckets)
+    idx = np.minimum(np.arange(buckets * size), n - 1).reshape(buckets, size)
+    x = np.radians(points[idx, 2]) * math.cos(math.radians(lat0)) * _R
+    y = np.radians(points[idx, 1]) * _R
+    dx = x[:, -1:] - x[:, :1]
+    dy = y[:, -1:] - y[:, :1]
+    L = np.hypot(dx, dy)
+    cross = np.abs(dx * (y[:, :1] - y) - dy * (x[:, :1] - x))
+    d = np.where(L > 0.0, cross / np.where(L > 0.0, L, 1.0), np.hypot(x - x[:, :1], y - y[:, :1]))
+    far = idx[np.arange(buckets), np.argmax(d, axis=1)]
+    keep = np.unique(np.concatenate([idx[:, 0], far, [n - 1]]))
+    return points[keep]
+
+
+def downsample(points: np.ndarray, max_points: int, lat0: Optional[float] = None) -> np.ndarray:
+    """
+    Не больше max_points точек за единицы миллисекунд и на многочасовом треке:
+    при бюджете до DP_MAX_POINTS — bucket_reduce до ~2 * max_points кандидатов
+    и Douglas-Peucker до бюджета (он стоит ~30 мкс на точку результата),
+    при большем — только bucket_reduce.
+    """
+    if len(points) <= max_points or max_points < 3:
+        return points if len(points) <= max_points else simplify_to_budget(points, max_points, lat0)
+    if max_points <= DP_MAX_POINTS:
+        return simplify_to_budget(bucket_reduce(points, max_points, lat0), max_points, lat0)
+    return bucket_reduce(points, (max_points - 1) // 2, lat0)
+
+
+class MultiResTrajectory:
+    """Многоуровневый трек одного борта / миссии."""
+
+    def __init__(self, levels_m: Sequence[float] = DEFAULT_LEVELS_M, max_points_per_level: int = 20_000) -> None:
+        self.levels_m = tuple(levels_m)
+        self._simplifiers = [StreamingSimplifier(eps) for eps in self.levels_m]
+        self._levels: List[Deque[Point]] = [deque(maxlen=max_points_per_level) for _ in self.levels_m]
+        self._last: Optional[Point] = None
+        self.samples = 0
+
+    def push(self, p: Point) -> None:
+        if self._last is not None and p[0] < self._last[0]:
+            return  # запоздавший сэмпл
+        self._last = p
+        self.samples += 1
+        pending: Iterable[Point] = [p]
+        for simp, level in zip(self._simplifiers, self._levels):
+            emitted: List[Point] = []
+            for q in pending:
+                emitted.extend(simp.push(q))
+            level.extend(emitted)
+            if not emitted:
+                break
+            pending = emitted
+
+    def level_points(self, k: int, t_from: Optional[float] = None, t_to: Optional[float] = None) -> np.ndarray:
+        pts = list(self._levels[k])
+        # незакрытый хвост — текущая позиция, без неё трек «отстаёт»
+        if self._last is not None and (not pts or pts[-1][0] < self._last[0]):
+            pts.append(self._last)
+        arr = np.asarray(pts, dtype=np.float64).reshape(-1, 4)
+        if t_from is not None:
+            arr = arr[arr[:, 0] >= t_from]
+        if t_to is not None:
+            arr = arr[arr[:, 0] <= t_to]
+        return arr
+
+    def query(self, max_points: int = 300, t_from: Optional[float] = None,
+              t_to: Optional[float] = None) -> Tuple[np.ndarray, float]:
+        """(точки [ts, lat, lon, alt], допуск уровня в метрах) — не больше max_points."""
+        for k, eps in enumerate(self.levels_m):
+            arr = self.level_points(k, t_from, t_to)
+            if len(arr) <= max_points:
+                return arr, eps
+        return simplify_to_budget(arr, max_points), float("inf")
+
+
+class TrajectoryIndex:
+    """Треки по бортам и миссиям; потокобезопасен (пишет paho-поток, читает API)."""
+
+    def __init__(self, levels_m: Sequence[float] = DEFAULT_LEVELS_M, max_missions: int = 1000) -> None:
+        self.levels_m = tuple(levels_m)
+        self.max_missions = max_missions
+        self._vehicles: Dict[str, MultiResTrajectory] = {}
+        self._missions: Dict[str, MultiResTrajectory] = {}
+        self._mission_of: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def push(self, vehicle_id: str, ts: float, lat: float, lon: float, alt: float) -> None:
+        p = (ts, lat, lon, alt)
+        with self._lock:
+            tr = self._vehicles.get(vehicle_id)
+            if tr is None:
+                tr = self._vehicles[vehicle_id] = MultiResTrajectory(self.levels_m)
+            tr.push(p)
+            mid = self._mission_of.get(vehicle_id)
+            mt = self._missions.get(mid) if mid is not None else None
+            if mt is not None:
+                mt.push(p)
+
+    def bind_mission(self, vehicle_id: str, mission_id: str) -> None:
+        """С этого момента позы борта пишутся и в трек миссии."""
+        with self._lock:
+            self._mission_of[vehicle_id] = mission_id
+            if mission_id not in self._missions:
+                self._missions[mission_id] = MultiResTrajectory(self.levels_m)
+                while len(self._missions) > self.max_missions:
+                    old = next(iter(self._missions))
+                    del self._missions[old]
+                    # борт с незавершённой (UPLOAD_FAILED и т.п.) вытесненной миссией — отвязать
+                    for vid in [v for v, m in self._mission_of.items() if m == old]:
+                        del self._mission_of[vid]
+
+    def unbind_mission(self, mission_id: str) -> None:
+        with self._lock:
+            for vid in [v for v, m in self._mission_of.items() if m == mission_id]:
+                del self._mission_of[vid]
+
+    def vehicle(self, vehicle_id: str, max_points: int = 300, t_from: Optional[float] = None,
+                t_to: Optional[float] = None) -> Optional[Tuple[np.ndarray, float]]:
+        with self._lock:
+            tr = self._vehicles.get(vehicle_id)
+            return tr.query(max_points, t_from, t_to) if tr else None
+
+    def mission(self, mission_id: str, max_points: int = 300, t_from: Optional[float] = None,
+                t_to: Optional[float] = None) -> Optional[Tuple[np.ndarray, float]]:
+        with self._lock:
+            tr = self._missions.get(mission_id)
+            return tr.query(max_points, t_from, t_to) if tr else None
+
+
+def encode_polyline(latlon: np.ndarray, precision: int = 5) -> str:
+    """Google Encoded Polyline для массива (N, 2) [lat, lon]."""
+    scaled = np.round(np.asarray(latlon, dtype=np.float64) * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    out: List[str] = []
+    for v in deltas.tolist():
+        v = ~(v << 1) if v < 0 else (v << 1)
+        while v >= 0x20:
+            out.append(chr((0x20 | (v & 0x1F)) + 63))
+            v >>= 5
+        out.append(chr(v + 63))
+    return "".join(out)
+
+
+# encoding=packed: строки по 14 байт, base64
+PACKED_DTYPE = np.dtype([("dt_ms", "<u4"), ("lat", "<i4"), ("lon", "<i4"), ("alt_dm", "<i2")])
+PACKED_FORMAT = "<u4 dt_ms от t0, <i4 lat*1e7, <i4 lon*1e7, <i2 alt*10"
+
+
+def encode_packed(points: np.ndarray) -> Tuple[float, str]:
+    """(t0, base64 строк PACKED_DTYPE) для массива (N, 4) [ts, lat, lon, alt]."""
+    import base64
+
+    t0 = float(points[0, 0]) if len(points) else 0.0
+    rows = np.empty(len(points), dtype=PACKED_DTYPE)
+    rows["dt_ms"] = np.round((points[:, 0] - t0) * 1e3)
+    rows["lat"] = np.round(points[:, 1] * 1e7)
+    rows["lon"] = np.round(points[:, 2] * 1e7)
+    rows["alt_dm"] = np.clip(np.round(np.nan_to_num(points[:, 3]) * 10), -32768, 32767)
+    return t0, base64.b64encode(rows.tobytes()).decode("ascii")
+
+
+def track_payload(points: np.ndarray, tolerance_m: float, encoding: str = "json") -> Dict[str, object]:
+    """Ответ API: точки списком, polyline (+ ts/alt отдельными массивами) или packed."""
+    body: Dict[str, object] = {
+        "count": int(len(points)),
+        "tolerance_m": None if math.isinf(tolerance_m) else tolerance_m,
+    }
+    if encoding == "packed":
+        body["t0"], body["packed"] = encode_packed(points)
+        body["format"] = PACKED_FORMAT
+    elif encoding == "polyline":
+        body["polyline"] = encode_polyline(points[:, 1:3])
+        body["ts"] = np.round(points[:, 0], 3).tolist()
+        body["alt"] = np.round(points[:, 3], 1).tolist()
+    else:
+        body["points"] = [
+            {"ts": ts, "lat": lat, "lon": lon, "alt": alt} for ts, lat, lon, alt in points.tolist()
+        ]
+    return body
@@ -0,0 +1,198 @@
+"""
+change_feed.py — лента изменений fleet/missions через триггеры + LISTEN/NOTIFY.
+
+Триггеры на таблицах шлют pg_notify(CHANNEL, json) на каждую вставку/изменение/удаление.
+ChangeFeed держит отдельное asyncpg-соединение с LISTEN и отдаёт события
+как асинхронный итератор — читатели получают свежее состояние без поллинга БД.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.engine import make_url
+
+from drone_core.config.settings import Settings
+from drone_core.infra.db.postgres import get_engine
+
+log = logging.getLogger("pg-change-feed")
+
+CHANNEL = "drone_changes"
+
+# op служебного события: очередь переполнилась / соединение переподнято,
+# потребитель должен перечитать состояние целиком.
+RESYNC = "RESYNC"
+
+# NOTIFY payload ограничен 8000 байт: если строка не влезает — шлём только ключ.
+_TRIGGER_FN = f"""
+CREATE OR REPLACE FUNCTION drone_notify_change() RETURNS trigger AS $$
+DECLARE
+    rec_json jsonb;
+    body text;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        rec_json := to_jsonb(OLD);
+    ELSE
+        rec_json := to_jsonb(NEW);
+    END IF;
+    body := json_build_object(
+        'table', TG_TABLE_NAME, 'op', TG_OP,
+        'id', rec_json ->> TG_ARGV[0], 'row', rec_json
+    )::text;
+    IF octet_length(body) > 7900 THEN
+        body := json_build_object(
+            'table', TG_TABLE_NAME, 'op', TG_OP, 'id', rec_json ->> TG_ARGV[0]
+        )::text;
+    END IF;
+    PERFORM pg_notify('{CHANNEL}', body);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# таблица -> колонка-ключ, который уходит в событие как id
+_WATCHED_TABLES = {
+    "vehiclerow": "id",
+    "missionrow": "id",
+    # изменения маршрута адресуем миссии
+    "waypointrow": "mission_id",
+}
+
+
+async def install_change_triggers() -> None:
+    """Создаёт (идемпотентно) функцию и триггеры уведомлений. Вызывается из init_repos()."""
+    engine = get_engine()
+    async with engine.begin() as conn:
+        # asyncpg не принимает несколько команд в одном prepared statement
+        await conn.exec_driver_sql(_TRIGGER_FN)
+        for table, key in _WATCHED_TABLES.items():
+            trg = f"{table}_notify_change"
+            await conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trg} ON {table}")
+            await conn.exec_driver_sql(
+                f"CREATE TRIGGER {trg} AFTER INSERT OR UPDATE OR DELETE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION drone_notify_change('{key}')"
+            )
+    log.info(f"change-feed triggers installed on {list(_WATCHED_TABLES)}")
+
+
+@dataclass
+class ChangeEvent:
+    table: str
+    op: str                        # INSERT | UPDATE | DELETE | RESYNC
+    id: Optional[str] = None
+    row: Optional[Dict[str, Any]] = field(default=None, repr=False)
+
+
+def _listen_dsn(db_url: str) -> str:
+    """DSN для голого asyncpg: postgresql+asyncpg://... -> postgresql://..."""
+    url = make_url(db_url).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+class ChangeFeed:
+    """
+    Асинхронный итератор событий изменений:
+
+        feed = ChangeFeed()
+        await feed.start()
+        async for ev in feed:
+            ...
+
+    Очередь ограничена; при переполнении или обрыве соединения отдаётся
+    событие RESYNC и лента продолжает работать.
+    """
+
+    def __init__(self, dsn: Optional[str] = None, max_queue: int = 10_000,
+                 reconnect_delay: float = 1.0) -> None:
+        self._dsn = dsn or _listen_dsn(Settings().DB_URL)
+        self._queue: asyncio.Queue[ChangeEvent] = asyncio.Queue(maxsize=max_queue)
+        self._reconnect_delay = reconnect_delay
+        self._conn = None
+        self._overflow = False
+        self._closed = False
+
+    async def start(self) -> None:
+        import asyncpg
+        self._conn = await asyncpg.connect(self._dsn)
+        await self._conn.add_listener(CHANNEL, self._on_notify)
+        self._conn.add_termination_listener(self._on_terminated)
+        log.info(f"LISTEN {CHANNEL} started")
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+    # ---------- callbacks asyncpg ----------
+    def _on_notify(self, conn, pid, channel, payload: str) -> None:
+        try:
+            d = json.loads(payload)
+            ev = ChangeEvent(table=d.get("table", ""), op=d.get("op", ""),
+                             id=d.get("id"), row=d.get("row"))
+        except Exception as e:
+            log.warning(f"bad notify payload: {e}")
+            return
+        if self._overflow:
+            return
+        try:
+            self._queue.put_nowait(ev)
+        except asyncio.QueueFull:
+            # дальше события бессмысленны — потребитель перечитает всё
+            self._overflow = True
+
+    def _on_terminated(self, conn) -> None:
+        if not self._closed:
+            log.warning("LISTEN connection lost; will reconnect")
+            self._overflow = True
+
+    # ---------- consumer API ----------
+    async def _reconnect(self) -> None:
+        while not self._closed:
+            try:
+                await self.start()
+                return
+            except Exception as e:
+                log.warning(f"LISTEN reconnect failed: {e!r}")
+                await asyncio.sleep(self._reconnect_delay)
+
+    def _take_resync(self) -> Optional[ChangeEvent]:
+        if not self._overflow:
+            return None
+        # сбрасываем накопленное: после RESYNC оно уже не нужно
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._overflow = False
+        return ChangeEvent(table="*", op=RESYNC)
+
+    async def get(self) -> ChangeEvent:
+        while True:
+            if self._conn is None or self._conn.is_closed():
+                await self._reconnect()
+            ev = self._take_resync()
+            if ev is not None:
+                return ev
+            try:
+                return await asyncio.wait_for(self._queue.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+
+    def drain(self) -> List[ChangeEvent]:
+        """Забрать все уже пришедшие события без ожидания (для коалесинга пачкой)."""
+        ev = self._take_resync()
+        if ev is not None:
+            return [ev]
+        out: List[ChangeEvent] = []
+        while not self._queue.empty():
+            out.append(self._queue.get_nowait())
+        return out
+
+    def __aiter__(self) -> "ChangeFeed":
+        return self
+
+    async def __anext__(self) -> ChangeEvent:
+        if self._closed:
+            raise StopAsyncIteration
+        return await self.get()
@@ -1,27 +1,128 @@
 from __future__ import annotations
+import asyncio
+import time
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from drone_core.config.settings import Settings
+from drone_core.utils.metrics import REGISTRY
 
 _engine: AsyncEngine | None = None
+_tables_ready = False
+# (задача-владелец, сессия): вложенные session() в той же задаче переиспользуют её
+_current: ContextVar[Optional[Tuple[Optional[asyncio.Task], AsyncSession]]] = ContextVar("pg_session", default=None)
+
+
+def _engine_options(settings: Settings) -> tuple[Any, Dict[str, Any]]:
+    """URL + kwargs для create_async_engine из Settings (пул, таймауты, кэш prepared statements)."""
+    url = make_url(settings.DB_URL)
+    connect_args: Dict[str, Any] = {}
+    if url.drivername.endswith("+asyncpg"):
+        # кэш prepared statements диалекта SQLAlchemy и собственный кэш asyncpg
+        url = url.update_query_dict({
+            "prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE),
+        })
+        connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+        connect_args["command_timeout"] = settings.DB_COMMAND_TIMEOUT_SEC
+        connect_args["timeout"] = settings.DB_CONNECT_TIMEOUT_SEC
+    kwargs: Dict[str, Any] = dict(
+        echo=False,
+        future=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE_SEC,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SEC,
+        connect_args=connect_args,
+    )
+    return url, kwargs
+
+
+def _instrument(engine: AsyncEngine) -> None:
+    """Латентность каждого запроса → гистограмма db.query.<select|insert|...>."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_t0", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("query_t0")
+        if not stack:
+            return
+        dt = time.perf_counter() - stack.pop()
+        kind = (statement.lstrip().split(None, 1) or ["other"])[0].lower()
+        REGISTRY.histogram(f"db.query.{kind}").observe(dt)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(ctx):
+        stack = ctx.connection.info.get("query_t0") if ctx.connection is not None else None
+        if stack:
+            stack.pop()
+        REGISTRY.counter("db.query.errors").inc()
+
 
 def get_engine() -> AsyncEngine:
     global _engine
     if _engine is None:
         settings = Settings()
-        _engine = create_async_engine(settings.DB_URL, echo=False, future=True)
+        url, kwargs = _engine_options(settings)
+        _engine = create_async_engine(url, **kwargs)
+        _instrument(_engine)
     return _engine
 
+
 @asynccontextmanager
 async def session():
+    """Сессия БД. Вложенный session() в той же задаче переиспользует внешнюю (один коннект из пула)."""
+    # ContextVar наследуют задачи, созданные внутри блока: им — своя сессия,
+    # AsyncSession нельзя делить между задачами (и она закрывается с блоком)
+    task = asyncio.current_task()
+    current = _current.get()
+    if current is not None and current[0] is task:
+        yield current[1]
+        return
     engine = get_engine()
-    async with AsyncSession(engine) as s:
-        yield s
+    async with AsyncSession(engine, expire_on_commit=False) as s:
+        token = _current.set((task, s))
+        try:
+            yield s
+        finally:
+            _current.reset(token)
+
 
 async def create_all(models_module) -> None:
     """Вызови один раз при старте сервиса, чтобы создать таблицы."""
+    global _tables_ready
+    if _tables_ready:
+        return
     engine = get_engine()
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+    _tables_ready = True
+
+
+async def dispose_engine() -> None:
+    """Закрыть пул соединений при остановке сервиса."""
+    global _engine
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+
+
+def db_metrics() -> Dict[str, Any]:
+    """Снапшот метрик: состояние пула + латентность запросов по типам."""
+    pool: Dict[str, Any] = {}
+    if _engine is not None:
+        p = _engine.pool
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            fn = getattr(p, name, None)
+            if callable(fn):
+                pool[name] = fn()
+    return {"pool": pool, **REGISTRY.snapshot(prefix="db.")}
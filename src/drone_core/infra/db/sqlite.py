@@ -0,0 +1,179 @@
+"""
+sqlite.py — встроенное хранилище для single-node развёртываний (REPO_IMPL=sqlite).
+
+Одно соединение на процесс, живёт в отдельном потоке-исполнителе:
+- WAL: читатели других процессов не блокируют писателя;
+- записи, пришедшие одновременно, коммитятся одной транзакцией (group commit),
+  каждая под своим SAVEPOINT — ошибка одной не откатывает соседние;
+- корутина записи возвращается только после COMMIT.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple
+
+from drone_core.config.settings import Settings
+from drone_core.utils.metrics import REGISTRY
+
+log = logging.getLogger("sqlite-db")
+
+Job = Tuple[bool, Callable[[sqlite3.Connection], Any], asyncio.AbstractEventLoop, asyncio.Future]
+
+_STOP = object()
+
+
+class SqliteDb:
+    def __init__(self, path: str, synchronous: str = "NORMAL", batch_max: int = 256,
+                 busy_timeout_ms: int = 5000) -> None:
+        self.path = path
+        self.synchronous = synchronous
+        self.batch_max = batch_max
+        self.busy_timeout_ms = busy_timeout_ms
+        self._jobs: "queue.Queue[Any]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="sqlite-db", daemon=True)
+        self._ready = threading.Event()
+        self._started = False
+
+    # ---------- lifecycle ----------
+    def start(self) -> None:
+        if self._started:
+            return
+        self._started = True
+        self._thread.start()
+        self._ready.wait()
+
+    def close(self) -> None:
+        if self._started:
+            self._jobs.put(_STOP)
+            self._thread.join(timeout=5)
+            self._started = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        # транзакциями управляем сами (BEGIN/COMMIT)
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")      # 64 MiB
+        conn.execute("PRAGMA mmap_size=268435456")    # 256 MiB
+        return conn
+
+    # ---------- поток-исполнитель ----------
+    def _run(self) -> None:
+        conn = self._connect()
+        self._ready.set()
+        while True:
+            job = self._jobs.get()
+            if job is _STOP:
+                break
+            batch: List[Job] = [job]
+            # добираем всё, что уже стоит в очереди (group commit)
+            while len(batch) < self.batch_max:
+                try:
+                    nxt = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    self._jobs.put(_STOP)
+                    break
+                batch.append(nxt)
+            self._execute(conn, batch)
+        conn.close()
+
+    def _execute(self, conn: sqlite3.Connection, batch: List[Job]) -> None:
+        reads = [j for j in batch if not j[0]]
+        writes = [j for j in batch if j[0]]
+        results: List[Tuple[Job, bool, Any]] = []
+
+        if writes:
+            t0 = time.perf_counter()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for j in writes:
+                    conn.execute("SAVEPOINT job")
+                    try:
+                        results.append((j, True, j[1](conn)))
+                        conn.execute("RELEASE job")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO job")
+                        conn.execute("RELEASE job")
+                        results.append((j, False, e))
+                conn.execute("COMMIT")
+            except Exception as e:
+                # коммит не прошёл — ни одна запись пачки не сохранена
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                results = [(j, False, e) for j in writes]
+            REGISTRY.histogram("sqlite.txn").observe(time.perf_counter() - t0)
+            REGISTRY.counter("sqlite.writes").inc(len(writes))
+
+        for j in reads:
+            try:
+                results.append((j, True, j[1](conn)))
+            except Exception as e:
+                results.append((j, False, e))
+
+        for (_, fn, loop, fut), ok, value in results:
+            loop.call_soon_threadsafe(_resolve, fut, ok, value)
+
+    # ---------- API ----------
+    def _submit(self, write: bool, fn: Callable[[sqlite3.Connection], Any]) -> "asyncio.Future[Any]":
+        if not self._started:
+            self.start()
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._jobs.put((write, fn, loop, fut))
+        return fut
+
+    async def write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """fn(conn) выполняется в общей транзакции; возврат — после COMMIT."""
+        return await self._submit(True, fn)
+
+    async def read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        return await self._submit(False, fn)
+
+    async def execute(self, sql: str, params: Any = ()) -> int:
+        """Возвращает rowcount."""
+        return await self.write(lambda c: c.execute(sql, params).rowcount)
+
+    async def executemany(self, sql: str, seq: List[Any]) -> int:
+        return await self.write(lambda c: c.executemany(sql, seq).rowcount)
+
+    async def fetchall(self, sql: str, params: Any = ()) -> List[sqlite3.Row]:
+        return await self.read(lambda c: c.execute(sql, params).fetchall())
+
+    async def fetchone(self, sql: str, params: Any = ()) -> Optional[sqlite3.Row]:
+        return await self.read(lambda c: c.execute(sql, params).fetchone())
+
+    async def executescript(self, script: str) -> None:
+        # executescript сам делает COMMIT — гоняем его как чтение, вне пачки записей
+        await self.read(lambda c: c.executescript(script).close())
+
+
+def _resolve(fut: asyncio.Future, ok: bool, value: Any) -> None:
+    if fut.done():
+        return
+    if ok:
+        fut.set_result(value)
+    else:
+        fut.set_exception(value)
+
+
+_db: SqliteDb | None = None
+
+
+def get_db() -> SqliteDb:
+    global _db
+    if _db is None:
+        s = Settings()
+        _db = SqliteDb(s.SQLITE_PATH, synchronous=s.SQLITE_SYNCHRONOUS, batch_max=s.SQLITE_BATCH_MAX)
+    return _db
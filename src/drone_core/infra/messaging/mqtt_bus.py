@@ -40,6 +40,8 @@ class MqttBus(EventBus):
         password: Optional[str] = None,
         keepalive: int = 30,
         clean_session: bool = True,
+        accept_topic: Optional[Callable[[str], bool]] = None,
+        max_inflight: Optional[int] = None,
     ) -> None:
         self._url = urlparse(broker_url)
         self._client = mqtt.Client(
@@ -52,11 +54,18 @@ class MqttBus(EventBus):
         if self._url.scheme in ("mqtts", "ssl", "tls"):
             self._client.tls_set(cert_reqs=ssl.CERT_REQUIRED)
         self._keepalive = keepalive
+        # окно QoS>0 публикаций без PUBACK (paho по умолчанию 20) — для пакетной публикации
+        if max_inflight:
+            self._client.max_inflight_messages_set(max_inflight)
+        # фильтр по топику ДО разбора JSON (шардирование ingest по борту)
+        self._accept_topic = accept_topic
 
         # runtime
         self._connected = threading.Event()
         self._stop_evt = threading.Event()
         self._handlers: Dict[str, List[Handler]] = {}  # topic -> [handlers]
+        # «сырые» наблюдатели (topic, payload bytes, qos, retain, ts) — запись трафика
+        self._taps: List[Callable[[str, bytes, int, bool, float], None]] = []
         self._lock = threading.RLock()
 
         # async-петля для корутинных обработчиков
@@ -155,6 +164,22 @@ class MqttBus(EventBus):
         if res.rc != mqtt.MQTT_ERR_SUCCESS:
             log.error(f"publish error rc={res.rc} topic={topic}")
 
+    def publish_many(self, topic: str, bodies: List[bytes], qos: int = 1) -> List[Optional[str]]:
+        """
+        Пакетная публикация готовых тел в один топик: без ожидания PUBACK
+        каждого — paho держит в полёте до max_inflight сообщений, остальные
+        в своей очереди. Результат по каждому телу: None — принято клиентом
+        (в том числе в очередь до переподключения), иначе текст ошибки.
+        """
+        if not self._connected.is_set():
+            log.warning("publish_many while disconnected; messages will still be queued by paho")
+        out: List[Optional[str]] = []
+        publish = self._client.publish
+        for body in bodies:
+            rc = publish(topic, body, qos=qos).rc
+            out.append(None if rc in (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN) else mqtt.error_string(rc))
+        return out
+
     def subscribe(self, topic: str, handler: Handler, qos: int = 1) -> None:
         with self._lock:
             self._handlers.setdefault(topic, []).append(handler)
@@ -176,6 +201,16 @@ class MqttBus(EventBus):
             self._client.unsubscribe(topic)
             log.info(f"unsubscribed: {topic}")
 
+    def add_tap(self, tap: Callable[[str, bytes, int, bool, float], None]) -> None:
+        """Наблюдатель за всеми входящими сообщениями до разбора JSON (paho-поток)."""
+        with self._lock:
+            self._taps.append(tap)
+
+    def remove_tap(self, tap: Callable[[str, bytes, int, bool, float], None]) -> None:
+        with self._lock:
+            if tap in self._taps:
+                self._taps.remove(tap)
+
     # ---------- callbacks ----------
     def _on_connect(self, client: mqtt.Client, userdata, flags, reason_code, properties) -> None:
         if reason_code == mqtt.MQTT_ERR_SUCCESS or reason_code == 0:
@@ -200,6 +235,15 @@ class MqttBus(EventBus):
         log.warning(f"[MQTT] Disconnected rc={reason_code}; reconnecting...")
 
     def _on_message(self, client: mqtt.Client, userdata, msg: mqtt.MQTTMessage) -> None:
+        if self._taps:
+            now = time.time()
+            for tap in list(self._taps):
+                try:
+                    tap(msg.topic, msg.payload, msg.qos, bool(msg.retain), now)
+                except Exception as e:
+                    log.exception(f"tap error for topic={msg.topic}: {e}")
+        if self._accept_topic is not None and not self._accept_topic(msg.topic):
+            return
         # попытка распарсить JSON
         payload: Any
         try:
@@ -217,18 +261,15 @@ class MqttBus(EventBus):
             retain=msg.retain,
             ts=time.time(),
         )
-        # диспатчим всем хендлерам, подписанным ровно на этот топик
-        # Paho сам делает matching wildcard-ов на стороне брокера.
+        # диспатчим хендлерам всех подписок, чей шаблон матчит топик (wildcard-ы + и #).
+        # Один и тот же хендлер на нескольких подходящих шаблонах вызывается один раз.
         with self._lock:
-            handlers = list(self._handlers.get(msg.topic, []))
-            # плюс возможны wildcard-подписки — paho вернёт msg.topic, а подписывались мы на шаблон
-            # поэтому пробежимся и по тем, кто подписан на шаблон, если есть точное совпадение уже покрыто
-            if msg.topic not in self._handlers:
-                for pattern, hs in self._handlers.items():
-                    # простая эвристика: если клиент подписывался на pattern (например telem/+/pose),
-                    # брокер всё равно доставит, а тут мы просто также вызовем обработчики.
-                    if "+/" in pattern or "/#":
-                        handlers.extend(hs)
+            handlers: List[Handler] = []
+            for pattern, hs in self._handlers.items():
+                if pattern == msg.topic or mqtt.topic_matches_sub(_topic_filter(pattern), msg.topic):
+                    for h in hs:
+                        if h not in handlers:
+                            handlers.append(h)
 
         for h in handlers:
             try:
@@ -249,6 +290,13 @@ class MqttBus(EventBus):
                 log.exception(f"mqtt loop error: {e}")
                 time.sleep(1.0)
 
+def _topic_filter(pattern: str) -> str:
+    """$share/<group>/<filter> -> <filter> (shared subscription приходит с обычным топиком)."""
+    if pattern.startswith("$share/"):
+        parts = pattern.split("/", 2)
+        return parts[2] if len(parts) == 3 else pattern
+    return pattern
+
 def _is_coroutine(func: Handler) -> bool:
     import inspect
     return inspect.iscoroutinefunction(func) or isinstance(func, Callable) and hasattr(func, "__call__") and inspect.iscoroutinefunction(func)  # type: ignore
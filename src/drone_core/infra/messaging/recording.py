@@ -0,0 +1,213 @@
+"""
+recording.py — запись и воспроизведение «сырого» MQTT-трафика.
+
+Запись — два append-only файла:
+  <path>.rec  заголовок MAGIC, затем записи
+              [ts f64][payload_len u32][topic_len u16][flags u8] topic payload
+              (flags: биты 0-1 — qos, бит 2 — retain);
+  <path>.idx  по записи на сообщение: (ts f64, offset u64) — смещение в .rec.
+
+Recorder подключается к MqttBus через add_tap (payload до разбора JSON).
+Replayer открывает .rec через mmap и .idx как массив NumPy: поиск по времени —
+бинарный поиск по индексу, payload отдаётся memoryview без копирования.
+Оборванный хвост (процесс убит посреди записи) при чтении отбрасывается.
+"""
+from __future__ import annotations
+import asyncio
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import paho.mqtt.client as mqtt
+
+MAGIC = b"DRREC1\n\0"
+_REC = struct.Struct("<dIHB")
+INDEX_DTYPE = np.dtype([("ts", "<f8"), ("offset", "<u8")])
+
+Publish = Callable[[str, bytes, int, bool], Union[None, Awaitable[None]]]
+
+
+def _paths(path: Union[str, Path]) -> Tuple[Path, Path]:
+    p = Path(path)
+    if p.suffix in (".rec", ".idx"):
+        p = p.with_suffix("")
+    return p.with_name(p.name + ".rec"), p.with_name(p.name + ".idx")
+
+
+class Recorder:
+    """Пишет трафик в <path>.rec/.idx. Потокобезопасен (tap вызывается из paho-потока)."""
+
+    def __init__(self, path: Union[str, Path], flush_sec: float = 1.0) -> None:
+        self.data_path, self.index_path = _paths(path)
+        self.data_path.parent.mkdir(parents=True, exist_ok=True)
+        fresh = not self.data_path.exists() or self.data_path.stat().st_size == 0
+        self._data = open(self.data_path, "ab")
+        self._index = open(self.index_path, "ab")
+        if fresh:
+            self._data.write(MAGIC)
+        self._offset = self._data.tell()
+        self._lock = threading.Lock()
+        self._flush_sec = flush_sec
+        self._last_flush = time.monotonic()
+        self.records = 0
+        self.bytes = 0
+
+    def record(self, topic: str, payload: Union[bytes, bytearray], qos: int = 0,
+               retain: bool = False, ts: Optional[float] = None) -> None:
+        ts = time.time() if ts is None else ts
+        t = topic.encode("utf-8")
+        header = _REC.pack(ts, len(payload), len(t), (qos & 3) | (4 if retain else 0))
+        with self._lock:
+            offset = self._offset
+            self._data.write(header)
+            self._data.write(t)
+            self._data.write(payload)
+            # индекс пишется после данных: запись с индексом всегда целая
+            self._index.write(struct.pack("<dQ", ts, offset))
+            size = _REC.size + len(t) + len(payload)
+            self._offset += size
+            self.records += 1
+            self.bytes += size
+            now = time.monotonic()
+            if now - self._last_flush >= self._flush_sec:
+                self._flush_locked()
+                self._last_flush = now
+
+    # сигнатура MqttBus.add_tap
+    __call__ = record
+
+    def _flush_locked(self) -> None:
+        self._data.flush()
+        self._index.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._data.close()
+            self._index.close()
+
+
+def _vehicle_of(topic: str) -> Optional[str]:
+    """telem/<id>/pose, cmd/<id>/..., payload/<id>/... -> <id>."""
+    parts = topic.split("/", 2)
+    return parts[1] if len(parts) >= 3 else None
+
+
+class Replayer:
+    """Чтение записи через mmap; фильтры по топику / борту, поиск по времени."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.data_path, self.index_path = _paths(path)
+        self._file = open(self.data_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < len(MAGIC):
+            raise ValueError(f"{self.data_path}: пустая запись")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.data_path}: не файл записи трафика")
+        raw = np.fromfile(self.index_path, dtype=np.uint8)
+        index = raw[: len(raw) - len(raw) % INDEX_DTYPE.itemsize].view(INDEX_DTYPE)
+        # отбрасываем индекс на недописанные данные
+        ok = index["offset"] + _REC.size <= size
+        self.index = index[ok] if not ok.all() else index
+        while len(self.index):
+            last = int(self.index["offset"][-1])
+            _, plen, tlen, _ = _REC.unpack_from(self._mm, last)
+            if last + _REC.size + tlen + plen <= size:
+                break
+            self.index = self.index[:-1]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def t_start(self) -> Optional[float]:
+        return float(self.index["ts"][0]) if len(self.index) else None
+
+    @property
+    def t_end(self) -> Optional[float]:
+        return float(self.index["ts"][-1]) if len(self.index) else None
+
+    def position(self, ts: float) -> int:
+        """Номер первой записи с временем >= ts."""
+        return int(np.searchsorted(self.index["ts"], ts, side="left"))
+
+    def read(self, i: int) -> Tuple[float, str, memoryview, int, bool]:
+        off = int(self.index["offset"][i])
+        ts, plen, tlen, flags = _REC.unpack_from(self._mm, off)
+        start = off + _REC.size
+        topic = self._mm[start:start + tlen].decode("utf-8")
+        payload = memoryview(self._mm)[start + tlen:start + tlen + plen]
+        return ts, topic, payload, flags & 3, bool(flags & 4)
+
+    def iter(
+        self,
+        t_from: Optional[float] = None,
+        t_to: Optional[float] = None,
+        topics: Optional[Sequence[str]] = None,
+        vehicles: Optional[Sequence[str]] = None,
+    ) -> Iterator[Tuple[float, str, memoryview, int, bool]]:
+        """Записи в исходном порядке; topics — MQTT-фильтры (+/#), vehicles — id бортов."""
+        lo = 0 if t_from is None else self.position(t_from)
+        hi = len(self.index) if t_to is None else int(np.searchsorted(self.index["ts"], t_to, side="right"))
+        vset = set(vehicles) if vehicles else None
+        for i in range(lo, hi):
+            rec = self.read(i)
+            topic = rec[1]
+            if vset is not None and _vehicle_of(topic) not in vset:
+                continue
+            if topics and not any(mqtt.topic_matches_sub(f, topic) for f in topics):
+                continue
+            yield rec
+
+    async def play(
+        self,
+        publish: Publish,
+        speed: float = 1.0,
+        t_from: Optional[float] = None,
+        t_to: Optional[float] = None,
+        topics: Optional[Sequence[str]] = None,
+        vehicles: Optional[Sequence[str]] = None,
+    ) -> int:
+        """
+        Переопубликовать трафик с исходными интервалами, ускоренными в speed раз
+        (speed <= 0 — максимально быстро). Возвращает число сообщений.
+        """
+        n = 0
+        t0_rec: Optional[float] = None
+        t0_wall = time.monotonic()
+        for ts, topic, payload, qos, retain in self.iter(t_from, t_to, topics, vehicles):
+            if speed > 0:
+                if t0_rec is None:
+                    t0_rec = ts
+                delay = t0_wall + (ts - t0_rec) / speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif n % 1000 == 0:
+                await asyncio.sleep(0)
+            res = publish(topic, bytes(payload), qos, retain)
+            if asyncio.iscoroutine(res):
+                await res
+            n += 1
+        return n
+
+    def close(self) -> None:
+        self.index = self.index[:0]
+        self._mm.close()
+        self._file.close()
+
+
+def bus_publisher(bus: Any) -> Publish:
+    """publish для Replayer поверх EventBus (payload уходит как есть, bytes)."""
+    def publish(topic: str, payload: bytes, qos: int, retain: bool) -> None:
+        bus.publish(topic, payload, qos=qos, retain=retain)
+    return publish
@@ -20,21 +20,40 @@ def telem_health(veh_id: str) -> str:
     return f"telem/{veh_id}/health"
 
 
+# ==== Оценка энергии борта (telemetry_ingest) ====
+def fleet_energy(veh_id: str) -> str:
+    return f"fleet/{veh_id}/energy"
+
+
 # ==== События миссий ====
 def mission_events(mission_id: str) -> str:
     return f"mission/{mission_id}/events"
 
 
+# ==== Метрики сервисов (снапшот utils.metrics, retained) ====
+def metrics(service: str) -> str:
+    return f"metrics/{service}"
+
+
 # ==== Состояние полезной нагрузки (лебёдка и т.п.) ====
 def payload_winch_state(veh_id: str) -> str:
     return f"payload/{veh_id}/winch/state"
 
 
+# ==== Запросы истории телеметрии к ingest (telemetry/query.py) ====
+TELEM_QUERY = "telem_query/request"
+
+def telem_query_reply(client_id: str) -> str:
+    return f"telem_query/reply/{client_id}"
+
+
 # ==== Шаблоны подписки (wildcards) ====
 TELEM_ALL = "telem/+/+"
 CMD_ALL = "cmd/+/+"
 MISSION_EVENTS_ALL = "mission/+/events"
+FLEET_ENERGY_ALL = "fleet/+/energy"
 PAYLOAD_ALL = "payload/+/+/#"
+METRICS_ALL = "metrics/+"
 
 
 # ==== Объект для удобства доступа ====
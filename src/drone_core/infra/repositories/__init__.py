@@ -3,17 +3,76 @@ from drone_core.config.settings import Settings
 from .base import VehicleRepo, MissionRepo
 
 def make_repos() -> tuple[VehicleRepo, MissionRepo]:
+    """Создаёт репозитории без I/O; таблицы готовит init_repos()."""
     s = Settings()
     if s.REPO_IMPL.lower() == "pg":
-        from .fleet_pg import FleetPg, VehicleRow
-        from .missions_pg import MissionsPg, MissionRow, WaypointRow
-        # создадим таблицы, если нужно
-        from drone_core.infra.db.postgres import create_all
-        import asyncio
-        # safe create_all on import-time (only once)
-        asyncio.get_event_loop().run_until_complete(create_all(models_module=None))
-        return FleetPg(), MissionsPg()
+        from .fleet_pg import FleetPg
+        from .missions_pg import MissionsPg
+        fleet, missions = FleetPg(), MissionsPg()
+        if s.REPO_CACHE:
+            from .cached import CachedFleetRepo, CachedMissionRepo
+            ttl = s.REPO_CACHE_TTL_SEC
+            fleet = CachedFleetRepo(fleet, max_entries=s.REPO_CACHE_SIZE,
+                                    ttl={"get": ttl, "list_all": ttl / 4, "list_free": ttl / 4})
+            missions = CachedMissionRepo(missions, max_entries=s.REPO_CACHE_SIZE,
+                                         ttl={"get": ttl, "list_active": ttl / 4})
+        return fleet, missions
+    elif s.REPO_IMPL.lower() == "sqlite":
+        from .fleet_sqlite import FleetSqlite
+        from .missions_sqlite import MissionsSqlite
+        return FleetSqlite(), MissionsSqlite()
     else:
         from .fleet_mem import FleetMem
         from .missions_mem import MissionsMem
+        if s.REPO_JOURNAL_DIR:
+            journals = _open_journals(s)
+            if journals is not None:
+                return FleetMem(journals[0]), MissionsMem(journals[1])
         return FleetMem(), MissionsMem()
+
+def _open_journals(s: Settings):
+    """Журналы для mem-репозиториев; None, если каталог уже занят другим процессом."""
+    import logging
+    from pathlib import Path
+    from .journal import Journal, JournalLocked
+    root = Path(s.REPO_JOURNAL_DIR)
+    opts = dict(fsync_interval=s.REPO_JOURNAL_FSYNC_SEC, snapshot_every=s.REPO_JOURNAL_SNAPSHOT_EVERY)
+    try:
+        fleet_j = Journal(root / "fleet", **opts)
+    except JournalLocked as e:
+        logging.getLogger("repos").warning(f"{e} — using volatile mem repos")
+        return None
+    try:
+        missions_j = Journal(root / "missions", **opts)
+    except JournalLocked as e:
+        fleet_j.close()
+        logging.getLogger("repos").warning(f"{e} — using volatile mem repos")
+        return None
+    return fleet_j, missions_j
+
+async def close_repos(*repos) -> None:
+    """Закрыть репозитории при остановке сервиса (mem + журнал: сбросить хвост на диск)."""
+    for repo in repos:
+        aclose = getattr(repo, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+async def init_repos() -> None:
+    """Асинхронная подготовка хранилища — вызови один раз при старте сервиса."""
+    s = Settings()
+    if s.REPO_IMPL.lower() == "pg":
+        # импорт регистрирует таблицы в SQLModel.metadata
+        from .fleet_pg import VehicleRow  # noqa: F401
+        from .missions_pg import MissionRow, WaypointRow, migrate  # noqa: F401
+        from drone_core.infra.db.postgres import create_all
+        from drone_core.infra.db.change_feed import install_change_triggers
+        await create_all(models_module=None)
+        await migrate()
+        await install_change_triggers()
+    elif s.REPO_IMPL.lower() == "sqlite":
+        from drone_core.infra.db.sqlite import get_db
+        from .fleet_sqlite import SCHEMA as FLEET_SCHEMA
+        from .missions_sqlite import SCHEMA as MISSIONS_SCHEMA, migrate
+        db = get_db()
+        await db.executescript(FLEET_SCHEMA + MISSIONS_SCHEMA)
+        await migrate(db)
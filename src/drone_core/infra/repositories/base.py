@@ -9,6 +9,7 @@ class VehicleRepo(Protocol):
     async def list_free(self) -> List[Vehicle]: ...
     async def set_status(self, vehicle_id: str, status: VehicleStatus) -> None: ...
     async def update(self, v: Vehicle) -> None: ...
+    async def upsert_many(self, vs: List[Vehicle]) -> None: ...
 
 class MissionRepo(Protocol):
     async def create(self, m: Mission) -> Mission: ...
@@ -0,0 +1,196 @@
+from __future__ import annotations
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from drone_core.domain.models import Mission, MissionStatus, Vehicle, VehicleStatus, Waypoint
+from .base import VehicleRepo, MissionRepo
+
+_MISSING = object()
+
+
+class _TtlLru:
+    """Ограниченный LRU с TTL на запись. ttl <= 0 — кэш выключен."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Any) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return _MISSING
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Any) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class _CacheBase:
+    """Общая часть: TTL по методам, счётчики hit/miss, single-flight на промахе."""
+
+    DEFAULT_TTL: Dict[str, float] = {}
+    TABLES: Tuple[str, ...] = ()
+
+    def __init__(self, max_entries: int, ttl: Optional[Dict[str, float]]) -> None:
+        ttl = {**self.DEFAULT_TTL, **(ttl or {})}
+        # list-методы держат одно значение, get — до max_entries сущностей
+        self._caches: Dict[str, _TtlLru] = {
+            name: _TtlLru(max_entries if name == "get" else 1, t) for name, t in ttl.items()
+        }
+        self._stats: Dict[str, Dict[str, int]] = {name: {"hits": 0, "misses": 0} for name in ttl}
+        self._inflight: Dict[Tuple[str, Any], asyncio.Future] = {}
+        # загрузки в полёте, сброшенные инвалидацией: их результат не кэшируем
+        self._stale: Set[Tuple[str, Any]] = set()
+
+    async def _cached(self, method: str, key: Any, load: Callable[[], Awaitable[Any]]) -> Any:
+        cache = self._caches[method]
+        value = cache.get(key)
+        if value is not _MISSING:
+            self._stats[method]["hits"] += 1
+            return value
+        self._stats[method]["misses"] += 1
+        # параллельные промахи по одному ключу ждут один запрос к БД
+        fkey = (method, key)
+        fut = self._inflight.get(fkey)
+        if fut is not None:
+            return await asyncio.shield(fut)
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[fkey] = fut
+        try:
+            value = await load()
+            if fkey not in self._stale:
+                cache.put(key, value)
+            fut.set_result(value)
+            return value
+        except BaseException as e:
+            fut.set_exception(e)
+            # исключение уже отдано вызывающему — гасим "never retrieved"
+            fut.exception()
+            raise
+        finally:
+            self._inflight.pop(fkey, None)
+            self._stale.discard(fkey)
+
+    def _invalidate(self, key: Any = None) -> None:
+        """Сбросить сущность key (если задан) и все list-кэши."""
+        for name, cache in self._caches.items():
+            if name == "get":
+                if key is not None:
+                    cache.pop(key)
+            else:
+                cache.clear()
+        # загрузка, начатая до изменения, могла прочитать старую строку
+        self._stale.update(k for k in self._inflight if k[0] != "get" or k[1] == key)
+
+    def invalidate_all(self) -> None:
+        for cache in self._caches.values():
+            cache.clear()
+        self._stale.update(self._inflight)
+
+    def on_change(self, ev: Any) -> None:
+        """Инвалидация по событию ChangeFeed (см. infra.db.change_feed.ChangeEvent)."""
+        if ev.op == "RESYNC":
+            self.invalidate_all()
+        elif ev.table in self.TABLES:
+            self._invalidate(ev.id)
+
+    async def follow(self, feed: Any) -> None:
+        """Инвалидировать по ленте изменений (записи из других процессов)."""
+        async for ev in feed:
+            self.on_change(ev)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: dict(s) for name, s in self._stats.items()}
+
+
+class CachedFleetRepo(_CacheBase, VehicleRepo):
+    """Read-through кэш поверх любого VehicleRepo; запись — сквозная с инвалидацией."""
+
+    DEFAULT_TTL = {"get": 2.0, "list_all": 0.5, "list_free": 0.5}
+    TABLES = ("vehiclerow",)
+
+    def __init__(self, inner: VehicleRepo, max_entries: int = 1024,
+                 ttl: Optional[Dict[str, float]] = None) -> None:
+        super().__init__(max_entries, ttl)
+        self.inner = inner
+
+    async def add(self, v: Vehicle) -> Vehicle:
+        res = await self.inner.add(v)
+        self._invalidate(v.id)
+        return res
+
+    async def get(self, vehicle_id: str) -> Optional[Vehicle]:
+        return await self._cached("get", vehicle_id, lambda: self.inner.get(vehicle_id))
+
+    async def list_all(self) -> List[Vehicle]:
+        return await self._cached("list_all", None, self.inner.list_all)
+
+    async def list_free(self) -> List[Vehicle]:
+        return await self._cached("list_free", None, self.inner.list_free)
+
+    async def set_status(self, vehicle_id: str, status: VehicleStatus) -> None:
+        await self.inner.set_status(vehicle_id, status)
+        self._invalidate(vehicle_id)
+
+    async def update(self, v: Vehicle) -> None:
+        await self.inner.update(v)
+        self._invalidate(v.id)
+
+    async def upsert_many(self, vs: List[Vehicle]) -> None:
+        await self.inner.upsert_many(vs)
+        for v in vs:
+            self._invalidate(v.id)
+
+
+class CachedMissionRepo(_CacheBase, MissionRepo):
+    """Read-through кэш поверх любого MissionRepo."""
+
+    DEFAULT_TTL = {"get": 2.0, "list_active": 0.5}
+    TABLES = ("missionrow", "waypointrow")
+
+    def __init__(self, inner: MissionRepo, max_entries: int = 4096,
+                 ttl: Optional[Dict[str, float]] = None) -> None:
+        super().__init__(max_entries, ttl)
+        self.inner = inner
+
+    async def create(self, m: Mission) -> Mission:
+        res = await self.inner.create(m)
+        self._invalidate(m.id)
+        return res
+
+    async def get(self, mission_id: str) -> Optional[Mission]:
+        return await self._cached("get", mission_id, lambda: self.inner.get(mission_id))
+
+    async def set_status(self, mission_id: str, status: MissionStatus) -> None:
+        await self.inner.set_status(mission_id, status)
+        self._invalidate(mission_id)
+
+    async def assign_vehicle(self, mission_id: str, vehicle_id: str) -> None:
+        await self.inner.assign_vehicle(mission_id, vehicle_id)
+        self._invalidate(mission_id)
+
+    async def save_waypoints(self, mission_id: str, wps: List[Waypoint]) -> None:
+        await self.inner.save_waypoints(mission_id, wps)
+        self._invalidate(mission_id)
+
+    async def list_active(self) -> List[Mission]:
+        return await self._cached("list_active", None, self.inner.list_active)
@@ -1,17 +1,50 @@
 from __future__ import annotations
 import asyncio
-from typing import Dict, List, Optional
+from enum import Enum
+from typing import Dict, List, Optional, TYPE_CHECKING
 from drone_core.domain.models import Vehicle, VehicleStatus
 from .base import VehicleRepo
 
+if TYPE_CHECKING:
+    from .journal import Journal
+
 class FleetMem(VehicleRepo):
-    def __init__(self) -> None:
+    def __init__(self, journal: Optional["Journal"] = None) -> None:
         self._store: Dict[str, Vehicle] = {}
         self._lock = asyncio.Lock()
+        # опционально: локальная персистентность (снапшот + журнал мутаций)
+        self._journal = journal
+        if journal is not None:
+            state, records = journal.recover()
+            self._store = state or {}
+            for op, args in records:
+                self._apply(op, *args)
+            journal.attach(lambda: dict(self._store))
+
+    def _apply(self, op: str, *args) -> None:
+        if op == "put":
+            v, = args
+            self._store[v.id] = v
+        elif op == "status":
+            vehicle_id, status = args
+            if vehicle_id in self._store:
+                self._store[vehicle_id].status = VehicleStatus(status)
+
+    def _mutate(self, op: str, *args) -> None:
+        self._apply(op, *args)
+        if self._journal is not None:
+            # enum пишем значением: так запись в разы дешевле (де)сериализуется
+            self._journal.append(op, *(a.value if isinstance(a, Enum) else a for a in args))
+
+    async def aclose(self) -> None:
+        """Сбросить журнал на диск и отпустить каталог."""
+        if self._journal is not None:
+            await self._journal.aclose()
+            self._journal = None
 
     async def add(self, v: Vehicle) -> Vehicle:
         async with self._lock:
-            self._store[v.id] = v
+            self._mutate("put", v)
         return v
 
     async def get(self, vehicle_id: str) -> Optional[Vehicle]:
@@ -26,8 +59,13 @@ class FleetMem(VehicleRepo):
     async def set_status(self, vehicle_id: str, status: VehicleStatus) -> None:
         async with self._lock:
             if vehicle_id in self._store:
-                self._store[vehicle_id].status = status
+                self._mutate("status", vehicle_id, status)
 
     async def update(self, v: Vehicle) -> None:
         async with self._lock:
-            self._store[v.id] = v
+            self._mutate("put", v)
+
+    async def upsert_many(self, vs: List[Vehicle]) -> None:
+        async with self._lock:
+            for v in vs:
+                self._mutate("put", v)
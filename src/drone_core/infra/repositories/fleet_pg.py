@@ -115,6 +115,12 @@ class FleetPg(VehicleRepo):
             await s.commit()
             logger.info(f"✅ Updated drone {r.id} parameters.")
 
+    async def upsert_many(self, vs: List[Vehicle]) -> None:
+        """Пачка update() в одной сессии (вложенные session() переиспользуют коннект)."""
+        async with session():
+            for v in vs:
+                await self.update(v)
+
 
 # SQL для таблицы fleet:
 # CREATE TABLE fleet (
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import sqlite3
+from typing import List, Optional
+from drone_core.domain.models import Vehicle, VehicleStatus, LLA
+from drone_core.infra.db.sqlite import SqliteDb, get_db
+from .base import VehicleRepo
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vehicles (
+    id      TEXT PRIMARY KEY,
+    name    TEXT,
+    status  TEXT NOT NULL,
+    lat     REAL,
+    lon     REAL,
+    alt     REAL,
+    soc     REAL,
+    mode    TEXT,
+    last_ts REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS vehicles_status ON vehicles(status);
+"""
+
+_UPSERT = """
+INSERT INTO vehicles (id, name, status, lat, lon, alt, soc, mode, last_ts)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    name=excluded.name, status=excluded.status,
+    lat=excluded.lat, lon=excluded.lon, alt=excluded.alt,
+    soc=excluded.soc, mode=excluded.mode, last_ts=excluded.last_ts
+"""
+
+
+def _to_row(v: Vehicle) -> tuple:
+    pos = v.pos
+    return (
+        v.id, v.name, v.status.value,
+        pos.lat if pos else None, pos.lon if pos else None, pos.alt if pos else None,
+        v.soc, v.mode, v.last_ts,
+    )
+
+
+def _to_domain(r: sqlite3.Row) -> Vehicle:
+    pos = LLA(lat=r["lat"], lon=r["lon"], alt=r["alt"]) if r["lat"] is not None else None
+    return Vehicle(
+        id=r["id"], name=r["name"], status=VehicleStatus(r["status"]),
+        pos=pos, soc=r["soc"], mode=r["mode"], last_ts=r["last_ts"],
+    )
+
+
+class FleetSqlite(VehicleRepo):
+    """SQLite-реестр дронов (WAL, group commit — см. infra.db.sqlite)."""
+
+    def __init__(self, db: Optional[SqliteDb] = None) -> None:
+        self.db = db or get_db()
+
+    async def add(self, v: Vehicle) -> Vehicle:
+        await self.db.execute(_UPSERT, _to_row(v))
+        return v
+
+    async def get(self, vehicle_id: str) -> Optional[Vehicle]:
+        r = await self.db.fetchone("SELECT * FROM vehicles WHERE id = ?", (vehicle_id,))
+        return _to_domain(r) if r else None
+
+    async def list_all(self) -> List[Vehicle]:
+        return [_to_domain(r) for r in await self.db.fetchall("SELECT * FROM vehicles")]
+
+    async def list_free(self) -> List[Vehicle]:
+        rows = await self.db.fetchall("SELECT * FROM vehicles WHERE status = ?", (VehicleStatus.IDLE.value,))
+        return [_to_domain(r) for r in rows]
+
+    async def set_status(self, vehicle_id: str, status: VehicleStatus) -> None:
+        await self.db.execute("UPDATE vehicles SET status = ? WHERE id = ?", (status.value, vehicle_id))
+
+    async def update(self, v: Vehicle) -> None:
+        await self.db.execute(_UPSERT, _to_row(v))
+
+    async def upsert_many(self, vs: List[Vehicle]) -> None:
+        if vs:
+            await self.db.executemany(_UPSERT, [_to_row(v) for v in vs])
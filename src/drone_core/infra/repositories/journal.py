@@ -0,0 +1,290 @@
+"""
+journal.py — локальная персистентность для in-memory репозиториев.
+
+Append-only журнал мутаций + периодический компактирующий снапшот:
+
+    <dir>/snapshot.pkl          {"base": N, "state": ...}  — состояние до сегмента N
+    <dir>/journal.<seg>.log     записи [len:u32][crc32:u32][pickle((op, args))]
+
+fsync пачками (group commit): мутация возвращается сразу, на диск данные
+уходят не позже чем через fsync_interval. При рестарте: снапшот + хвост
+журнала; оборванная последняя запись (crc/длина) отрезается.
+
+Под event loop write+fsync пачки идут в фоновом потоке (to_thread): loop
+только отдаёт буфер в очередь. Очередь пишется строго по порядку под
+_io_lock; синхронный flush() (close, _rotate, работа без loop) дописывает
+её сам, дождавшись фоновой записи.
+
+Снапшот под event loop пишется в фоновом потоке: на loop только сброс
+буфера, переход на новый сегмент и копия словаря состояния (state_fn).
+Объекты внутри копии могут ещё меняться, пока поток их сериализует, — это
+безопасно: все мутации после перехода лежат в новом сегменте и при
+восстановлении применяются к снапшоту заново (записи идемпотентны).
+
+Файлы — pickle, читаются только этим же процессом/сервисом; не открывай
+журналы из недоверенных источников.
+"""
+from __future__ import annotations
+import asyncio
+import fcntl
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Iterator, List, Optional, Tuple
+
+log = logging.getLogger("repo-journal")
+
+_HDR = struct.Struct("<II")  # length, crc32
+_SNAPSHOT = "snapshot.pkl"
+
+
+class JournalLocked(RuntimeError):
+    """Каталог журнала уже открыт другим процессом."""
+
+
+class Journal:
+    def __init__(
+        self,
+        directory: str | Path,
+        fsync_interval: float = 0.05,
+        fsync_batch: int = 1024,
+        snapshot_every: int = 200_000,
+    ) -> None:
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self.snapshot_every = snapshot_every
+
+        # один писатель на каталог
+        self._lock_fd = os.open(self.dir / "LOCK", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self._lock_fd)
+            raise JournalLocked(f"journal {self.dir} is locked by another process")
+
+        self._buf = bytearray()
+        # пачки, отданные на запись, и фоновая запись очереди
+        self._chunks: Deque[bytes] = deque()
+        self._io_lock = threading.Lock()
+        self._write_task: Optional[asyncio.Future] = None
+        self._pending = 0
+        self._since_snapshot = 0
+        self._last_sync = time.monotonic()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._state_fn: Optional[Callable[[], Any]] = None
+        self._snapshot_task: Optional[asyncio.Future] = None
+        self._seg = 0
+        self._fh = None
+
+    # ---------- сегменты ----------
+    def _segments(self) -> List[int]:
+        segs = []
+        for p in self.dir.glob("journal.*.log"):
+            try:
+                segs.append(int(p.name.split(".")[1]))
+            except ValueError:
+                pass
+        return sorted(segs)
+
+    def _seg_path(self, seg: int) -> Path:
+        return self.dir / f"journal.{seg:08d}.log"
+
+    def _open_segment(self, seg: int) -> None:
+        with self._io_lock:
+            if self._fh is not None:
+                self._fh.close()
+            self._seg = seg
+            self._fh = open(self._seg_path(seg), "ab", buffering=0)
+
+    # ---------- восстановление ----------
+    def recover(self) -> Tuple[Any, Iterator[Tuple[str, tuple]]]:
+        """(state из снапшота или None, итератор записей хвоста). Итератор нужно дочитать до конца."""
+        base = 0
+        state = None
+        snap = self.dir / _SNAPSHOT
+        if snap.exists():
+            with open(snap, "rb") as f:
+                data = pickle.load(f)
+            base, state = data["base"], data["state"]
+        return state, self._replay(base)
+
+    def _replay(self, base: int) -> Iterator[Tuple[str, tuple]]:
+        segs = [s for s in self._segments() if s >= base]
+        count = 0
+        for seg in segs:
+            path = self._seg_path(seg)
+            with open(path, "rb") as f:
+                data = f.read()
+            off = 0
+            good = 0
+            while off + _HDR.size <= len(data):
+                length, crc = _HDR.unpack_from(data, off)
+                body = data[off + _HDR.size: off + _HDR.size + length]
+                if len(body) < length or zlib.crc32(body) != crc:
+                    break
+                yield pickle.loads(body)
+                count += 1
+                off += _HDR.size + length
+                good = off
+            if good < len(data):
+                log.warning(f"journal {path.name}: torn tail at {good}/{len(data)} bytes, truncating")
+                with open(path, "r+b") as f:
+                    f.truncate(good)
+        self._since_snapshot = count
+        self._open_segment(segs[-1] if segs else base)
+
+    # ---------- запись ----------
+    def attach(self, state_fn: Callable[[], Any]) -> None:
+        """state_fn() отдаёт копию состояния репозитория для снапшота (вызывается на event loop)."""
+        self._state_fn = state_fn
+
+    def append(self, op: str, *args: Any) -> None:
+        if self._fh is None:
+            self._open_segment(self._segments()[-1] if self._segments() else 0)
+        body = pickle.dumps((op, args), protocol=pickle.HIGHEST_PROTOCOL)
+        self._buf += _HDR.pack(len(body), zlib.crc32(body))
+        self._buf += body
+        self._pending += 1
+        self._since_snapshot += 1
+
+        if self._pending >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._flush_async()
+        elif self._flush_handle is None:
+            self._schedule_flush()
+
+        if self._state_fn is not None and self._since_snapshot >= self.snapshot_every:
+            self._maybe_snapshot()
+
+    def _maybe_snapshot(self) -> None:
+        if self._snapshot_task is not None:
+            return  # предыдущий ещё пишется
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.snapshot(self._state_fn())
+            return
+        base, old_segs = self._rotate()
+        self._snapshot_task = asyncio.ensure_future(
+            asyncio.to_thread(self._write_snapshot, base, self._state_fn(), old_segs), loop=loop)
+        self._snapshot_task.add_done_callback(self._snapshot_done)
+
+    def _snapshot_done(self, fut: asyncio.Future) -> None:
+        self._snapshot_task = None
+        if not fut.cancelled() and fut.exception() is not None:
+            # старые сегменты не удалены — восстановление идёт от прежнего снапшота
+            log.error(f"journal {self.dir.name}: snapshot failed: {fut.exception()!r}")
+
+    def _schedule_flush(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # без event loop — сбросится на следующем append/close
+        self._flush_handle = loop.call_later(self.fsync_interval, self._flush_async)
+
+    def _handoff(self) -> None:
+        """Буфер — в очередь записи."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._buf:
+            self._chunks.append(bytes(self._buf))
+            self._buf.clear()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _drain(self) -> None:
+        """Записать очередь по порядку и fsync (из потока или синхронно)."""
+        with self._io_lock:
+            if not self._chunks:
+                return
+            while self._chunks:
+                chunk = self._chunks.popleft()
+                try:
+                    self._fh.write(chunk)
+                except BaseException:
+                    self._chunks.appendleft(chunk)
+                    raise
+            os.fsync(self._fh.fileno())
+
+    def _flush_async(self) -> None:
+        """Group commit без блокировки loop; без loop — синхронно."""
+        self._handoff()
+        if self._write_task is not None or not self._chunks:
+            return  # очередь допишет текущая запись (см. _write_done)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._drain()
+            return
+        self._write_task = asyncio.ensure_future(asyncio.to_thread(self._drain), loop=loop)
+        self._write_task.add_done_callback(self._write_done)
+
+    def _write_done(self, fut: asyncio.Future) -> None:
+        self._write_task = None
+        if not fut.cancelled() and fut.exception() is not None:
+            # пачки остались в очереди — повторит следующий flush
+            log.error(f"journal {self.dir.name}: write failed: {fut.exception()!r}")
+        elif self._chunks:
+            self._flush_async()
+
+    def flush(self) -> None:
+        """Синхронно: всё принятое — на диске (ждёт фоновую запись, если она идёт)."""
+        self._handoff()
+        self._drain()
+
+    def snapshot(self, state: Any) -> None:
+        """Компакция: новое состояние пишется атомарно, старые сегменты удаляются."""
+        base, old_segs = self._rotate()
+        self._write_snapshot(base, state, old_segs)
+
+    def _rotate(self) -> Tuple[int, List[int]]:
+        """Сбросить буфер и перейти на новый сегмент; (база снапшота, сегменты до неё)."""
+        self.flush()
+        old_segs = self._segments()
+        base = self._seg + 1
+        self._open_segment(base)
+        self._since_snapshot = 0
+        return base, old_segs
+
+    def _write_snapshot(self, base: int, state: Any, old_segs: List[int]) -> None:
+        """Запись снапшота и удаление покрытых им сегментов (трогает только их — можно из потока)."""
+        tmp = self.dir / (_SNAPSHOT + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"base": base, "state": state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.dir / _SNAPSHOT)
+        dfd = os.open(self.dir, os.O_RDONLY)
+        try:
+            os.fsync(dfd)
+        finally:
+            os.close(dfd)
+        for seg in old_segs:
+            if seg < base:
+                self._seg_path(seg).unlink(missing_ok=True)
+        log.info(f"journal {self.dir.name}: snapshot written (base segment {base})")
+
+    async def aclose(self) -> None:
+        """close() после фоновой записи и начатого снапшота."""
+        for task in (self._write_task, self._snapshot_task):
+            if task is not None:
+                try:
+                    await task
+                except Exception:
+                    pass
+        self.close()
+
+    def close(self) -> None:
+        self.flush()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        os.close(self._lock_fd)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+from drone_core.domain.models import Mission, MissionStatus, Vehicle
+from drone_core.infra.db.change_feed import ChangeEvent, ChangeFeed, RESYNC
+from .base import VehicleRepo, MissionRepo
+
+log = logging.getLogger("live-view")
+
+_TERMINAL = {MissionStatus.COMPLETED, MissionStatus.ABORTED}
+
+ChangeListener = Callable[[ChangeEvent], None]
+
+
+class LiveView:
+    """
+    Локальный read-кэш fleet + активных миссий, который держится свежим
+    через ChangeFeed (LISTEN/NOTIFY). Работа пропорциональна потоку изменений,
+    а не размеру таблиц: полное перечитывание только на старте и при RESYNC.
+    """
+
+    def __init__(self, fleet: VehicleRepo, missions: MissionRepo, feed: ChangeFeed) -> None:
+        self.fleet = fleet
+        self.missions = missions
+        self.feed = feed
+        self.vehicles: Dict[str, Vehicle] = {}
+        self.active_missions: Dict[str, Mission] = {}
+        self._listeners: List[ChangeListener] = []
+        self._invalidators: List[ChangeListener] = []
+        self.ready = asyncio.Event()
+
+    def add_listener(self, fn: ChangeListener) -> None:
+        """fn(event) вызывается после применения события к кэшу."""
+        self._listeners.append(fn)
+
+    def add_invalidator(self, fn: ChangeListener) -> None:
+        """
+        fn(event) вызывается до перечитывания строк пачки — для сброса кэшей
+        (CachedFleetRepo.on_change), через которые LiveView и читает.
+        """
+        self._invalidators.append(fn)
+
+    async def run(self) -> None:
+        # LISTEN до снапшота: события, пришедшие во время чтения, не потеряются
+        await self.feed.start()
+        await self._resync()
+        self.ready.set()
+        while True:
+            first = await self.feed.get()
+            await self._apply_batch([first, *self.feed.drain()])
+
+    async def _resync(self) -> None:
+        self.vehicles = {v.id: v for v in await self.fleet.list_all()}
+        self.active_missions = {m.id: m for m in await self.missions.list_active()}
+        log.info(f"resync: {len(self.vehicles)} vehicles, {len(self.active_missions)} active missions")
+
+    async def _apply_batch(self, events: List[ChangeEvent]) -> None:
+        if any(ev.op == RESYNC for ev in events):
+            resync = ChangeEvent(table="*", op=RESYNC)
+            self._notify(resync, self._invalidators)
+            await self._resync()
+            self._notify(resync)
+            return
+        # иначе get() ниже вернул бы из кэша строку до изменения и снова её закэшировал
+        for ev in events:
+            self._notify(ev, self._invalidators)
+        # миссию перечитываем один раз на пачку, сколько бы строк (waypoints) ни поменялось
+        mission_ids: Dict[str, ChangeEvent] = {}
+        for ev in events:
+            if ev.table == "vehiclerow":
+                await self._apply_vehicle(ev)
+                self._notify(ev)
+            elif ev.table in ("missionrow", "waypointrow") and ev.id:
+                mission_ids[ev.id] = ev
+        for mid, ev in mission_ids.items():
+            await self._apply_mission(mid, ev)
+            self._notify(ev)
+
+    async def _apply_vehicle(self, ev: ChangeEvent) -> None:
+        if not ev.id:
+            return
+        if ev.op == "DELETE":
+            self.vehicles.pop(ev.id, None)
+            return
+        v: Optional[Vehicle] = None
+        if ev.row is not None:
+            from .fleet_pg import VehicleRow, _to_domain
+            try:
+                v = _to_domain(VehicleRow(**ev.row))
+            except Exception:
+                v = None
+        if v is None:
+            v = await self.fleet.get(ev.id)
+        if v is not None:
+            self.vehicles[v.id] = v
+
+    async def _apply_mission(self, mission_id: str, ev: ChangeEvent) -> None:
+        m = None if (ev.op == "DELETE" and ev.table == "missionrow") else await self.missions.get(mission_id)
+        if m is None or m.status in _TERMINAL:
+            self.active_missions.pop(mission_id, None)
+        else:
+            self.active_missions[mission_id] = m
+
+    def _notify(self, ev: ChangeEvent, listeners: Optional[List[ChangeListener]] = None) -> None:
+        for fn in list(self._listeners if listeners is None else listeners):
+            try:
+                fn(ev)
+            except Exception as e:
+                log.exception(f"listener error: {e}")
+
+    # ---------- чтение ----------
+    def list_vehicles(self) -> List[Vehicle]:
+        return list(self.vehicles.values())
+
+    def list_active_missions(self) -> List[Mission]:
+        return list(self.active_missions.values())
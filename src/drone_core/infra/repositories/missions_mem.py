@@ -1,17 +1,57 @@
 from __future__ import annotations
 import asyncio
-from typing import Dict, List, Optional
+from enum import Enum
+from typing import Dict, List, Optional, TYPE_CHECKING
 from drone_core.domain.models import Mission, MissionStatus, Waypoint
 from .base import MissionRepo
 
+if TYPE_CHECKING:
+    from .journal import Journal
+
 class MissionsMem(MissionRepo):
-    def __init__(self) -> None:
+    def __init__(self, journal: Optional["Journal"] = None) -> None:
         self._store: Dict[str, Mission] = {}
         self._lock = asyncio.Lock()
+        # опционально: локальная персистентность (снапшот + журнал мутаций)
+        self._journal = journal
+        if journal is not None:
+            state, records = journal.recover()
+            self._store = state or {}
+            for op, args in records:
+                self._apply(op, *args)
+            journal.attach(lambda: dict(self._store))
+
+    def _apply(self, op: str, *args) -> None:
+        if op == "put":
+            m, = args
+            self._store[m.id] = m
+            return
+        mission_id, value = args
+        m = self._store.get(mission_id)
+        if m is None:
+            return
+        if op == "status":
+            m.status = MissionStatus(value)
+        elif op == "vehicle":
+            m.vehicle_id = value
+        elif op == "waypoints":
+            m.waypoints = value
+
+    def _mutate(self, op: str, *args) -> None:
+        self._apply(op, *args)
+        if self._journal is not None:
+            # enum пишем значением: так запись в разы дешевле (де)сериализуется
+            self._journal.append(op, *(a.value if isinstance(a, Enum) else a for a in args))
+
+    async def aclose(self) -> None:
+        """Сбросить журнал на диск и отпустить каталог."""
+        if self._journal is not None:
+            await self._journal.aclose()
+            self._journal = None
 
     async def create(self, m: Mission) -> Mission:
         async with self._lock:
-            self._store[m.id] = m
+            self._mutate("put", m)
         return m
 
     async def get(self, mission_id: str) -> Optional[Mission]:
@@ -20,17 +60,17 @@ class MissionsMem(MissionRepo):
     async def set_status(self, mission_id: str, status: MissionStatus) -> None:
         async with self._lock:
             if mission_id in self._store:
-                self._store[mission_id].status = status
+                self._mutate("status", mission_id, status)
 
     async def assign_vehicle(self, mission_id: str, vehicle_id: str) -> None:
         async with self._lock:
             if mission_id in self._store:
-                self._store[mission_id].vehicle_id = vehicle_id
+                self._mutate("vehicle", mission_id, vehicle_id)
 
     async def save_waypoints(self, mission_id: str, wps: List[Waypoint]) -> None:
         async with self._lock:
             if mission_id in self._store:
-                self._store[mission_id].waypoints = wps
+                self._mutate("waypoints", mission_id, wps)
 
     async def list_active(self) -> List[Mission]:
         return [m for m in self._store.values() if m.status not in
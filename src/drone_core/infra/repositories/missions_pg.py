@@ -2,7 +2,7 @@ from __future__ import annotations
 from typing import List, Optional
 from sqlmodel import SQLModel, Field, Relationship, select
 from drone_core.domain.models import Mission, MissionStatus, Waypoint, LLA
-from drone_core.infra.db.postgres import session
+from drone_core.infra.db.postgres import get_engine, session
 from .base import MissionRepo
 
 class MissionRow(SQLModel, table=True):
@@ -17,6 +17,7 @@ class MissionRow(SQLModel, table=True):
     priority: str
     vehicle_id: str | None = None
     status: str
+    eta_s: float | None = None
     created_at: str
     waypoints: list["WaypointRow"] = Relationship(back_populates="mission")
 
@@ -31,6 +32,11 @@ class WaypointRow(SQLModel, table=True):
     hold_sec: float
     mission: MissionRow | None = Relationship(back_populates="waypoints")
 
+async def migrate() -> None:
+    """Колонки, добавленные после создания таблицы (create_all существующую не меняет)."""
+    async with get_engine().begin() as conn:
+        await conn.exec_driver_sql("ALTER TABLE missionrow ADD COLUMN IF NOT EXISTS eta_s DOUBLE PRECISION")
+
 def _to_domain(m: MissionRow, wps: List[WaypointRow]) -> Mission:
     return Mission(
         id=m.id,
@@ -40,6 +46,7 @@ def _to_domain(m: MissionRow, wps: List[WaypointRow]) -> Mission:
         priority=m.priority,  # type: ignore
         vehicle_id=m.vehicle_id,
         status=MissionStatus(m.status),
+        eta_s=m.eta_s,
         waypoints=[Waypoint(kind=w.kind, order=w.order, pos=LLA(lat=w.lat, lon=w.lon, alt=w.alt), hold_sec=w.hold_sec) for w in sorted(wps, key=lambda x: x.order)],
         created_at=m.created_at,  # str/iso — как у тебя в домене
     )
@@ -51,7 +58,7 @@ class MissionsPg(MissionRepo):
             pickup_lat=m.pickup.lat, pickup_lon=m.pickup.lon, pickup_alt=m.pickup.alt,
             drop_lat=m.dropoff.lat, drop_lon=m.dropoff.lon, drop_alt=m.dropoff.alt,
             payload_kg=m.payload_kg, priority=m.priority,
-            vehicle_id=m.vehicle_id, status=m.status.value,
+            vehicle_id=m.vehicle_id, status=m.status.value, eta_s=m.eta_s,
             created_at=m.created_at.isoformat(),
         )
         async with session() as s:
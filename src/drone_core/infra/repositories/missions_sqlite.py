@@ -0,0 +1,99 @@
+from __future__ import annotations
+import json
+import sqlite3
+from typing import List, Optional
+from pydantic import TypeAdapter
+from drone_core.domain.models import Mission, MissionStatus, Waypoint, LLA
+from drone_core.infra.db.sqlite import SqliteDb, get_db
+from .base import MissionRepo
+
+# маршрут и точки храним JSON-ом в строке миссии: миссия читается одним запросом
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS missions (
+    id         TEXT PRIMARY KEY,
+    vehicle_id TEXT,
+    status     TEXT NOT NULL,
+    priority   TEXT NOT NULL,
+    payload_kg REAL NOT NULL,
+    pickup     TEXT,
+    dropoff    TEXT,
+    waypoints  TEXT NOT NULL DEFAULT '[]',
+    eta_s      REAL,
+    created_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS missions_active ON missions(status)
+    WHERE status NOT IN ('COMPLETED', 'ABORTED');
+CREATE INDEX IF NOT EXISTS missions_vehicle ON missions(vehicle_id);
+"""
+
+_WAYPOINTS = TypeAdapter(List[Waypoint])
+
+
+async def migrate(db: SqliteDb) -> None:
+    """Колонки, добавленные после создания таблицы (CREATE IF NOT EXISTS их не добавит)."""
+    cols = {r["name"] for r in await db.fetchall("PRAGMA table_info(missions)")}
+    if "eta_s" not in cols:
+        await db.execute("ALTER TABLE missions ADD COLUMN eta_s REAL")
+
+
+def _lla_json(p: Optional[LLA]) -> Optional[str]:
+    return p.model_dump_json() if p is not None else None
+
+
+def _to_row(m: Mission) -> tuple:
+    return (
+        m.id, m.vehicle_id, m.status.value, m.priority, m.payload_kg,
+        _lla_json(m.pickup), _lla_json(m.dropoff),
+        _WAYPOINTS.dump_json(m.waypoints).decode(), m.eta_s, m.created_at.isoformat(),
+    )
+
+
+def _to_domain(r: sqlite3.Row) -> Mission:
+    return Mission(
+        id=r["id"],
+        vehicle_id=r["vehicle_id"],
+        status=MissionStatus(r["status"]),
+        priority=r["priority"],
+        payload_kg=r["payload_kg"],
+        pickup=json.loads(r["pickup"]) if r["pickup"] else None,
+        dropoff=json.loads(r["dropoff"]) if r["dropoff"] else None,
+        waypoints=_WAYPOINTS.validate_json(r["waypoints"]),
+        eta_s=r["eta_s"],
+        created_at=r["created_at"],
+    )
+
+
+class MissionsSqlite(MissionRepo):
+    def __init__(self, db: Optional[SqliteDb] = None) -> None:
+        self.db = db or get_db()
+
+    async def create(self, m: Mission) -> Mission:
+        await self.db.execute(
+            "INSERT OR REPLACE INTO missions (id, vehicle_id, status, priority, payload_kg,"
+            " pickup, dropoff, waypoints, eta_s, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            _to_row(m),
+        )
+        return m
+
+    async def get(self, mission_id: str) -> Optional[Mission]:
+        r = await self.db.fetchone("SELECT * FROM missions WHERE id = ?", (mission_id,))
+        return _to_domain(r) if r else None
+
+    async def set_status(self, mission_id: str, status: MissionStatus) -> None:
+        await self.db.execute("UPDATE missions SET status = ? WHERE id = ?", (status.value, mission_id))
+
+    async def assign_vehicle(self, mission_id: str, vehicle_id: str) -> None:
+        await self.db.execute("UPDATE missions SET vehicle_id = ? WHERE id = ?", (vehicle_id, mission_id))
+
+    async def save_waypoints(self, mission_id: str, wps: List[Waypoint]) -> None:
+        await self.db.execute(
+            "UPDATE missions SET waypoints = ? WHERE id = ?",
+            (_WAYPOINTS.dump_json(wps).decode(), mission_id),
+        )
+
+    async def list_active(self) -> List[Mission]:
+        # литерал (не параметры), иначе планировщик не возьмёт частичный индекс missions_active
+        rows = await self.db.fetchall(
+            "SELECT * FROM missions WHERE status NOT IN ('COMPLETED', 'ABORTED')"
+        )
+        return [_to_domain(r) for r in rows]
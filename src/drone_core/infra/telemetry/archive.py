@@ -0,0 +1,306 @@
+"""
+archive.py — архив истории телеметрии в Parquet.
+
+Сэмплы копятся колонками в памяти и раз в flush_sec (или по batch_rows)
+уходят в файлы, разложенные hive-партициями:
+
+    <root>/channel=pose/date=2026-10-19/hour=13/part-<pid>-<n>.parquet
+
+Внутри файла — vehicle, ts и поля канала (см. ring_store.CHANNELS), сжатие
+zstd. Борт — колонка, а не партиция: иначе на каждый борт свой файл и
+row group на flush из десятков строк. Каждый flush — row group на канал
+и час со строками, упорядоченными по борту (vehicle словарный, min/max
+vehicle и ts в статистике → pushdown). Писатель партиции держится открытым
+до смены часа, превышения max_file_bytes или вытеснения из LRU открытых
+файлов. Пока файл открыт, он называется .part-*.inprogress (dataset-ы
+pyarrow пропускают имена с точкой) и переименовывается при закрытии, когда
+дописан footer.
+
+Файлы .inprogress, брошенные упавшим процессом, разбираются при старте
+архиватора (см. recover_inprogress): с целым footer — переименовываются,
+без него (данные не читаются) — удаляются.
+
+pyarrow — опциональная зависимость, импортируется при создании архиватора.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ring_store import CHANNELS
+
+log = logging.getLogger("telem-archive")
+
+PARTITION_FIELDS = ("channel", "date", "hour")
+
+
+def _pa():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    return pa, pq
+
+
+def _date_hour(hour_key: int) -> Tuple[str, int]:
+    dt = datetime.fromtimestamp(hour_key * 3600, tz=timezone.utc)
+    return dt.strftime("%Y-%m-%d"), dt.hour
+
+
+class _Buffer:
+    """Колоночный буфер одного канала."""
+
+    def __init__(self, fields: Tuple[str, ...]) -> None:
+        self.fields = fields
+        self.vehicle: List[str] = []
+        self.ts: List[float] = []
+        self.cols: List[List[float]] = [[] for _ in fields]
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+
+class TelemetryArchiver:
+    def __init__(
+        self,
+        root: str,
+        channels: Optional[Mapping[str, Tuple[str, ...]]] = None,
+        flush_sec: float = 30.0,
+        batch_rows: int = 200_000,
+        max_file_bytes: int = 64 * 1024 * 1024,
+        max_open_files: int = 16,
+        compression: str = "zstd",
+    ) -> None:
+        pa, _ = _pa()
+        self.root = Path(root)
+        self.channels: Dict[str, Tuple[str, ...]] = dict(channels or CHANNELS)
+        self.flush_sec = flush_sec
+        self.batch_rows = batch_rows
+        self.max_file_bytes = max_file_bytes
+        self.max_open_files = max_open_files
+        self.compression = compression
+        self._schemas = {
+            ch: pa.schema([("vehicle", pa.string()), ("ts", pa.float64())] + [(f, pa.float64()) for f in fields])
+            for ch, fields in self.channels.items()
+        }
+        self._buffers: Dict[str, _Buffer] = {ch: _Buffer(f) for ch, f in self.channels.items()}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        # (channel, hour_key) -> (ParquetWriter, path); трогается только из _executor
+        self._writers: "OrderedDict[Tuple[str, int], Tuple[Any, Path]]" = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="telem-archive")
+        self._seq = 0
+        self.rows_written = 0
+        self.files_closed = 0
+        recover_inprogress(self.root)
+
+    # --- приём (event loop) ---
+    def add(self, veh_id: str, channel: str, ts: float, payload: Mapping[str, Any]) -> bool:
+        buf = self._buffers.get(channel)
+        if buf is None:
+            return False
+        buf.vehicle.append(veh_id)
+        buf.ts.append(ts)
+        for col, f in zip(buf.cols, buf.fields):
+            v = payload.get(f)
+            try:
+                col.append(float(v) if v is not None else np.nan)
+            except (TypeError, ValueError):
+                col.append(np.nan)
+        self._pending += 1
+        return True
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def due(self) -> bool:
+        return self._pending >= self.batch_rows or (
+            self._pending > 0 and time.monotonic() - self._last_flush >= self.flush_sec
+        )
+
+    def _swap(self) -> Dict[str, _Buffer]:
+        out = {ch: b for ch, b in self._buffers.items() if len(b)}
+        self._buffers = {ch: _Buffer(f) for ch, f in self.channels.items()}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        return out
+
+    async def flush(self) -> int:
+        """Записать накопленное в фоновом потоке; возвращает число строк."""
+        batches = self._swap()
+        if not batches:
+            return 0
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._write, batches)
+
+    async def close(self) -> None:
+        await self.flush()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._close_all)
+        self._executor.shutdown(wait=True)
+
+    def close_sync(self) -> None:
+        batches = self._swap()
+        self._executor.submit(self._write, batches).result()
+        self._executor.submit(self._close_all).result()
+        self._executor.shutdown(wait=True)
+
+    # --- запись (поток _executor) ---
+    def _write(self, batches: Dict[str, _Buffer]) -> int:
+        pa, _ = _pa()
+        rows = 0
+        current_hour = int(time.time() // 3600)
+        for channel, buf in batches.items():
+            ts = np.asarray(buf.ts, dtype=np.float64)
+            table = pa.table(
+                [pa.array(buf.vehicle, type=pa.string()), pa.array(ts)]
+                + [pa.array(np.asarray(c, dtype=np.float64)) for c in buf.cols],
+                schema=self._schemas[channel],
+            )
+            _, veh_codes = np.unique(np.asarray(buf.vehicle), return_inverse=True)
+            hours = (ts // 3600).astype(np.int64)
+            # по часу, внутри — по борту; lexsort стабилен — порядок поступления сохраняется
+            order = np.lexsort((veh_codes, hours))
+            h_sorted = hours[order]
+            cut = np.flatnonzero(h_sorted[1:] != h_sorted[:-1]) + 1
+            for idx in np.split(order, cut):
+                key = (channel, int(hours[idx[0]]))
+                self._writer(key).write_table(table.take(pa.array(idx)))
+                rows += len(idx)
+                self._maybe_roll(key)
+        # партиции прошедших часов больше не пополняются — закрываем
+        for key in [k for k in self._writers if k[1] < current_hour - 1]:
+            self._close(key)
+        self.rows_written += rows
+        return rows
+
+    def _writer(self, key: Tuple[str, int]):
+        item = self._writers.get(key)
+        if item is not None:
+            self._writers.move_to_end(key)
+            return item[0]
+        _, pq = _pa()
+        channel, hour_key = key
+        date, hour = _date_hour(hour_key)
+        part = self.root / f"channel={channel}" / f"date={date}" / f"hour={hour:02d}"
+        part.mkdir(parents=True, exist_ok=True)
+        self._seq += 1
+        path = part / f".part-{os.getpid()}-{int(time.time())}-{self._seq}.inprogress"
+        writer = pq.ParquetWriter(str(path), self._schemas[channel], compression=self.compression,
+                                  use_dictionary=["vehicle"])
+        self._writers[key] = (writer, path)
+        while len(self._writers) > self.max_open_files:
+            self._close(next(iter(self._writers)))
+        return writer
+
+    def _maybe_roll(self, key: Tuple[str, int]) -> None:
+        item = self._writers.get(key)
+        if item is not None and item[1].stat().st_size >= self.max_file_bytes:
+            self._close(key)
+
+    def _close(self, key: Tuple[str, int]) -> None:
+        item = self._writers.pop(key, None)
+        if item is not None:
+            writer, path = item
+            writer.close()
+            path.rename(_final_path(path))
+            self.files_closed += 1
+
+    def _close_all(self) -> None:
+        for key in list(self._writers):
+            self._close(key)
+
+
+def _final_path(path: Path) -> Path:
+    return path.with_name(path.name[1:].replace(".inprogress", ".parquet"))
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return False  # архиватор этого процесса ещё ничего не открыл — файл от прежнего процесса с тем же pid
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def recover_inprogress(root: str | Path) -> Tuple[int, int]:
+    """
+    Разобрать .part-*.inprogress, брошенные упавшими процессами (писатель
+    которых мёртв; файлы живых шардов не трогаются): с целым footer —
+    переименовать в .parquet, иначе удалить. Возвращает (восстановлено, удалено).
+    """
+    _, pq = _pa()
+    recovered = removed = 0
+    for path in Path(root).glob("channel=*/date=*/hour=*/.part-*.inprogress"):
+        try:
+            pid = int(path.name.split("-")[1])
+        except (IndexError, ValueError):
+            continue
+        if _pid_alive(pid):
+            continue
+        try:
+            pq.read_metadata(str(path))
+        except Exception:
+            size = path.stat().st_size if path.exists() else 0
+            path.unlink(missing_ok=True)
+            removed += 1
+            log.warning(f"archive: dropped unfinished {path} ({size} bytes, no footer)")
+            continue
+        path.rename(_final_path(path))
+        recovered += 1
+    if recovered:
+        log.info(f"archive: recovered {recovered} finished .inprogress files")
+    return recovered, removed
+
+
+def read_telemetry(
+    root: str,
+    channel: str,
+    vehicles: Optional[Sequence[str]] = None,
+    t_from: Optional[float] = None,
+    t_to: Optional[float] = None,
+    columns: Optional[Sequence[str]] = None,
+):
+    """
+    Прочитать архив канала в pyarrow.Table. Фильтр по дате отсекает каталоги,
+    фильтры по ts и борту — row group'ы по статистике.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    # датасет — только каталог канала: у каналов разные колонки, а pyarrow
+    # берёт схему из первого найденного файла
+    part_schema = pa.schema([("date", pa.string()), ("hour", pa.int32())])
+    partitioning = ds.partitioning(part_schema, flavor="hive")
+    base = Path(root) / f"channel={channel}"
+    if not base.exists():
+        return None
+    schema = None
+    if channel in CHANNELS:
+        schema = pa.schema([("vehicle", pa.string()), ("ts", pa.float64())]
+                           + [(f, pa.float64()) for f in CHANNELS[channel]]
+                           + list(part_schema))
+    dataset = ds.dataset(str(base), schema=schema, format="parquet", partitioning=partitioning)
+
+    flt = ds.scalar(True)
+    if vehicles:
+        flt &= ds.field("vehicle").isin(list(vehicles))
+    if t_from is not None:
+        flt &= ds.field("date") >= datetime.fromtimestamp(t_from, tz=timezone.utc).strftime("%Y-%m-%d")
+        flt &= ds.field("ts") >= t_from
+    if t_to is not None:
+        flt &= ds.field("date") <= datetime.fromtimestamp(t_to, tz=timezone.utc).strftime("%Y-%m-%d")
+        flt &= ds.field("ts") <= t_to
+    cols = None if columns is None else list(dict.fromkeys(["vehicle", "ts", *columns]))
+    return dataset.to_table(columns=cols, filter=flt).sort_by([("vehicle", "ascending"), ("ts", "ascending")])
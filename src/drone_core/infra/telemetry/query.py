@@ -0,0 +1,121 @@
+"""
+query.py — запросы к истории телеметрии ingest (TelemetryStore) через шину.
+
+TelemetryStore живёт в процессе telemetry_ingest; оркестратор и UI читают
+его запросом/ответом по MQTT:
+
+    telem_query/request              {"id", "reply_to", "vehicle_id", "channel",
+                                      "seconds" | "t_from"/"t_to" | ничего (latest),
+                                      "max_points"}
+    telem_query/reply/<client_id>    {"id", "shard", "vehicle_id", "channel",
+                                      "columns": {ts: [...], lat: [...], ...}}
+                                     или {"id", "error"}
+
+При шардировании hash отвечает только шард, владеющий бортом. В режиме
+share история борта разбита между шардами — клиент берёт первый ответ,
+т.е. фрагмент (см. telemetry_ingest).
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from drone_core.infra.messaging.bus import EventBus, Message
+from drone_core.infra.messaging.topics import TELEM_QUERY, telem_query_reply
+from .ring_store import CHANNELS, TelemetryStore
+
+log = logging.getLogger("telem-query")
+
+DEFAULT_MAX_POINTS = 1000
+MAX_POINTS = 10_000
+
+
+def _column(a: np.ndarray) -> List[Optional[float]]:
+    # NaN (нет значения) — null: JSON без NaN
+    return [None if x != x else x for x in a.tolist()]
+
+
+def answer(store: TelemetryStore, req: Dict[str, Any], shard: int = 0) -> Dict[str, Any]:
+    """Ответ на запрос по локальному хранилищу."""
+    vid, channel = str(req.get("vehicle_id") or ""), str(req.get("channel") or "pose")
+    out: Dict[str, Any] = {"id": req.get("id"), "shard": shard, "vehicle_id": vid, "channel": channel}
+    if channel not in CHANNELS:
+        out["error"] = f"unknown channel {channel!r}"
+        return out
+    ring = store.ring(vid, channel)
+    if ring is None:
+        out["columns"] = None
+        return out
+    try:
+        if req.get("seconds") is not None:
+            block = ring.window(float(req["seconds"]))
+        elif req.get("t_from") is not None or req.get("t_to") is not None:
+            t_from = float(req["t_from"]) if req.get("t_from") is not None else float("-inf")
+            t_to = float(req["t_to"]) if req.get("t_to") is not None else float("inf")
+            block = ring.between(t_from, t_to)
+        else:
+            block = ring.view()[:, -1:]
+        max_points = max(1, min(int(req.get("max_points") or DEFAULT_MAX_POINTS), MAX_POINTS))
+    except (TypeError, ValueError) as e:
+        out["error"] = f"bad request: {e}"
+        return out
+    n = block.shape[1]
+    if n > max_points:
+        # равномерная выборка, последний сэмпл — всегда
+        block = block[:, np.linspace(0, n - 1, max_points).round().astype(np.int64)]
+    out["columns"] = {name: _column(block[k]) for k, name in enumerate(ring.columns)}
+    return out
+
+
+class TelemetryQueryClient:
+    """Клиент запросов к ingest; ответы приходят в свой топик telem_query/reply/<client_id>."""
+
+    def __init__(self, bus: EventBus, client_id: Optional[str] = None, timeout: float = 1.0) -> None:
+        self.bus = bus
+        self.reply_topic = telem_query_reply(client_id or f"q-{os.getpid()}")
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._started = False
+
+    def start(self) -> None:
+        if not self._started:
+            self.bus.subscribe(self.reply_topic, self._on_reply, qos=0)
+            self._started = True
+
+    def _on_reply(self, msg: Message) -> None:
+        """paho-поток: ответ — в future запроса на event loop."""
+        payload = msg.payload if isinstance(msg.payload, dict) else {}
+        fut = self._pending.get(str(payload.get("id")))
+        if fut is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(_resolve, fut, payload)
+
+    async def query(self, vehicle_id: str, channel: str = "pose", *, seconds: Optional[float] = None,
+                    t_from: Optional[float] = None, t_to: Optional[float] = None,
+                    max_points: int = DEFAULT_MAX_POINTS, timeout: Optional[float] = None
+                    ) -> Optional[Dict[str, Any]]:
+        """Ответ ingest ({"columns": ...} или {"error": ...}); None — никто не ответил за timeout."""
+        self.start()
+        self._loop = asyncio.get_running_loop()
+        qid = f"{os.getpid()}-{next(self._ids)}"
+        fut = self._loop.create_future()
+        self._pending[qid] = fut
+        req = {"id": qid, "reply_to": self.reply_topic, "vehicle_id": vehicle_id, "channel": channel,
+               "seconds": seconds, "t_from": t_from, "t_to": t_to, "max_points": max_points}
+        try:
+            self.bus.publish(TELEM_QUERY, req, qos=0)
+            return await asyncio.wait_for(fut, self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._pending.pop(qid, None)
+
+
+def _resolve(fut: asyncio.Future, payload: Dict[str, Any]) -> None:
+    if not fut.done():
+        fut.set_result(payload)
@@ -0,0 +1,160 @@
+"""
+ring_store.py — колоночное хранилище истории телеметрии в кольцевых буферах NumPy.
+
+На каждый борт и канал (pose / battery / health) — фиксированный буфер float64:
+строка на колонку (ts, lat, lon, ...), O(1) append, жёсткий лимит памяти на борт.
+
+Каждая запись пишется дважды — в слот i и i+capacity. За счёт этого любое
+окно из последних <= capacity сэмплов лежит непрерывно, и запросы
+"latest" / "последние N секунд" отдают view без копирования.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+# канал -> поля payload (ts идёт отдельной первой колонкой)
+CHANNELS: Dict[str, Tuple[str, ...]] = {
+    "pose": ("lat", "lon", "alt"),
+    "battery": ("voltage_v", "current_a", "remaining_pct"),
+    "health": ("gps_ok", "home_ok", "armed", "in_air"),
+}
+
+DEFAULT_MAX_BYTES_PER_VEHICLE = 4 * 1024 * 1024
+
+
+class ChannelRing:
+    """Кольцевой буфер одного канала одного борта."""
+
+    def __init__(self, fields: Tuple[str, ...], capacity: int) -> None:
+        self.columns: Tuple[str, ...] = ("ts",) + tuple(fields)
+        self.capacity = max(1, int(capacity))
+        self._col = {name: i for i, name in enumerate(self.columns)}
+        self._data = np.full((len(self.columns), 2 * self.capacity), np.nan, dtype=np.float64)
+        self._head = 0
+        self._size = 0
+        self.last_ts = float("-inf")
+        self.out_of_order = 0
+
+    @staticmethod
+    def bytes_per_sample(n_fields: int) -> int:
+        return 2 * 8 * (n_fields + 1)
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, ts: float, values: Iterable[float]) -> bool:
+        """Добавить сэмпл; запаздывающие (ts меньше последнего) отбрасываются."""
+        if ts < self.last_ts:
+            self.out_of_order += 1
+            return False
+        i = self._head
+        col = (ts, *values)
+        self._data[:, i] = col
+        self._data[:, i + self.capacity] = col
+        self._head = (i + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+        self.last_ts = ts
+        return True
+
+    def view(self) -> np.ndarray:
+        """Все хранимые сэмплы, (колонки × N), от старых к новым — view."""
+        start = (self._head - self._size) % self.capacity
+        return self._data[:, start:start + self._size]
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        if self._size == 0:
+            return None
+        i = (self._head - 1) % self.capacity
+        return {name: float(self._data[k, i]) for name, k in self._col.items()}
+
+    def window(self, seconds: float, now: Optional[float] = None) -> np.ndarray:
+        """Сэмплы с ts >= now - seconds (now по умолчанию — ts последнего сэмпла) — view."""
+        v = self.view()
+        if self._size == 0:
+            return v
+        ref = self.last_ts if now is None else now
+        start = int(np.searchsorted(v[0], ref - seconds, side="left"))
+        return v[:, start:]
+
+    def between(self, t_from: float, t_to: float) -> np.ndarray:
+        v = self.view()
+        ts = v[0]
+        lo = int(np.searchsorted(ts, t_from, side="left"))
+        hi = int(np.searchsorted(ts, t_to, side="right"))
+        return v[:, lo:hi]
+
+    def as_columns(self, block: np.ndarray) -> Dict[str, np.ndarray]:
+        return {name: block[k] for name, k in self._col.items()}
+
+
+class TelemetryStore:
+    """
+    История телеметрии по бортам: store[veh_id][channel] -> ChannelRing.
+
+    Лимит max_bytes_per_vehicle делится между каналами поровну; буфер канала
+    создаётся при первом сэмпле.
+    """
+
+    def __init__(self, max_bytes_per_vehicle: int = DEFAULT_MAX_BYTES_PER_VEHICLE,
+                 channels: Optional[Mapping[str, Tuple[str, ...]]] = None) -> None:
+        self.channels: Dict[str, Tuple[str, ...]] = dict(channels or CHANNELS)
+        self.max_bytes_per_vehicle = max_bytes_per_vehicle
+        self._rings: Dict[str, Dict[str, ChannelRing]] = {}
+
+    def _capacity(self, fields: Tuple[str, ...]) -> int:
+        per_channel = self.max_bytes_per_vehicle // max(1, len(self.channels))
+        return max(1, per_channel // ChannelRing.bytes_per_sample(len(fields)))
+
+    def ring(self, veh_id: str, channel: str, create: bool = False) -> Optional[ChannelRing]:
+        rings = self._rings.get(veh_id)
+        r = rings.get(channel) if rings else None
+        if r is None and create:
+            fields = self.channels[channel]
+            r = ChannelRing(fields, self._capacity(fields))
+            self._rings.setdefault(veh_id, {})[channel] = r
+        return r
+
+    def append(self, veh_id: str, channel: str, ts: float, payload: Mapping[str, Any]) -> bool:
+        """Добавить сэмпл из payload (dict); отсутствующие поля — NaN, bool -> 0/1."""
+        fields = self.channels.get(channel)
+        if fields is None:
+            return False
+        values = []
+        for f in fields:
+            v = payload.get(f)
+            try:
+                values.append(float(v) if v is not None else np.nan)
+            except (TypeError, ValueError):
+                values.append(np.nan)
+        return self.ring(veh_id, channel, create=True).append(ts, values)
+
+    def latest(self, veh_id: str, channel: str) -> Optional[Dict[str, float]]:
+        r = self.ring(veh_id, channel)
+        return r.latest() if r else None
+
+    def last_seconds(self, veh_id: str, channel: str, seconds: float,
+                     now: Optional[float] = None) -> Optional[Dict[str, np.ndarray]]:
+        """{колонка: view} за последние seconds секунд."""
+        r = self.ring(veh_id, channel)
+        if r is None:
+            return None
+        return r.as_columns(r.window(seconds, now))
+
+    def between(self, veh_id: str, channel: str, t_from: float, t_to: float) -> Optional[Dict[str, np.ndarray]]:
+        r = self.ring(veh_id, channel)
+        if r is None:
+            return None
+        return r.as_columns(r.between(t_from, t_to))
+
+    def vehicles(self) -> List[str]:
+        return list(self._rings)
+
+    def memory_bytes(self, veh_id: Optional[str] = None) -> int:
+        ids = [veh_id] if veh_id is not None else list(self._rings)
+        return sum(r.nbytes for vid in ids for r in self._rings.get(vid, {}).values())
@@ -0,0 +1,364 @@
+"""
+shm_snapshot.py — текущее состояние флота в shared memory (seqlock).
+
+telemetry_ingest пишет по строке на борт в структурированный массив NumPy,
+лежащий в multiprocessing.shared_memory; web UI / оркестратор и другие
+локальные процессы читают позиции, статус и SoC без подписки на MQTT.
+
+Согласованность — seqlock: писатель делает seq нечётным, пишет пачку строк и
+снова делает seq чётным. Читатель копирует строки и повторяет попытку, если
+seq был нечётным или изменился за время копирования. Писатель один на сегмент:
+сегмент с живым writer_pid в заголовке новый писатель не трогает
+(ShmWriterBusy), сегмент упавшего — пересоздаёт.
+
+Шардированный ingest пишет по сегменту на воркер (<name>.<shard>);
+FleetShmView собирает их в один вид флота.
+"""
+from __future__ import annotations
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from drone_core.domain.models import Vehicle, VehicleStatus
+
+log = logging.getLogger("fleet-shm")
+
+MAGIC = 0x46_4C_54_31  # "FLT1"
+VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "<u4"),
+    ("version", "<u2"),
+    ("_pad", "<u2"),
+    ("capacity", "<u4"),
+    ("count", "<u4"),
+    ("seq", "<u8"),
+    ("updated_ts", "<f8"),
+    ("writer_pid", "<u4"),
+    ("_pad2", "<u4"),
+    ("_reserved", "<u8", (3,)),
+])  # 64 байта
+
+RECORD_DTYPE = np.dtype([
+    ("id", "S32"),
+    ("name", "S32"),
+    ("status", "u1"),
+    ("lat", "<f8"),
+    ("lon", "<f8"),
+    ("alt", "<f4"),
+    ("soc", "<f4"),
+    ("ts", "<f8"),
+])
+
+STATUSES: List[VehicleStatus] = list(VehicleStatus)
+_STATUS_CODE: Dict[VehicleStatus, int] = {s: i for i, s in enumerate(STATUSES)}
+
+
+def segment_size(capacity: int) -> int:
+    return HEADER_DTYPE.itemsize + capacity * RECORD_DTYPE.itemsize
+
+
+def shard_segment(name: str, shard: int, shards: int) -> str:
+    """Имя сегмента воркера шардированного ingest (при shards == 1 — само name)."""
+    return name if shards <= 1 else f"{name}.{shard}"
+
+
+def _attach_untracked(name: str) -> shared_memory.SharedMemory:
+    """
+    Подключиться к чужому сегменту, не регистрируя его в resource_tracker:
+    до 3.13 (track=False) трекер удалил бы сегмент писателя при выходе читателя,
+    а unregister после подключения снимает и регистрацию самого писателя
+    (трекер общий у процессов после fork).
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class ShmWriterBusy(RuntimeError):
+    """Сегмент уже пишет другой живой процесс."""
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0 or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _segment_writer(name: str) -> int:
+    """writer_pid из заголовка существующего сегмента (0 — чужой формат/пустой)."""
+    shm = _attach_untracked(name)
+    try:
+        if shm.size < HEADER_DTYPE.itemsize:
+            return 0
+        h = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)[0]
+        pid = int(h["writer_pid"]) if int(h["magic"]) == MAGIC else 0
+        del h
+        return pid
+    finally:
+        shm.close()
+
+
+def _views(buf, capacity: int):
+    header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=buf)
+    records = np.ndarray((capacity,), dtype=RECORD_DTYPE, buffer=buf, offset=HEADER_DTYPE.itemsize)
+    return header, records
+
+
+class FleetShmWriter:
+    """
+    Писатель снапшота флота; слоты выдаются бортам по мере появления.
+    take_over=True — забрать сегмент, даже если его писатель ещё жив.
+    """
+
+    def __init__(self, name: str, capacity: int = 4096, take_over: bool = False) -> None:
+        self.name = name
+        self.capacity = capacity
+        size = segment_size(capacity)
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            pid = _segment_writer(name)
+            if _pid_alive(pid):
+                if not take_over:
+                    raise ShmWriterBusy(f"shm segment {name} is written by live pid {pid}") from None
+                log.warning(f"shm {name}: taking over from live writer pid {pid}")
+            # сегмент от упавшего писателя — пересоздаём под текущую ёмкость
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._header, self.records = _views(self._shm.buf, capacity)
+        self._header[0] = 0
+        h = self._header[0]
+        h["magic"] = MAGIC
+        h["version"] = VERSION
+        h["capacity"] = capacity
+        h["writer_pid"] = os.getpid()
+        self._slots: Dict[str, int] = {}
+        self._depth = 0
+        self.overflow = 0
+
+    def _slot(self, veh_id: str) -> Optional[int]:
+        slot = self._slots.get(veh_id)
+        if slot is None:
+            if len(self._slots) >= self.capacity:
+                self.overflow += 1
+                return None
+            slot = len(self._slots)
+            self._slots[veh_id] = slot
+            self.records[slot] = 0
+            self.records[slot]["id"] = veh_id.encode()[:32]
+            self.records[slot]["lat"] = np.nan
+            self.records[slot]["lon"] = np.nan
+            self.records[slot]["alt"] = np.nan
+            self.records[slot]["soc"] = np.nan
+        return slot
+
+    @contextmanager
+    def batch(self) -> Iterator["FleetShmWriter"]:
+        """Пачка изменений под одним нечётным seq (вложенные batch() не инкрементят)."""
+        h = self._header[0]
+        if self._depth == 0:
+            h["seq"] += 1
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                h["count"] = len(self._slots)
+                h["updated_ts"] = time.time()
+                h["seq"] += 1
+
+    def put_vehicle(self, v: Vehicle) -> None:
+        with self.batch():
+            slot = self._slot(v.id)
+            if slot is None:
+                return
+            rec = self.records[slot]
+            rec["name"] = (v.name or "").encode()[:32]
+            rec["status"] = _STATUS_CODE[v.status]
+            if v.pos is not None:
+                rec["lat"] = v.pos.lat
+                rec["lon"] = v.pos.lon
+                rec["alt"] = v.pos.alt
+            if v.soc is not None:
+                rec["soc"] = v.soc
+            rec["ts"] = v.last_ts or time.time()
+
+    def put_pose(self, veh_id: str, ts: float, lat: float, lon: float, alt: float) -> None:
+        with self.batch():
+            slot = self._slot(veh_id)
+            if slot is None:
+                return
+            rec = self.records[slot]
+            rec["lat"] = lat
+            rec["lon"] = lon
+            rec["alt"] = alt
+            rec["ts"] = ts
+
+    def close(self, unlink: bool = True) -> None:
+        self._header = self.records = None
+        self._shm.close()
+        if unlink:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class FleetShmReader:
+    """Читатель снапшота из другого процесса."""
+
+    def __init__(self, name: str, stale_after: float = 5.0) -> None:
+        self.name = name
+        self.stale_after = stale_after
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._header = self._records = None
+        self._checked = 0.0
+        self.retries = 0
+
+    def _attach(self) -> bool:
+        if self._shm is not None:
+            now = time.monotonic()
+            if now - self._checked < self.stale_after:
+                return True
+            self._checked = now
+            # писатель мог перезапуститься и пересоздать сегмент — старый mmap
+            # остался бы замороженным навсегда
+            if time.time() - float(self._header["updated_ts"][0]) < self.stale_after:
+                return True
+            self.close()
+        try:
+            shm = _attach_untracked(self.name)
+        except FileNotFoundError:
+            return False
+        header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)
+        if header[0]["magic"] != MAGIC or header[0]["version"] != VERSION:
+            del header
+            shm.close()
+            return False
+        self._shm = shm
+        self._header, self._records = _views(shm.buf, int(header[0]["capacity"]))
+        self._checked = time.monotonic()
+        return True
+
+    def snapshot(self, timeout: float = 0.5) -> Optional[np.ndarray]:
+        """Согласованная копия заполненных строк (None — писателя нет)."""
+        if not self._attach():
+            return None
+        h = self._header
+        deadline = time.monotonic() + timeout
+        while True:
+            s1 = int(h["seq"][0])
+            if not s1 & 1:
+                count = int(h["count"][0])
+                out = self._records[:count].copy()
+                if int(h["seq"][0]) == s1:
+                    return out
+            self.retries += 1
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"shm {self.name}: писатель не отпускает seqlock")
+            # писатель посреди пачки — отдаём квант
+            time.sleep(0)
+
+    def updated_ts(self) -> Optional[float]:
+        if not self._attach():
+            return None
+        return float(self._header["updated_ts"][0])
+
+    def vehicles(self) -> List[Dict[str, object]]:
+        snap = self.snapshot()
+        return to_dicts(snap) if snap is not None else []
+
+    def close(self) -> None:
+        if self._shm is not None:
+            self._header = self._records = None
+            self._shm.close()
+            self._shm = None
+
+
+class FleetShmView:
+    """
+    Агрегированный вид флота поверх сегментов name и name.0 … name.N-1.
+
+    При хеш-шардировании борт живёт в одном сегменте; при $share-подписке
+    сэмплы борта расходятся по воркерам — берётся строка с самым свежим ts.
+    """
+
+    def __init__(self, name: str, max_shards: int = 64, rescan_sec: float = 5.0) -> None:
+        self.name = name
+        self.max_shards = max_shards
+        self.rescan_sec = rescan_sec
+        self._readers: Dict[str, FleetShmReader] = {}
+        self._scanned = 0.0
+
+    def _segments(self) -> List[FleetShmReader]:
+        now = time.monotonic()
+        if not self._readers or now - self._scanned > self.rescan_sec:
+            self._scanned = now
+            for seg in [self.name] + [f"{self.name}.{i}" for i in range(self.max_shards)]:
+                if seg not in self._readers:
+                    r = FleetShmReader(seg)
+                    if r.snapshot() is not None:
+                        self._readers[seg] = r
+        return list(self._readers.values())
+
+    def snapshot(self) -> Optional[np.ndarray]:
+        parts = [s for s in (r.snapshot() for r in self._segments()) if s is not None]
+        if not parts:
+            return None
+        if len(parts) == 1:
+            return parts[0]
+        rows = np.concatenate(parts)
+        rows = rows[np.argsort(-rows["ts"], kind="stable")]
+        _, first = np.unique(rows["id"], return_index=True)
+        return rows[np.sort(first)]
+
+    def vehicles(self) -> List[Dict[str, object]]:
+        snap = self.snapshot()
+        return to_dicts(snap) if snap is not None else []
+
+    def close(self) -> None:
+        for r in self._readers.values():
+            r.close()
+        self._readers.clear()
+
+
+def to_dicts(snap: np.ndarray) -> List[Dict[str, object]]:
+    """Строки снапшота -> список dict (NaN -> None)."""
+    def f(x) -> Optional[float]:
+        x = float(x)
+        return None if x != x else x
+
+    return [
+        {
+            "id": r["id"].decode(),
+            "name": r["name"].decode() or None,
+            "status": STATUSES[int(r["status"])].value,
+            "lat": f(r["lat"]),
+            "lon": f(r["lon"]),
+            "alt": f(r["alt"]),
+            "soc": f(r["soc"]),
+            "ts": f(r["ts"]),
+        }
+        for r in snap
+    ]
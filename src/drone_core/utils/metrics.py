@@ -0,0 +1,145 @@
+"""
+metrics.py — лёгкие in-process метрики (гистограммы латентности и счётчики).
+
+Без внешних зависимостей: гистограмма с фиксированными log-бакетами,
+O(1) на наблюдение, снапшот в dict для логов / API.
+
+Лаги телеметрии по участкам пути пишутся в гистограммы hop.<участок>.<канал>
+(см. observe_lag):
+  bridge_to_bus   метка ts в payload (bridge) -> Message.ts (брокер + paho);
+  bus_to_ingest   Message.ts -> разбор в тике telemetry_ingest (очередь);
+  bus_to_repo     Message.ts -> запись пачки во fleet repo;
+  bus_to_ui       Message.ts -> обработчик web_ui;
+  bus_to_ws       Message.ts -> отправка всем WebSocket-клиентам;
+  bridge_to_repo / bridge_to_ws — сквозные.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# верхние границы бакетов, мс (последний — +inf)
+DEFAULT_BUCKETS_MS: List[float] = [
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0,
+    100.0, 250.0, 500.0, 1000.0, 2500.0, 5000.0, 10000.0,
+]
+
+
+class LatencyHistogram:
+    """Гистограмма латентности с фиксированными бакетами (значения в секундах)."""
+
+    def __init__(self, buckets_ms: Optional[List[float]] = None) -> None:
+        self._bounds = list(buckets_ms or DEFAULT_BUCKETS_MS)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000.0
+        idx = bisect.bisect_left(self._bounds, ms)
+        with self._lock:
+            self._counts[idx] += 1
+            self._count += 1
+            self._sum_ms += ms
+            if ms > self._max_ms:
+                self._max_ms = ms
+
+    def _quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе бакета."""
+        if self._count == 0:
+            return 0.0
+        rank = q * self._count
+        acc = 0
+        for i, c in enumerate(self._counts):
+            acc += c
+            if acc >= rank:
+                # верхняя граница бакета, но не больше наблюдавшегося максимума
+                return round(min(self._bounds[i], self._max_ms), 3) if i < len(self._bounds) else round(self._max_ms, 3)
+        return self._max_ms
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            n = self._count
+            return {
+                "count": n,
+                "mean_ms": round(self._sum_ms / n, 3) if n else 0.0,
+                "max_ms": round(self._max_ms, 3),
+                "p50_ms": self._quantile(0.50),
+                "p90_ms": self._quantile(0.90),
+                "p99_ms": self._quantile(0.99),
+            }
+
+
+class Counter:
+    def __init__(self) -> None:
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n: int = 1) -> None:
+        with self._lock:
+            self._value += n
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса: get-or-create по имени."""
+
+    def __init__(self) -> None:
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._counters: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        h = self._histograms.get(name)
+        if h is None:
+            with self._lock:
+                h = self._histograms.setdefault(name, LatencyHistogram())
+        return h
+
+    def counter(self, name: str) -> Counter:
+        c = self._counters.get(name)
+        if c is None:
+            with self._lock:
+                c = self._counters.setdefault(name, Counter())
+        return c
+
+    def snapshot(self, prefix: str = "") -> Dict[str, dict]:
+        return {
+            "histograms": {k: h.snapshot() for k, h in list(self._histograms.items()) if k.startswith(prefix)},
+            "counters": {k: c.value for k, c in list(self._counters.items()) if k.startswith(prefix)},
+        }
+
+
+REGISTRY = MetricsRegistry()
+
+
+def observe_lag(name: str, since: Optional[float], now: Optional[float] = None,
+                registry: MetricsRegistry = REGISTRY) -> None:
+    """
+    Лаг от wall-clock метки since (time.time()) до now — в гистограмму name.
+    Метка «из будущего» (рассинхрон часов между хостами) в гистограмму не
+    попадает, а считается в <name>.clock_skew.
+    """
+    if since is None:
+        return
+    lag = (time.time() if now is None else now) - since
+    if lag < 0:
+        registry.counter(f"{name}.clock_skew").inc()
+        return
+    registry.histogram(name).observe(lag)
+
+
+def payload_ts(payload: Any) -> Optional[float]:
+    """Метка источника ts из payload телеметрии (None, если её нет)."""
+    if isinstance(payload, dict):
+        ts = payload.get("ts")
+        if isinstance(ts, (int, float)) and ts > 0:
+            return float(ts)
+    return None
@@ -2,10 +2,12 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
-from typing import Dict, Optional
+import signal
+import time
+from typing import Any, Dict, Optional
 
 from drone_core.config.settings import Settings
-from drone_core.infra.repositories import make_repos
+from drone_core.infra.repositories import close_repos, make_repos, init_repos
 from drone_core.domain.models import Order, MissionStatus, VehicleStatus
 from drone_core.workers.planner import plan_order
 from drone_core.infra.messaging.mqtt_bus import MqttBus
@@ -35,17 +37,31 @@ class Orchestrator:
         self._busy_vehicles: set[str] = set()
         # mission_id -> vehicle_id для освобождения при COMPLETED/ABORTED.
         self._mission_vehicle: Dict[str, str] = {}
+        # vehicle_id -> последняя оценка энергии из fleet/<id>/energy (telemetry_ingest)
+        self._energy: Dict[str, Dict[str, Any]] = {}
+
+    ENERGY_STALE_S = 10.0
+
+    def _soc(self, veh_id: str, fallback: Optional[float]) -> Optional[float]:
+        """Оценённый ingest'ом SoC, если он свежий; иначе — soc из fleet/active."""
+        e = self._energy.get(veh_id)
+        if e is not None and e.get("soc") is not None and time.time() - e["rx_ts"] < self.ENERGY_STALE_S:
+            return float(e["soc"])
+        return fallback
 
     # ---- выбор борта ----
     async def _select_vehicle(self) -> Optional[str]:
         allv = await self.fleet.list_all()
+        # SoC неизвестен (None) — считаем полным; 0.0 — реально пустой борт, не «нет данных»
+        soc = {v.id: self._soc(v.id, v.soc) for v in allv}
+        soc = {vid: 100.0 if s is None else s for vid, s in soc.items()}
         free = [
             v for v in allv
             if v.status == VehicleStatus.IDLE
-            and (v.soc or 100) > 40
+            and soc[v.id] > 40
             and v.id not in self._busy_vehicles
         ]
-        free.sort(key=lambda v: (v.soc or 0), reverse=True)
+        free.sort(key=lambda v: soc[v.id], reverse=True)
         return free[0].id if free else None
 
     # ---- обработчик заказа ----
@@ -294,7 +310,7 @@ class Orchestrator:
                         lon=float(payload.get("lon") or 0),
                         alt=float(payload.get("alt") or 0),
                     ),
-                    soc=float(payload.get("soc") or 100.0),
+                    soc=self._soc(veh_id, 100.0 if payload.get("soc") is None else float(payload["soc"])),
                 )
 
                 # асинхронно добавляем в локальный FleetMem
@@ -305,19 +321,41 @@ class Orchestrator:
                 log.error(f"[ORCH][STATE] Ошибка обработки fleet/active: {e}")
 
         self.bus.subscribe("fleet/active", _fleet_handler, qos=1)
+
+        # === Оценка энергии бортов (SoC / остаток времени) от telemetry_ingest ===
+        def _energy_handler(message):
+            payload = message.payload
+            if not isinstance(payload, dict):
+                return
+            veh_id = message.topic.split("/")[1]
+            self._energy[veh_id] = {**payload, "rx_ts": time.time()}
+
+        self.bus.subscribe(topics.FLEET_ENERGY_ALL, _energy_handler, qos=0)
         # === 🔥 конец добавленного блока ===
 
         self._started = True
 
+    async def stop(self) -> None:
+        self.bus.stop()
+        await close_repos(self.fleet, self.missions)
+
 
 async def main():
+    await init_repos()
     orch = Orchestrator()
     orch.start()
+    # SIGTERM (docker stop) — как Ctrl+C: отмена main и штатная остановка
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except (NotImplementedError, RuntimeError):
+        pass
     try:
         while True:
             await asyncio.sleep(3600)
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         pass
+    finally:
+        await orch.stop()
 
 
 if __name__ == "__main__":
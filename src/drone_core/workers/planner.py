@@ -52,5 +52,6 @@ def plan_order(order: Order, cruise_mps: float = 10.0) -> Mission:
         dropoff=a2,   # для совместимости
         waypoints=wps,
         status=MissionStatus.PLANNED,
+        eta_s=round(eta_s, 1),
     )
     return m
@@ -1,19 +1,33 @@
+import argparse
 import json
 import logging
+import multiprocessing as mp
+import signal
 import sys
+import zlib
+from collections import deque
 from pathlib import Path
 import asyncio
 import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 # гарантируем доступ к src/
 sys.path.append(str(Path(__file__).resolve().parents[2]))
 
 from drone_core.config.settings import Settings
 from drone_core.infra.messaging.mqtt_bus import MqttBus
-from drone_core.infra.messaging.topics import TelemetryTopics
-from drone_core.infra.repositories import make_repos
-from drone_core.infra.messaging.bus import Message  # тип сообщения от MQTT
+from drone_core.infra.messaging.topics import TELEM_QUERY, TelemetryTopics, fleet_energy, metrics, mission_events
+from drone_core.infra.repositories import close_repos, make_repos, init_repos
+from drone_core.infra.repositories.base import VehicleRepo
+from drone_core.infra.telemetry.archive import TelemetryArchiver
+from drone_core.infra.telemetry.query import answer as answer_query
+from drone_core.infra.telemetry.ring_store import TelemetryStore
+from drone_core.infra.telemetry.shm_snapshot import FleetShmWriter, shard_segment
+from drone_core.infra.messaging.bus import EventBus, Message  # тип сообщения от MQTT
 from drone_core.domain.models import LLA, Vehicle, VehicleStatus
+from drone_core.domain.services.anomaly import Alert, AnomalyDetector
+from drone_core.domain.services.battery import BatteryBook
+from drone_core.utils.metrics import REGISTRY, observe_lag, payload_ts
 
 logger = logging.getLogger("telemetry-ingest")
 logging.basicConfig(
@@ -21,143 +35,446 @@ logging.basicConfig(
     format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
 )
 
-fleet_repo, _ = make_repos()
-LAST_TELEM = {}
+FLEET_ACTIVE = "fleet/active"
+# контекст миссий для детектора аномалий (ETA, борт, прогресс)
+MISSION_TOPICS = ("mission/+/planned", "mission/+/assigned", "mission/+/status", "mission/+/progress")
+SHARE_GROUP = "ingest"
 
 
-# --- обработка телеметрии ---
-def handle_message(msg: Message):
-    """Обработка входящих сообщений от MQTT."""
-    try:
-        #logger.info(f"📡 Получен MQTT топик: {msg.topic}")
-        topic = msg.topic
-        payload = msg.payload
-
-        parts = topic.split("/")
-        if len(parts) < 3:
-            return  # не телеметрический топик
-
-        _, veh_id, telem_type = parts
-        if isinstance(payload, (bytes, bytearray)):
-            try:
-                payload = json.loads(payload.decode("utf-8"))
-            except Exception:
-                pass
-        elif isinstance(payload, str):
+def _decode(payload: Any) -> Any:
+    """MqttBus уже парсит JSON, но на всякий случай принимаем bytes/str."""
+    if isinstance(payload, (bytes, bytearray)):
+        payload = payload.decode("utf-8")
+    if isinstance(payload, str):
+        try:
+            return json.loads(payload)
+        except Exception:
+            return payload
+    return payload
+
+
+def shard_of(veh_id: str, shards: int) -> int:
+    """Стабильный между процессами номер шарда борта (hash() рандомизирован)."""
+    return zlib.crc32(veh_id.encode("utf-8")) % shards
+
+
+def vehicle_from_fleet_active(payload: Dict[str, Any]) -> Optional[Vehicle]:
+    """fleet/active payload -> Vehicle (None, если payload без id)."""
+    drone_id = str(payload.get("id") or "")
+    if not drone_id:
+        return None
+    return Vehicle(
+        id=drone_id,
+        name=payload.get("name", f"veh_{drone_id}"),
+        status=VehicleStatus(payload.get("status", "IDLE")),
+        pos=LLA(
+            lat=float(payload.get("lat") or 43.0747),
+            lon=float(payload.get("lon") or -89.3842),
+            alt=float(payload.get("alt") or 0.0)
+        ),
+        # 0.0 — разряженная батарея, а не "нет данных"
+        soc=float(payload["soc"]) if payload.get("soc") is not None else 100.0,
+        last_ts=time.time(),
+    )
+
+
+class TelemetryIngest:
+    """
+    Ingest телеметрии на одном долгоживущем event loop:
+    - paho-поток только кладёт Message в ограниченную очередь (при переполнении
+      вытесняются самые старые сообщения, счётчик dropped);
+    - раз в tick_s очередь выбирается целиком, fleet/active коалесцируются
+      по борту (последний выигрывает) и пишутся в репозиторий одной пачкой;
+    - текущее состояние флота публикуется в shared memory (см. shm_snapshot),
+      если задан TELEM_SHM_NAME;
+    - сэмплы телеметрии архивируются в Parquet (см. archive), если задан
+      TELEM_ARCHIVE_DIR;
+    - telem/<id>/battery кормит оценщик SoC; оценка раз в BATTERY_PUBLISH_SEC
+      уходит в fleet/<id>/energy и подменяет soc из fleet/active в репозитории;
+    - pose бортов на миссии проверяет детектор аномалий, алерты публикуются
+      в mission/<id>/events в том же тике;
+    - лаги по участкам bridge -> bus -> ingest -> repo пишутся в REGISTRY
+      (hop.*), снапшот раз в METRICS_PUBLISH_SEC уходит в metrics/<client_id>.
+
+    Шардирование (shards > 1, по воркеру-процессу на шард):
+    - "hash": каждый воркер подписан на весь поток, но берёт только свои борта
+      (crc32(id) % shards) — чужие топики отсекаются в MqttBus до разбора JSON;
+    - "share": MQTT shared subscription $share/ingest/..., брокер раздаёт
+      сообщения воркерам по очереди, история борта делится между ними.
+      Всё состояние по борту — оценка SoC (BatteryBook), детектор аномалий,
+      кольца TelemetryStore (и ответы telem_query), коалесцирование
+      fleet/active — тогда считается по фрагментам потока и неверно.
+      Корректен только "hash"; "share" — для чистой пропускной способности
+      (репозиторий, архив).
+    """
+
+    def __init__(
+        self,
+        bus: Optional[EventBus] = None,
+        fleet_repo: Optional[VehicleRepo] = None,
+        queue_size: int = 50_000,
+        tick_s: float = 0.1,
+        shm_name: Optional[str] = None,
+        shard: int = 0,
+        shards: int = 1,
+        shard_mode: str = "hash",
+    ) -> None:
+        self.settings = Settings()
+        self.shard = shard
+        self.shards = max(1, shards)
+        self.shard_mode = shard_mode
+        self._hashed = self.shards > 1 and shard_mode == "hash"
+        client_id = "telemetry-ingest" if self.shards == 1 else f"telemetry-ingest-{shard}"
+        self.service = client_id
+        self.bus = bus or MqttBus(self.settings.MQTT_URL, client_id=client_id,
+                                  accept_topic=self.owns_topic if self._hashed else None)
+        # свои репозитории (не переданные снаружи) закрываем при остановке — сброс журнала
+        self._own_repos: Tuple[Any, ...] = ()
+        if fleet_repo is None:
+            self._own_repos = make_repos()
+            fleet_repo = self._own_repos[0]
+        self.fleet = fleet_repo
+        self.tick_s = tick_s
+        # deque.append потокобезопасен — paho-поток не трогает event loop
+        self._queue: Deque[Message] = deque(maxlen=queue_size)
+        # история pose/battery/health по бортам (кольцевые буферы с лимитом памяти)
+        self.telemetry = TelemetryStore(self.settings.TELEM_RING_BYTES_PER_VEHICLE)
+        shm_name = self.settings.TELEM_SHM_NAME if shm_name is None else shm_name
+        self.shm: Optional[FleetShmWriter] = (
+            FleetShmWriter(shard_segment(shm_name, shard, self.shards), self.settings.TELEM_SHM_CAPACITY)
+            if shm_name else None
+        )
+        self.archiver: Optional[TelemetryArchiver] = None
+        if self.settings.TELEM_ARCHIVE_DIR:
+            self.archiver = TelemetryArchiver(
+                self.settings.TELEM_ARCHIVE_DIR,
+                flush_sec=self.settings.TELEM_ARCHIVE_FLUSH_SEC,
+                max_file_bytes=self.settings.TELEM_ARCHIVE_FILE_MB * 1024 * 1024,
+            )
+        self.battery = BatteryBook(self.settings.BATTERY_CAPACITY_AH, self.settings.BATTERY_CELLS)
+        self.anomaly = AnomalyDetector()
+        self._alerts: List[Alert] = []
+        self._poses: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # борт -> (ts источника, Message.ts) последнего fleet/active тика — для лага до repo
+        self._fleet_ts: Dict[str, Tuple[Optional[float], float]] = {}
+        self._known: set[str] = set()
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.repo_writes = 0
+
+    # --- paho-поток ---
+    def owns_vehicle(self, veh_id: str) -> bool:
+        return not self._hashed or shard_of(veh_id, self.shards) == self.shard
+
+    def owns_topic(self, topic: str) -> bool:
+        """Топик telem/<id>/<type> своего шарда; остальные фильтруются после разбора."""
+        if not self._hashed or not topic.startswith("telem/"):
+            return True
+        parts = topic.split("/", 2)
+        return len(parts) < 2 or self.owns_vehicle(parts[1])
+
+    def on_message(self, msg: Message) -> None:
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(msg)
+        self.received += 1
+
+    # --- event loop ---
+    def _drain(self) -> List[Message]:
+        q = self._queue
+        return [q.popleft() for _ in range(len(q))]
+
+    def _process(self, batch: List[Message]) -> Dict[str, Vehicle]:
+        """Разбор пачки; возвращает коалесцированные апдейты флота."""
+        pending: Dict[str, Vehicle] = {}
+        now = time.time()
+        for msg in batch:
             try:
-                payload = json.loads(payload)
-            except Exception:
-                pass
-
-        d = LAST_TELEM.setdefault(veh_id, {})
-        d[telem_type] = payload
-
-    except Exception as e:
-        logger.exception(f"Ошибка обработки телеметрии: {e}")
-
-
-# --- обработка fleet/active ---
-def handle_fleet_active(msg: Message):
-    """Добавляем/обновляем дронов в репозитории при получении fleet/active."""
-    try:
-        # фильтрация по точному топику
-        if not msg.topic.endswith("fleet/active"):
+                if msg.topic == FLEET_ACTIVE:
+                    payload = _decode(msg.payload)
+                    if not isinstance(payload, dict):
+                        logger.warning(f"⚠️ Неожиданный тип payload fleet/active: {type(payload)}")
+                        continue
+                    logger.debug(f"📦 Получен fleet/active payload: {payload}")
+                    vehicle = vehicle_from_fleet_active(payload)
+                    if vehicle is None:
+                        logger.warning("fleet/active без id, игнорирую")
+                        continue
+                    if self._hashed and shard_of(vehicle.id, self.shards) != self.shard:
+                        continue
+                    soc = self.battery.soc(vehicle.id)
+                    if soc is not None:
+                        vehicle.soc = soc
+                    pending[vehicle.id] = vehicle
+                    src = payload_ts(payload)
+                    observe_lag("hop.bridge_to_bus.fleet", src, msg.ts)
+                    observe_lag("hop.bus_to_ingest.fleet", msg.ts, now)
+                    self._fleet_ts[vehicle.id] = (src, msg.ts)
+                elif msg.topic == TELEM_QUERY:
+                    self._on_query(_decode(msg.payload))
+                else:
+                    parts = msg.topic.split("/")
+                    if len(parts) != 3:
+                        continue  # не телеметрический топик
+                    kind, veh_id, telem_type = parts
+                    payload = _decode(msg.payload)
+                    if kind == "mission":
+                        if isinstance(payload, dict):
+                            self._on_mission(veh_id, telem_type, payload, msg.ts)
+                    elif isinstance(payload, dict):
+                        src = payload_ts(payload)
+                        observe_lag(f"hop.bridge_to_bus.{telem_type}", src, msg.ts)
+                        observe_lag(f"hop.bus_to_ingest.{telem_type}", msg.ts, now)
+                        ts = src or msg.ts
+                        self.telemetry.append(veh_id, telem_type, float(ts), payload)
+                        if self.archiver is not None:
+                            self.archiver.add(veh_id, telem_type, float(ts), payload)
+                        if telem_type == "pose":
+                            self._poses[veh_id] = (float(ts), payload)
+                            self._check_pose(veh_id, float(ts), payload)
+                        elif telem_type == "battery":
+                            self.battery.update(veh_id, float(ts), payload)
+            except Exception as e:
+                logger.exception(f"Ошибка обработки {msg.topic}: {e}")
+        self.processed += len(batch)
+        return pending
+
+    def _on_query(self, req: Any) -> None:
+        """Запрос истории из TelemetryStore (telemetry/query.py); отвечает шард-владелец борта."""
+        if not isinstance(req, dict) or not req.get("reply_to"):
             return
-
-        # нормализуем payload
-        payload = msg.payload
+        if not self.owns_vehicle(str(req.get("vehicle_id") or "")):
+            return
+        self.bus.publish(str(req["reply_to"]), answer_query(self.telemetry, req, self.shard), qos=0)
+
+    def _on_mission(self, mission_id: str, event: str, payload: Dict[str, Any], ts: float) -> None:
+        vid = payload.get("vehicle_id")
+        if event == "planned":
+            self.anomaly.on_planned(mission_id, payload.get("eta_s"))
+        elif event == "assigned" and vid:
+            # привязку миссии к борту держит только шард-владелец: иначе статус без
+            # vehicle_id (STARTED/IN_PROGRESS) запустил бы монитор на каждом шарде
+            if self.owns_vehicle(str(vid)):
+                self.anomaly.on_assigned(mission_id, str(vid))
+        elif event == "status" and payload.get("status"):
+            vid = vid or self.anomaly.vehicle_of(mission_id)
+            if vid is None or self.owns_vehicle(str(vid)):
+                self.anomaly.on_status(mission_id, str(payload["status"]),
+                                       float(payload.get("ts") or ts), str(vid) if vid else None)
+        elif event == "progress" and vid and self.owns_vehicle(str(vid)):
+            self.anomaly.on_progress(str(vid), int(payload.get("current") or 0), int(payload.get("total") or 0))
+
+    def _check_pose(self, veh_id: str, ts: float, payload: Dict[str, Any]) -> None:
         try:
-            if isinstance(payload, (bytes, bytearray)):
-                payload = json.loads(payload.decode("utf-8"))
-            elif isinstance(payload, str):
-                payload = json.loads(payload)
-        except Exception as e:
-            logger.error(f"Ошибка парсинга fleet/active payload: {e}")
+            lat, lon = float(payload["lat"]), float(payload["lon"])
+            alt = float(payload.get("alt") or 0.0)
+        except (KeyError, TypeError, ValueError):
             return
-
-        if not isinstance(payload, dict):
-            logger.warning(f"⚠️ Неожиданный тип payload: {type(payload)}")
+        self._alerts.extend(self.anomaly.on_pose(veh_id, ts, lat, lon, alt))
+
+    def _publish_alerts(self) -> None:
+        alerts, self._alerts = self._alerts, []
+        alerts.extend(self.anomaly.sweep(time.time()))
+        for a in alerts:
+            logger.warning(f"🚨 [ANOMALY] {a.vehicle_id} mission={a.mission_id} {a.kind} {a.details}")
+            if a.mission_id:
+                try:
+                    self.bus.publish(mission_events(a.mission_id), a.event_payload(), qos=1)
+                except Exception as e:
+                    logger.warning(f"Не удалось опубликовать алерт {a.kind}: {e}")
+
+    def _publish_shm(self, pending: Dict[str, Vehicle]) -> None:
+        """Последние pose и fleet/active тика — в shm одной записью под seqlock."""
+        poses, self._poses = self._poses, {}
+        if self.shm is None:
             return
-
-        logger.info(f"📦 Получен fleet/active payload: {payload}")
-
-        drone_id = str(payload.get("id"))
-        if not drone_id:
-            logger.warning("fleet/active без id, игнорирую")
+        with self.shm.batch():
+            for v in pending.values():
+                self.shm.put_vehicle(v)
+            for veh_id, (ts, p) in poses.items():
+                try:
+                    self.shm.put_pose(veh_id, ts, float(p["lat"]), float(p["lon"]),
+                                      float(p.get("alt") or 0.0))
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+    async def _flush(self, pending: Dict[str, Vehicle]) -> None:
+        if not pending:
             return
-
-        name = payload.get("name", f"veh_{drone_id}")
-        status = payload.get("status", "IDLE")
-
-        # создаём модель дрона
-        vehicle = Vehicle(
-            id=drone_id,
-            name=name,
-            status=VehicleStatus(status),
-            pos=LLA(
-                lat=float(payload.get("lat") or 43.0747),
-                lon=float(payload.get("lon") or -89.3842),
-                alt=float(payload.get("alt") or 0.0)
-            ),
-            soc=float(payload.get("soc") or 100.0),
-        )
-
-        async def update_repo():
-            existing = await fleet_repo.get(drone_id)
-            if existing:
-                await fleet_repo.update(vehicle)
-                logger.info(f"🟡 [INGEST] Обновлён дрон: {name} ({status})")
-            else:
-                await fleet_repo.add(vehicle)
-                logger.info(f"🟢 [INGEST] Добавлен новый дрон: {name} ({status})")
-
-        # отдельный event loop для paho потока
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(update_repo())
-        loop.close()
-
-    except Exception as e:
-        logger.exception(f"Ошибка обработки fleet/active: {e}")
+        vehicles = list(pending.values())
+        await self.fleet.upsert_many(vehicles)
+        self.repo_writes += 1
+        done = time.time()
+        for v in vehicles:
+            src, recv = self._fleet_ts.pop(v.id, (None, None))
+            observe_lag("hop.bus_to_repo.fleet", recv, done)
+            observe_lag("hop.bridge_to_repo.fleet", src, done)
+        for v in vehicles:
+            if v.id not in self._known:
+                self._known.add(v.id)
+                logger.info(f"🟢 [INGEST] Добавлен новый дрон: {v.name} ({v.status.value})")
+
+    async def step(self) -> int:
+        """Один тик: выбрать очередь, обработать, записать. Возвращает число сообщений."""
+        batch = self._drain()
+        if batch:
+            try:
+                pending = self._process(batch)
+                self._publish_shm(pending)
+                self._publish_alerts()
+                await self._flush(pending)
+            except Exception as e:
+                logger.exception(f"Ошибка записи пачки во fleet repo: {e}")
+        else:
+            self._publish_alerts()
+        return len(batch)
+
+    async def consume(self) -> None:
+        while True:
+            t0 = time.monotonic()
+            await self.step()
+            await asyncio.sleep(max(0.0, self.tick_s - (time.monotonic() - t0)))
+
+    async def energy_loop(self) -> None:
+        """Сглаженные SoC / остаток времени по бортам с фиксированной частотой."""
+        period = self.settings.BATTERY_PUBLISH_SEC
+        while True:
+            await asyncio.sleep(period)
+            for veh_id, est in list(self.battery.items()):
+                if est.soc is None:
+                    continue
+                try:
+                    self.bus.publish(fleet_energy(veh_id), {"id": veh_id, **est.snapshot()}, qos=0)
+                except Exception as e:
+                    logger.warning(f"Не удалось опубликовать {fleet_energy(veh_id)}: {e}")
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        return {
+            "service": self.service,
+            "ts": time.time(),
+            "ingest": {
+                "received": self.received,
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "queue": len(self._queue),
+                "repo_writes": self.repo_writes,
+            },
+            **REGISTRY.snapshot(),
+        }
+
+    async def metrics_loop(self) -> None:
+        """Снапшот метрик процесса в metrics/<service> (retained — UI видит сразу)."""
+        while True:
+            await asyncio.sleep(self.settings.METRICS_PUBLISH_SEC)
+            try:
+                self.bus.publish(metrics(self.service), self.metrics_snapshot(), qos=0, retain=True)
+            except Exception as e:
+                logger.warning(f"Не удалось опубликовать метрики: {e}")
+
+    async def archive_loop(self) -> None:
+        """Сброс архива в Parquet (запись — в фоновом потоке архиватора)."""
+        while True:
+            await asyncio.sleep(1.0)
+            if self.archiver.due():
+                try:
+                    rows = await self.archiver.flush()
+                    logger.debug(f"🗄️ [ARCHIVE] записано строк: {rows}")
+                except Exception as e:
+                    logger.exception(f"Ошибка записи архива телеметрии: {e}")
+
+    # --- мониторинг активных дронов ---
+    async def monitor_fleet(self) -> None:
+        """Периодически выводит состав флота и счётчики ingest."""
+        await asyncio.sleep(5)
+        while True:
+            allv = await self.fleet.list_all()
+            ids = [v.id for v in allv]
+            lag = REGISTRY.histogram("hop.bridge_to_repo.fleet").snapshot()
+            logger.info(
+                f"🛰️ [MONITOR] Активные дроны: {ids or '— пусто —'} | "
+                f"msgs={self.processed} dropped={self.dropped} queue={len(self._queue)} "
+                f"lag_p99={lag['p99_ms']}ms"
+            )
+            await asyncio.sleep(10)
+
+    async def run(self) -> None:
+        await init_repos()
+        prefix = f"$share/{SHARE_GROUP}/" if self.shards > 1 and self.shard_mode == "share" else ""
+        self.bus.subscribe(prefix + TelemetryTopics.ALL, self.on_message, qos=0)
+        self.bus.subscribe(prefix + FLEET_ACTIVE, self.on_message)
+        # контекст миссий нужен каждому шарду — без $share
+        for topic in MISSION_TOPICS:
+            self.bus.subscribe(topic, self.on_message, qos=1 if not topic.endswith("progress") else 0)
+        # запросы истории от оркестратора/UI — каждому шарду, отвечает владелец борта
+        self.bus.subscribe(TELEM_QUERY, self.on_message, qos=0)
+        logger.info(f"MQTT URL = {self.settings.MQTT_URL}")
+        self.bus.start()
+        tasks = [self.consume(), self.monitor_fleet(), self.energy_loop(), self.metrics_loop()]
+        if self.archiver is not None:
+            tasks.append(self.archive_loop())
+        # SIGTERM (docker stop) — отмена и штатная остановка через finally
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except (NotImplementedError, RuntimeError):
+            pass
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.bus.stop()
+            if self.archiver is not None:
+                await self.archiver.close()
+            if self.shm is not None:
+                self.shm.close()
+            await close_repos(*self._own_repos)
 
 
-# --- мониторинг активных дронов ---
-async def monitor_fleet():
-    """Периодически выводит состав флота в памяти."""
-    await asyncio.sleep(5)
-    while True:
-        allv = await fleet_repo.list_all()
-        ids = [v.id for v in allv]
-        logger.info(f"🛰️ [MONITOR] Активные дроны в FleetMem: {ids or '— пусто —'}")
-        await asyncio.sleep(10)
+# --- точка входа ---
+def _run_shard(shard: int, shards: int, mode: str) -> None:
+    try:
+        asyncio.run(TelemetryIngest(shard=shard, shards=shards, shard_mode=mode).run())
+    except KeyboardInterrupt:
+        pass
 
 
-# --- точка входа ---
 def main():
-    logger.info("Telemetry Ingest запускается...")
-
     settings = Settings()
-    bus = MqttBus(settings.MQTT_URL, client_id="telemetry-ingest")
-
-    # Подписка
-    bus.subscribe(TelemetryTopics.ALL, handle_message)
-    bus.subscribe("fleet/active", handle_fleet_active)
-
-    # Запуск MQTT
-    print(f"[DEBUG] MQTT URL = {settings.MQTT_URL}")
-    print("[DEBUG] Starting MqttBus...")
-    bus.start()
-    print("[DEBUG] MqttBus started, waiting 3s...")
-
-    # Фоновый мониторинг
-    loop = asyncio.get_event_loop()
-    loop.create_task(monitor_fleet())
+    ap = argparse.ArgumentParser(description="Telemetry Ingest")
+    ap.add_argument("--shards", type=int, default=settings.INGEST_SHARDS)
+    ap.add_argument("--shard-mode", choices=("hash", "share"), default=settings.INGEST_SHARD_MODE)
+    args = ap.parse_args()
 
+    logger.info("Telemetry Ingest запускается...")
+    if args.shards <= 1:
+        try:
+            asyncio.run(TelemetryIngest().run())
+        except KeyboardInterrupt:
+            logger.info("Останавливаем Telemetry Ingest...")
+        return
+
+    logger.info(f"Шардированный ingest: {args.shards} воркеров, режим {args.shard_mode}")
+    if args.shard_mode == "share":
+        logger.warning("режим share: поток борта делится между воркерами — SoC, аномалии и история "
+                       "telem_query считаются по фрагментам; для корректного состояния по борту — hash")
+    ctx = mp.get_context("spawn")
+    workers = [
+        ctx.Process(target=_run_shard, args=(i, args.shards, args.shard_mode),
+                    name=f"telemetry-ingest-{i}", daemon=True)
+        for i in range(args.shards)
+    ]
+    for w in workers:
+        w.start()
     try:
-        loop.run_forever()
+        for w in workers:
+            w.join()
     except KeyboardInterrupt:
         logger.info("Останавливаем Telemetry Ingest...")
-        bus.stop()
+        for w in workers:
+            w.terminate()
+        for w in workers:
+            w.join(timeout=5)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+"""
+traffic_replay — запись и воспроизведение MQTT-трафика (см. infra.messaging.recording).
+
+    python -m drone_core.workers.traffic_replay record data/traffic/run1 --topic '#'
+    python -m drone_core.workers.traffic_replay info   data/traffic/run1
+    python -m drone_core.workers.traffic_replay play   data/traffic/run1 --speed 10 \\
+        --topic 'telem/+/pose' --vehicle 1 --from-sec 120
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+# гарантируем доступ к src/
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from drone_core.config.settings import Settings
+from drone_core.infra.messaging.mqtt_bus import MqttBus
+from drone_core.infra.messaging.recording import Recorder, Replayer, bus_publisher
+
+logger = logging.getLogger("traffic-replay")
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+)
+
+
+async def record(args) -> None:
+    settings = Settings()
+    rec = Recorder(args.path)
+    # accept_topic=False: сообщения только пишутся, JSON не разбирается
+    bus = MqttBus(settings.MQTT_URL, client_id=f"traffic-recorder-{int(time.time())}",
+                  accept_topic=lambda topic: False)
+    bus.add_tap(rec)
+    for topic in args.topic or ["#"]:
+        bus.subscribe(topic, lambda m: None, qos=0)
+    bus.start()
+    logger.info(f"🎙️ Запись трафика в {rec.data_path} ...")
+    t_end = time.monotonic() + args.seconds if args.seconds else None
+    try:
+        while t_end is None or time.monotonic() < t_end:
+            await asyncio.sleep(5)
+            logger.info(f"записано {rec.records} сообщений, {rec.bytes / 1e6:.1f} MB")
+    finally:
+        bus.stop()
+        rec.close()
+
+
+def info(args) -> None:
+    rp = Replayer(args.path)
+    if not len(rp):
+        print("пустая запись")
+        return
+    topics = {}
+    for _, topic, _, _, _ in rp.iter():
+        key = "/".join(topic.split("/")[::2]) if topic.count("/") == 2 else topic
+        topics[key] = topics.get(key, 0) + 1
+    dur = rp.t_end - rp.t_start
+    print(f"{len(rp):,} сообщений за {dur:.1f} s ({len(rp) / max(dur, 1e-9):,.0f} msg/s)")
+    for key, n in sorted(topics.items(), key=lambda kv: -kv[1]):
+        print(f"  {key:32} {n:>10,}")
+    rp.close()
+
+
+async def play(args) -> None:
+    settings = Settings()
+    rp = Replayer(args.path)
+    if not len(rp):
+        logger.warning("пустая запись")
+        return
+    bus = MqttBus(settings.MQTT_URL, client_id=f"traffic-replayer-{int(time.time())}")
+    bus.start()
+    speed = 0.0 if args.speed == "max" else float(args.speed)
+    t_from = rp.t_start + args.from_sec if args.from_sec else None
+    t_to = rp.t_start + args.to_sec if args.to_sec else None
+    try:
+        for i in range(args.loop):
+            t0 = time.perf_counter()
+            n = await rp.play(bus_publisher(bus), speed=speed, t_from=t_from, t_to=t_to,
+                              topics=args.topic, vehicles=args.vehicle)
+            dt = time.perf_counter() - t0
+            logger.info(f"▶️ проход {i + 1}: {n:,} сообщений за {dt:.1f} s ({n / max(dt, 1e-9):,.0f} msg/s)")
+    finally:
+        bus.stop()
+        rp.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Запись/воспроизведение MQTT-трафика")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("record")
+    r.add_argument("path")
+    r.add_argument("--topic", action="append", help="фильтр подписки (по умолчанию #)")
+    r.add_argument("--seconds", type=float, default=0.0, help="0 — до Ctrl+C")
+
+    i = sub.add_parser("info")
+    i.add_argument("path")
+
+    p = sub.add_parser("play")
+    p.add_argument("path")
+    p.add_argument("--speed", default="1", help="множитель скорости или max")
+    p.add_argument("--topic", action="append", help="MQTT-фильтр (+/#), можно несколько")
+    p.add_argument("--vehicle", action="append", help="id борта, можно несколько")
+    p.add_argument("--from-sec", type=float, default=0.0, help="смещение от начала записи")
+    p.add_argument("--to-sec", type=float, default=0.0)
+    p.add_argument("--loop", type=int, default=1)
+
+    args = ap.parse_args()
+    try:
+        if args.cmd == "record":
+            asyncio.run(record(args))
+        elif args.cmd == "info":
+            info(args)
+        else:
+            asyncio.run(play(args))
+    except KeyboardInterrupt:
+        logger.info("Остановлено")
+
+
+if __name__ == "__main__":
+    main()
@@ -425,6 +425,7 @@ async def run_for_drone(
         "armed": False,
         "mission_current": 0,
         "mission_total": 0,
+        "soc": None,
         "ts": 0.0,
     }
 
@@ -461,6 +462,34 @@ async def run_for_drone(
         except Exception as e:
             log.error(f"[{name}] ❌ Ошибка телеметрии позиции: {e!r}")
 
+    # --- батарея: сырые voltage/current/remaining -> telem/<name>/battery (1 Hz) ---
+    # SoC оценивает telemetry_ingest (domain.services.battery), здесь только сэмплы.
+    async def publish_battery():
+        last_publish = 0.0
+        # старые MAVSDK отдают долю 0..1, новые — проценты; раз увидев > 1,
+        # считаем, что это проценты (иначе 0.5 % превратились бы в 50 %)
+        percent_units = False
+        try:
+            async for bat in sys.telemetry.battery():
+                now = time.time()
+                remaining = bat.remaining_percent
+                if remaining is not None and remaining == remaining:
+                    percent_units = percent_units or remaining > 1.0
+                    telem_state["soc"] = remaining if percent_units else remaining * 100.0
+                else:
+                    telem_state["soc"] = None
+                if now - last_publish >= 1.0:
+                    current = getattr(bat, "current_battery_a", None)
+                    bus.publish(f"telem/{name}/battery", {
+                        "voltage_v": bat.voltage_v,
+                        "current_a": current if current == current else None,
+                        "remaining_pct": telem_state["soc"],
+                        "ts": now,
+                    }, qos=0)
+                    last_publish = now
+        except Exception as e:
+            log.error(f"[{name}] ❌ Ошибка телеметрии батареи: {e!r}")
+
     # --- режим полёта (MANUAL/ALTITUDE/OFFBOARD/MISSION/HOLD/RETURN/LAND...) ---
     async def log_flight_mode():
         try:
@@ -541,7 +570,8 @@ async def run_for_drone(
                     "lat": telem_state["lat"],
                     "lon": telem_state["lon"],
                     "alt": telem_state["alt_rel"],
-                    "soc": 100.0,
+                    "soc": telem_state["soc"] if telem_state["soc"] is not None else 100.0,
+                    "ts": time.time(),
                 }, qos=0)
 
                 if status != last_status:
@@ -600,6 +630,7 @@ async def run_for_drone(
     try:
         await asyncio.gather(
             publish_position(),
+            publish_battery(),
             track_in_air(),
             publish_fleet_active(),
             log_flight_mode(),
@@ -0,0 +1,186 @@
+"""
+broadcaster.py — рассылка сообщений WebSocket-клиентам дашборда.
+
+Сообщение (JSON-текст или bytes для бинарных кадров) сериализуется один
+раз и раскладывается по очередям клиентов;
+у каждого клиента своя ограниченная очередь и своя задача-отправитель,
+так что медленный браузер не задерживает остальных.
+
+Очередь клиента — OrderedDict: сообщения с ключом (топик телеметрии, борт)
+коалесцируются — новое значение заменяет ещё не отправленное старое на его
+месте. При переполнении вытесняется самое старое сообщение. Клиент, который
+переполнен дольше slow_client_s или не принял кадр за send_timeout_s,
+отключается (код 1013 — try again later). Зависшая отправка проверяется
+при следующем publish — без таймера/задачи на каждый кадр.
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple, Union
+
+from drone_core.utils.metrics import REGISTRY, observe_lag
+
+log = logging.getLogger("ws-broadcaster")
+
+# (имя гистограммы, wall-clock метка) — лаги, которые пишутся после отправки кадра
+Lags = Tuple[Tuple[str, Optional[float]], ...]
+
+
+class WsClient:
+    """Очередь и задача-отправитель одного WebSocket-клиента."""
+
+    def __init__(self, ws: Any, broadcaster: "Broadcaster") -> None:
+        self.ws = ws
+        self._b = broadcaster
+        self._items: "OrderedDict[Hashable, Tuple[Union[str, bytes], Lags]]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self._seq = itertools.count()
+        self.overflow_since: Optional[float] = None
+        self.sending_since: Optional[float] = None
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.closed = False
+        self.task: Optional[asyncio.Task] = None
+
+    def put(self, text: Union[str, bytes], key: Optional[Hashable], lags: Lags, now: float) -> None:
+        if self.sending_since is not None and now - self.sending_since > self._b.send_timeout_s:
+            self._b._kick(self, f"send > {self._b.send_timeout_s}s")
+            return
+        if key is not None and key in self._items:
+            self._items[key] = (text, lags)
+            self.coalesced += 1
+            return
+        if len(self._items) >= self._b.max_queue:
+            self._items.popitem(last=False)
+            self.dropped += 1
+            REGISTRY.counter("ws.dropped").inc()
+            if self.overflow_since is None:
+                self.overflow_since = now
+            elif now - self.overflow_since > self._b.slow_client_s:
+                self._b._kick(self, f"очередь переполнена {now - self.overflow_since:.0f}s")
+                return
+        self._items[key if key is not None else ("_", next(self._seq))] = (text, lags)
+        self._ready.set()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def has(self, key: Hashable) -> bool:
+        return key in self._items
+
+    async def run(self) -> None:
+        try:
+            while not self.closed:
+                if not self._items:
+                    self.overflow_since = None
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                _, (text, lags) = self._items.popitem(last=False)
+                self.sending_since = time.monotonic()
+                try:
+                    if isinstance(text, (bytes, bytearray)):
+                        await self.ws.send_bytes(text)
+                    else:
+                        await self.ws.send_text(text)
+                except Exception:
+                    # клиент ушёл — эндпоинт сам уберёт его по WebSocketDisconnect
+                    self._b._drop(self)
+                    return
+                self.sending_since = None
+                self.sent += 1
+                for name, since in lags:
+                    observe_lag(name, since)
+        except asyncio.CancelledError:
+            pass
+
+
+class Broadcaster:
+    """Клиенты дашборда; publish вызывается в event loop (из paho — через call_soon_threadsafe)."""
+
+    def __init__(self, max_queue: int = 4096, send_timeout_s: float = 5.0, slow_client_s: float = 10.0) -> None:
+        self.max_queue = max_queue
+        self.send_timeout_s = send_timeout_s
+        self.slow_client_s = slow_client_s
+        self._clients: Dict[Any, WsClient] = {}
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def pending(self, ws: Any, key: Hashable) -> bool:
+        """Кадр с ключом key ещё не отправлен клиенту."""
+        client = self._clients.get(ws)
+        return client is not None and client.has(key)
+
+    def clients(self) -> Iterable[WsClient]:
+        return list(self._clients.values())
+
+    def add(self, ws: Any) -> WsClient:
+        client = WsClient(ws, self)
+        client.task = asyncio.create_task(client.run())
+        self._clients[ws] = client
+        return client
+
+    def remove(self, ws: Any) -> None:
+        client = self._clients.get(ws)
+        if client is not None:
+            self._drop(client)
+
+    def publish(self, text: Union[str, bytes], key: Optional[Hashable] = None, lags: Lags = (),
+                targets: Optional[Iterable[Any]] = None) -> None:
+        """
+        Уже сериализованный кадр — клиентам targets (объекты WebSocket; None — всем);
+        key — ключ коалесцирования.
+        """
+        if not self._clients or targets is not None and not targets:
+            return
+        now = time.monotonic()
+        if targets is None:
+            clients: Iterable[Optional[WsClient]] = list(self._clients.values())
+        else:
+            clients = [self._clients.get(ws) for ws in targets]
+        for client in clients:
+            if client is not None:
+                client.put(text, key, lags, now)
+
+    def _drop(self, client: WsClient) -> None:
+        client.closed = True
+        client._ready.set()
+        self._clients.pop(client.ws, None)
+
+    def _kick(self, client: WsClient, reason: str) -> None:
+        """Отключить медленного клиента."""
+        if client.closed:
+            return
+        log.warning(f"отключаю медленного WebSocket-клиента: {reason} (sent={client.sent} dropped={client.dropped})")
+        REGISTRY.counter("ws.slow_disconnects").inc()
+        self._drop(client)
+        if client.task is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+        async def _close() -> None:
+            try:
+                await asyncio.wait_for(client.ws.close(code=1013), self.send_timeout_s)
+            except Exception:
+                pass
+
+        asyncio.get_running_loop().create_task(_close())
+
+    async def close(self) -> None:
+        for client in list(self._clients.values()):
+            self._drop(client)
+            if client.task is not None:
+                client.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self._clients),
+            "queued": sum(len(c) for c in self._clients.values()),
+            "sent": sum(c.sent for c in self._clients.values()),
+            "dropped": sum(c.dropped for c in self._clients.values()),
+            "coalesced": sum(c.coalesced for c in self._clients.values()),
+        }
@@ -0,0 +1,373 @@
+"""
+frames.py — состояние дашборда кадрами с фиксированной частотой.
+
+Вместо пересылки каждого MQTT-сообщения UI-сервер раз в 1/rate_hz сравнивает
+active_drones / active_missions с прошлым тиком и проставляет изменившимся
+полям номер версии. Клиенту уходит кадр с полями, изменившимися после его
+последнего кадра:
+
+    {"type": "frame", "seq": 42, "keyframe": false, "ts": ...,
+     "drones":   {"veh_1": {"lat": ..., "lon": ...}},
+     "missions": {"m_7": {"status": "COMPLETED", "progress_current": 9}},
+     "removed":  {"drones": [], "missions": ["m_3"]}}
+
+При подключении — keyframe со всем состоянием. Клиенты на одной версии без
+фильтров получают один и тот же сериализованный кадр. Если прошлый кадр
+клиента ещё в очереди (медленный браузер), тик для него пропускается —
+следующий кадр будет дельтой от его версии, изменения не теряются.
+Фильтры подписок (vehicles / missions / bbox, см. subscriptions) применяются
+к сущностям кадра; сущность, вышедшая из фильтра, приходит в removed.
+Видимость меняется только с изменением самой сущности или той, на которую
+она ссылается (миссия -> её борт, REFS), поэтому дельта клиента с фильтром
+проверяет лишь изменившиеся после его версии сущности (журнал _changes),
+а не всё состояние; полный проход — только на keyframe.
+
+Бинарный режим (/ws?format=binary): lat/lon/alt бортов уходят отдельным
+binary-сообщением сразу за JSON-кадром — колонки id u32 / lat, lon i32
+(1e-7°) / alt f32 (см. encode_poses). id бортов интернируются в числа;
+новые соответствия приходят в JSON-кадре полем "intern": {"veh_1": 0}.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+
+log = logging.getLogger("ui-frames")
+
+# kind -> функция, отдающая {id: {поле: значение}} (живые dict'ы UI)
+Sources = Mapping[str, Callable[[], Mapping[str, Mapping[str, Any]]]]
+# (kind, id, поля) -> видна ли сущность клиенту
+Visible = Callable[[str, str, Mapping[str, Any]], bool]
+
+FRAME_KEY = "frame"
+FRAME_BIN_KEY = "frame.bin"
+POSE_FIELDS = ("lat", "lon", "alt")
+# kind -> (поле-ссылка, kind цели): видимость зависит и от сущности-цели
+REFS: Dict[str, Tuple[str, str]] = {"missions": ("vehicle_id", "drones")}
+
+# бинарный кадр поз: заголовок + колонки (little-endian, смещения кратны 4)
+POSE_MAGIC = 0x50  # 'P'
+_POSE_HEADER = struct.Struct("<BBHIdI")  # magic, flags(bit0 keyframe), reserved, seq, ts, n
+
+
+def encode_poses(seq: int, ts: float, keyframe: bool, ids: list, lats: list, lons: list, alts: list) -> bytes:
+    """[header 20 B][id u32 × n][lat i32 × n (1e-7°)][lon i32 × n][alt f32 × n]."""
+    n = len(ids)
+    return b"".join((
+        _POSE_HEADER.pack(POSE_MAGIC, 1 if keyframe else 0, 0, seq & 0xFFFFFFFF, ts, n),
+        np.asarray(ids, dtype="<u4").tobytes(),
+        np.round(np.asarray(lats, dtype=np.float64) * 1e7).astype("<i4").tobytes(),
+        np.round(np.asarray(lons, dtype=np.float64) * 1e7).astype("<i4").tobytes(),
+        np.asarray(alts, dtype="<f4").tobytes(),
+    ))
+
+
+def decode_poses(buf: bytes) -> Dict[str, Any]:
+    """Обратное encode_poses (для тестов/отладки)."""
+    magic, flags, _, seq, ts, n = _POSE_HEADER.unpack_from(buf, 0)
+    if magic != POSE_MAGIC:
+        raise ValueError("not a pose frame")
+    off = _POSE_HEADER.size
+    cols = []
+    for dt in ("<u4", "<i4", "<i4", "<f4"):
+        cols.append(np.frombuffer(buf, dtype=dt, count=n, offset=off))
+        off += 4 * n
+    return {"seq": seq, "ts": ts, "keyframe": bool(flags & 1), "ids": cols[0],
+            "lat": cols[1] / 1e7, "lon": cols[2] / 1e7, "alt": cols[3]}
+
+
+@dataclass
+class _ClientState:
+    version: int = -1                       # -1 — нужен keyframe
+    sent: Dict[str, Set[str]] = field(default_factory=dict)  # только для клиентов с фильтром
+    binary: bool = False                    # позы бортов — бинарным кадром
+    known_ids: int = 0                      # сколько интернированных id клиент уже знает
+
+
+class StateFrames:
+    """Версионированное состояние + дельта-кадры по клиентам (только event loop)."""
+
+    def __init__(self, sources: Sources, rate_hz: float = 5.0) -> None:
+        self.sources = sources
+        self.period = 1.0 / max(rate_hz, 0.1)
+        self.version = 0
+        self.seq = 0
+        # kind -> id -> поле -> (значение, версия)
+        self._state: Dict[str, Dict[str, Dict[str, Tuple[Any, int]]]] = {k: {} for k in sources}
+        self._entity_ver: Dict[str, Dict[str, int]] = {k: {} for k in sources}
+        self._tombstones: Dict[str, Dict[str, int]] = {k: {} for k in sources}
+        # версия последнего изменения по виду сущностей (для ETag REST-эндпоинтов)
+        self.kind_version: Dict[str, int] = {k: 0 for k in sources}
+        # версия -> kind -> id изменившихся (новых или с новыми полями) сущностей
+        self._changes: Dict[int, Dict[str, Set[str]]] = {}
+        # kind -> id цели -> сущности, ссылающиеся на неё (см. REFS)
+        self._ref_of: Dict[str, Dict[str, Any]] = {k: {} for k in REFS if k in sources}
+        self._referrers: Dict[str, Dict[str, Set[str]]] = {k: {} for k in REFS if k in sources}
+        self._clients: Dict[Hashable, _ClientState] = {}
+        # id борта -> номер для бинарных кадров (не переиспользуются)
+        self._intern: Dict[str, int] = {}
+        self._intern_list: List[str] = []
+        self.frames_sent = 0
+
+    # --- клиенты ---
+    def add(self, client: Hashable, binary: bool = False) -> None:
+        self._clients[client] = _ClientState(binary=binary)
+
+    def remove(self, client: Hashable) -> None:
+        self._clients.pop(client, None)
+
+    def reset(self, client: Hashable) -> None:
+        """Следующий кадр клиента — keyframe (сменился фильтр)."""
+        st = self._clients.get(client)
+        if st is not None:
+            self._clients[client] = _ClientState(binary=st.binary, known_ids=st.known_ids)
+
+    # --- состояние ---
+    def tick(self) -> bool:
+        """Сравнить источники с прошлым тиком; True — что-то изменилось."""
+        v = self.version + 1
+        changed = False
+        # без клиентов журнал изменений не нужен: новый клиент начнёт с keyframe
+        changes: Dict[str, Set[str]] = {}
+        for kind, source in self.sources.items():
+            kind_changed = False
+            state = self._state[kind]
+            ever = self._entity_ver[kind]
+            tomb = self._tombstones[kind]
+            touched = changes.setdefault(kind, set())
+            current = dict(list(source().items()))  # источник пишет paho-поток
+            for eid, ent in current.items():
+                fields = dict(list(ent.items()))
+                old = state.get(eid)
+                if old is None:
+                    state[eid] = {f: (val, v) for f, val in fields.items()}
+                    ever[eid] = v
+                    tomb.pop(eid, None)
+                    touched.add(eid)
+                    self._set_ref(kind, eid, fields)
+                    kind_changed = True
+                    continue
+                dirty = False
+                for f, val in fields.items():
+                    prev = old.get(f)
+                    if prev is None or prev[0] != val:
+                        old[f] = (val, v)
+                        dirty = True
+                for f in [f for f in old if f not in fields]:
+                    if old[f][0] is not None:
+                        old[f] = (None, v)
+                        dirty = True
+                if dirty:
+                    ever[eid] = v
+                    touched.add(eid)
+                    self._set_ref(kind, eid, fields)
+                    kind_changed = True
+            for eid in [e for e in state if e not in current]:
+                del state[eid]
+                del ever[eid]
+                tomb[eid] = v
+                self._set_ref(kind, eid, None)
+                kind_changed = True
+            if kind_changed:
+                self.kind_version[kind] = v
+                changed = True
+        if changed:
+            self.version = v
+            if self._clients:
+                self._changes[v] = changes
+        return changed
+
+    def _set_ref(self, kind: str, eid: str, fields: Optional[Mapping[str, Any]]) -> None:
+        """Обновить индекс ссылок REFS (fields=None — сущность удалена)."""
+        refs = self._ref_of.get(kind)
+        if refs is None:
+            return
+        target = fields.get(REFS[kind][0]) if fields is not None else None
+        target = str(target) if target is not None else None
+        old = refs.get(eid)
+        if old == target:
+            return
+        index = self._referrers[kind]
+        if old is not None:
+            s = index.get(old)
+            if s is not None:
+                s.discard(eid)
+                if not s:
+                    del index[old]
+        if target is None:
+            refs.pop(eid, None)
+        else:
+            refs[eid] = target
+            index.setdefault(target, set()).add(eid)
+
+    def _changed_since(self, since: int) -> Dict[str, Set[str]]:
+        """kind -> id сущностей, изменившихся после версии since."""
+        out: Dict[str, Set[str]] = {}
+        for ver in reversed(self._changes):
+            if ver <= since:
+                break
+            for kind, ids in self._changes[ver].items():
+                out.setdefault(kind, set()).update(ids)
+        return out
+
+    def _prune(self) -> None:
+        """Надгробия и журнал изменений, которые видели все клиенты, больше не нужны."""
+        floor = min((c.version for c in self._clients.values() if c.version >= 0), default=self.version)
+        for tomb in self._tombstones.values():
+            for eid in [e for e, ver in tomb.items() if ver <= floor]:
+                del tomb[eid]
+        for ver in [ver for ver in self._changes if ver <= floor]:
+            del self._changes[ver]
+
+    def _delta(self, since: int, visible: Optional[Visible], st: _ClientState) -> Dict[str, Any]:
+        keyframe = since < 0
+        body: Dict[str, Any] = {}
+        removed: Dict[str, list] = {}
+        changed = self._changed_since(since) if visible is not None and not keyframe else {}
+        for kind, state in self._state.items():
+            ever = self._entity_ver[kind]
+            out: Dict[str, Dict[str, Any]] = {}
+            gone = [] if keyframe else [e for e, ver in self._tombstones[kind].items() if ver > since]
+            if visible is None:
+                for eid, ver in ever.items():
+                    if keyframe or ver > since:
+                        out[eid] = {f: val for f, (val, fv) in state[eid].items() if keyframe or fv > since}
+            else:
+                sent = st.sent.setdefault(kind, set())
+                if keyframe:
+                    candidates: Iterable[str] = list(state)
+                else:
+                    # видимость не изменившейся сущности (и её цели) осталась прежней
+                    candidates = set(changed.get(kind, ()))
+                    ref = REFS.get(kind)
+                    if ref is not None:
+                        index = self._referrers[kind]
+                        for target in changed.get(ref[1], ()):
+                            candidates |= index.get(target, set())
+                for eid in candidates:
+                    fields = state.get(eid)
+                    if fields is None:
+                        continue  # удалена — уже в gone по надгробию
+                    plain = {f: val for f, (val, _) in fields.items()}
+                    if not visible(kind, eid, plain):
+                        if eid in sent:
+                            sent.discard(eid)
+                            gone.append(eid)
+                        continue
+                    if keyframe or eid not in sent:
+                        out[eid] = plain
+                        sent.add(eid)
+                    elif ever[eid] > since:
+                        out[eid] = {f: val for f, (val, fv) in fields.items() if fv > since}
+                for eid in gone:
+                    sent.discard(eid)
+            body[kind] = out
+            removed[kind] = gone
+        body["removed"] = removed
+        return body
+
+    def _pose_rows(self, drones: Dict[str, Dict[str, Any]]) -> Tuple[list, list, list, list]:
+        """Вынуть lat/lon/alt из дельты бортов в колонки (значения — текущие, целиком)."""
+        ids, lats, lons, alts = [], [], [], []
+        state = self._state["drones"]
+        for eid in list(drones):
+            fields = drones[eid]
+            if not any(f in fields for f in POSE_FIELDS):
+                continue
+            cur = state[eid]
+            try:
+                lat, lon = float(cur["lat"][0]), float(cur["lon"][0])
+            except (KeyError, TypeError, ValueError):
+                continue  # без координат — остаётся в JSON
+            alt = cur.get("alt", (0.0, 0))[0]
+            for f in POSE_FIELDS:
+                fields.pop(f, None)
+            if not fields:
+                del drones[eid]
+            idx = self._intern.get(eid)
+            if idx is None:
+                idx = self._intern[eid] = len(self._intern_list)
+                self._intern_list.append(eid)
+            ids.append(idx)
+            lats.append(lat)
+            lons.append(lon)
+            alts.append(float(alt) if alt is not None else 0.0)
+        return ids, lats, lons, alts
+
+    def _encode(self, since: int, body: Dict[str, Any], binary: bool, known: int) -> List[Tuple[str, Any]]:
+        keyframe = since < 0
+        out: List[Tuple[str, Any]] = []
+        pose = None
+        if binary and "drones" in body:
+            pose = self._pose_rows(body["drones"])
+        empty = (not keyframe and not any(body[k] for k in self._state)
+                 and not any(body["removed"].values()))
+        self.seq += 1
+        head: Dict[str, Any] = {"type": "frame", "seq": self.seq, "keyframe": keyframe, "ts": time.time()}
+        if binary and len(self._intern_list) > known:
+            head["intern"] = {eid: i for i, eid in enumerate(self._intern_list[known:], known)}
+            empty = False
+        if not empty:
+            out.append((FRAME_KEY, json.dumps({**head, **body})))
+        if pose is not None and pose[0]:
+            out.append((FRAME_BIN_KEY, encode_poses(self.seq, head["ts"], keyframe, *pose)))
+        return out
+
+    def frame(self, client: Hashable, visible: Optional[Visible] = None,
+              _cache: Optional[Dict[Tuple[int, bool, int], List[Tuple[str, Any]]]] = None
+              ) -> List[Tuple[str, Any]]:
+        """
+        Сообщения кадра для клиента: [(ключ, JSON-текст | bytes)], пусто — изменений
+        нет. Версия клиента сдвигается.
+        """
+        st = self._clients.get(client)
+        if st is None or st.version == self.version:
+            return []
+        since = st.version
+        ck = (since, st.binary, st.known_ids)
+        if visible is None and _cache is not None and ck in _cache:
+            msgs = _cache[ck]
+        else:
+            msgs = self._encode(since, self._delta(since, visible, st), st.binary, st.known_ids)
+            if visible is None and _cache is not None:
+                _cache[ck] = msgs
+        st.version = self.version
+        if st.binary:
+            st.known_ids = len(self._intern_list)
+        return msgs
+
+    # --- цикл ---
+    def push(self, publish: Callable[[Any, str, Iterable[Hashable]], None],
+             pending: Callable[[Hashable], bool],
+             visible_for: Callable[[Hashable], Optional[Visible]]) -> int:
+        """Разослать кадры; pending(client) — прошлый кадр ещё не ушёл."""
+        cache: Dict[Tuple[int, bool, int], List[Tuple[str, Any]]] = {}
+        n = 0
+        for client in list(self._clients):
+            if pending(client):
+                continue
+            for key, payload in self.frame(client, visible_for(client), cache):
+                publish(payload, key, (client,))
+                n += 1
+        self.frames_sent += n
+        self._prune()
+        return n
+
+    async def run(self, publish: Callable[[Any, str, Iterable[Hashable]], None],
+                  pending: Callable[[Hashable], bool],
+                  visible_for: Callable[[Hashable], Optional[Visible]]) -> None:
+        while True:
+            t0 = time.monotonic()
+            try:
+                self.tick()
+                if self._clients:
+                    self.push(publish, pending, visible_for)
+            except Exception:
+                log.exception("ошибка формирования кадра")
+            await asyncio.sleep(max(0.0, self.period - (time.monotonic() - t0)))
@@ -0,0 +1,95 @@
+"""
+http_cache.py — кэш конфига и условные GET для REST-эндпоинтов дашборда.
+
+ConfigCache — YAML перечитывается только при смене mtime/размера файла.
+CachedBody — готовое JSON-тело ответа с ETag; пересобирается, только когда
+меняется версия данных (версии состояния ведёт frames.StateFrames). ETag —
+хэш тела: версии у каждого воркера свои, а одинаковое тело на любом воркере
+и после рестарта даёт тот же ETag (304 через балансировщик).
+conditional() — 304 Not Modified, если If-None-Match совпал с ETag.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+import yaml
+from fastapi import Request
+from fastapi.responses import Response
+
+
+class ConfigCache:
+    """Разобранный YAML-файл, инвалидируемый по (mtime_ns, size)."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._data: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def stamp(self) -> Tuple[int, int]:
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def get(self) -> Dict[str, Any]:
+        stamp = self.stamp()
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self._data = yaml.safe_load(f) or {}
+                    self._stamp = stamp
+        return self._data
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        self.get()
+        return self._stamp
+
+
+class CachedBody:
+    """JSON-тело + ETag, пересобираемые при смене версии."""
+
+    def __init__(self, name: str, build: Callable[..., Any]) -> None:
+        self.name = name
+        self.build = build
+        self._version: Optional[Hashable] = None
+        self._body = b""
+        self._etag = ""
+        self.builds = 0
+
+    def get(self, version: Hashable, *args: Any) -> Tuple[bytes, str]:
+        """args передаются в build, если тело пересобирается."""
+        if version != self._version:
+            body = json.dumps(self.build(*args), ensure_ascii=False).encode("utf-8")
+            digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+            self._body, self._etag = body, f'"{self.name}-{digest}"'
+            self._version = version
+            self.builds += 1
+        return self._body, self._etag
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def conditional(request: Request, cached: CachedBody, version: Hashable, *args: Any) -> Response:
+    """Ответ из кэша: 304 при совпадении If-None-Match, иначе готовое тело."""
+    body, etag = cached.get(version, *args)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
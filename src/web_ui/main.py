@@ -1,19 +1,32 @@
 from __future__ import annotations
 import json
 import asyncio
-import yaml
+import logging
+import os
 from pathlib import Path
-from typing import Any, Dict
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from typing import Any, Dict, Optional
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from starlette.datastructures import State
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
 from drone_core.config.settings import Settings
-from drone_core.infra.repositories.fleet_mem import FleetMem
-from drone_core.infra.repositories.missions_mem import MissionsMem
+from drone_core.infra.repositories import make_repos, init_repos
 from drone_core.domain.models import Order, LLA
+from drone_core.domain.services.trajectory import track_payload
 from drone_core.infra.messaging.mqtt_bus import MqttBus
+from drone_core.infra.messaging.topics import METRICS_ALL
+from drone_core.infra.telemetry.query import MAX_POINTS as TELEM_MAX_POINTS, TelemetryQueryClient
+from drone_core.utils.metrics import REGISTRY
+from web_ui.broadcaster import Broadcaster
+from web_ui.frames import FRAME_BIN_KEY, FRAME_KEY, StateFrames
+from web_ui.http_cache import CachedBody, ConfigCache, conditional
+from web_ui.mission_view import DEFAULT_LIMIT, MAX_LIMIT, paginate, project, split_fields
+from web_ui.orders import encode_orders, iter_ndjson, parse_array, validate_batch
+from web_ui.shared_state import SharedState
+from web_ui.sse import EventLog, dumps, event_stream
+from web_ui.state import Event, UiState
+from web_ui.subscriptions import Route, SubscriptionIndex
 
 # --- пути и настройки ---
 APP_ROOT = Path(__file__).parents[1]
@@ -28,210 +41,222 @@ app.mount(
 )
 
 settings = Settings()
-bus = MqttBus(settings.MQTT_URL, client_id="ui-bus")
-fleet_repo = FleetMem()
-missions_repo = MissionsMem()
-telemetry_clients: set[WebSocket] = set()
-active_drones: dict[str, dict] = {}
+# client id уникален на процесс (uvicorn --workers); сообщения UI читает из кольца
+# shared_state (tap), обработчики bus вызываются только для ответов telem_query —
+# остальной JSON в paho-потоке не разбирается
+bus = MqttBus(settings.MQTT_URL, client_id=f"ui-bus-{os.getpid()}",
+              accept_topic=lambda topic: topic.startswith("telem_query/"),
+              max_inflight=settings.UI_MQTT_MAX_INFLIGHT)
+# история телеметрии из TelemetryStore ingest (запрос/ответ по шине)
+telem_query = TelemetryQueryClient(bus, f"ui-{os.getpid()}", timeout=settings.TELEM_QUERY_TIMEOUT_SEC)
+fleet_repo, missions_repo = make_repos()
+# при REPO_IMPL=pg — локальный кэш, обновляемый через LISTEN/NOTIFY
+live_view = None
+# WebSocket-клиенты: своя ограниченная очередь и отправитель у каждого
+broadcaster = Broadcaster(
+    max_queue=settings.WS_QUEUE_MAX,
+    send_timeout_s=settings.WS_SEND_TIMEOUT_SEC,
+    slow_client_s=settings.WS_SLOW_CLIENT_SEC,
+)
+# подписки клиентов /ws (борта / миссии / область / типы) — только из event loop
+subscriptions = SubscriptionIndex(drone_lookup=lambda vid: app.state.active_drones.get(vid))
+# кадры состояния active_drones / active_missions с фиксированной частотой
+frames = StateFrames(
+    {"drones": lambda: app.state.active_drones, "missions": lambda: app.state.active_missions},
+    rate_hz=settings.UI_FRAME_HZ,
+)
+# состояние дашборда: борта, миссии, треки, метрики сервисов
+ui_state = UiState(settings.UI_TRACK_BYTES_PER_VEHICLE, settings.TELEM_ARCHIVE_DIR)
+trajectories = ui_state.trajectories
+service_metrics = ui_state.service_metrics
+UI_TOPICS = (
+    ("fleet/active", 1),
+    ("telem/+/+", 0),
+    ("mission/+/planned", 1),
+    ("mission/+/status", 1),
+    ("mission/+/assigned", 1),
+    ("mission/+/progress", 0),
+    (METRICS_ALL, 0),
+)
+# журнал событий бортов и миссий для /api/events (SSE); id — позиция в общем потоке
+sse_log = EventLog(settings.SSE_LOG_MAX)
+shared = SharedState(
+    ui_state, bus, UI_TOPICS, on_event=lambda ev: _on_event(ev), on_gap=sse_log.reset,
+    name=settings.UI_STATE_SHM,
+    workers=settings.UI_WORKERS,
+    ring_bytes=settings.UI_RING_MB << 20,
+    snapshot_bytes=settings.UI_SNAPSHOT_MB << 20,
+    snapshot_sec=settings.UI_SNAPSHOT_SEC,
+)
+
+
+# config.yaml перечитывается только при изменении файла
+sim_cfg = ConfigCache(SIM_CFG)
 
 
 def read_cfg() -> Dict[str, Any]:
-    with open(SIM_CFG, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    return sim_cfg.get()
+
+
+log = logging.getLogger("web-ui")
+
+
+def _task_done(task: asyncio.Task) -> None:
+    """Фоновая задача UI упала — в лог с трейсбеком (иначе исключение теряется)."""
+    if not task.cancelled() and task.exception() is not None:
+        log.error(f"фоновая задача {task.get_name()} завершилась с ошибкой", exc_info=task.exception())
+
+
+def _background(coro, name: str) -> asyncio.Task:
+    task = asyncio.create_task(coro, name=name)
+    task.add_done_callback(_task_done)
+    return task
 
 
 # === Startup ===
 @app.on_event("startup")
 async def _startup():
     print("[UI] Starting MqttBus...")
+    telem_query.start()
     bus.start()
 
-    # Главный event loop FastAPI
-    main_loop = asyncio.get_running_loop()
-
-    # Сохраняем активных дронов + активные миссии в памяти
-    app.state.active_drones = {}
-    app.state.active_missions = {}  # {mission_id: {...}}
-
-    def _update_mission(mid: str, **fields):
-        import time as _t
-        m = app.state.active_missions.setdefault(mid, {
-            "mission_id": mid,
-            "vehicle_id": None,
-            "status": "PLANNED",
-            "progress_current": 0,
-            "progress_total": 0,
-            "waypoints": [],
-        })
-        m.update({k: v for k, v in fields.items() if v is not None})
-        m["updated"] = _t.time()
-        # Уберём завершённые миссии через 30с (чтобы UI показал «COMPLETED» короткое время).
-        if m["status"] == "COMPLETED":
-            async def _cleanup(_mid=mid):
-                await asyncio.sleep(30)
-                app.state.active_missions.pop(_mid, None)
-            main_loop.call_soon_threadsafe(asyncio.create_task, _cleanup())
-
-    # --- обработчик сообщений MQTT ---
-    def _mqtt_handler(message):
-        try:
-            raw = message.payload
-            # Универсальный парсер payload
-            if isinstance(raw, (bytes, bytearray)):
-                text = raw.decode("utf-8", errors="ignore").strip()
-                data = json.loads(text) if text.startswith("{") else {"raw": text}
-            elif isinstance(raw, (dict, list)):
-                data = raw
-            elif isinstance(raw, str):
-                text = raw.strip()
-                data = json.loads(text) if text.startswith("{") else {"raw": text}
-            else:
-                data = {}
-        except Exception as e:
-            print(f"[UI] ⚠️ Ошибка парсинга MQTT payload: {e}")
-            data = {}
-
-        topic = message.topic
-        msg = {"topic": topic, "payload": data}
-
-        # === Обработка типов сообщений ===
-        if topic == "fleet/active":
-            msg["type"] = "drone_active"
-            d = data if isinstance(data, dict) else {}
-            drone_id = d.get("id", f"drone_{len(app.state.active_drones)}")
-            app.state.active_drones[drone_id] = {
-                "id": drone_id,
-                "name": d.get("name", drone_id),
-                "lat": d.get("lat"),
-                "lon": d.get("lon"),
-                "alt": d.get("alt", 0),
-                "status": d.get("status", "IDLE"),
-            }
-
-        elif topic.startswith("telem/"):
-            msg["type"] = "telemetry_update"
-
-            # Извлекаем ID дрона из топика (например telem/veh_0/pose)
-            parts = topic.split("/")
-            drone_id = parts[1] if len(parts) > 1 else "unknown"
-
-            # Если дрона ещё нет — добавляем его
-            if drone_id not in app.state.active_drones and isinstance(data, dict):
-                app.state.active_drones[drone_id] = {
-                    "id": drone_id,
-                    "name": drone_id,
-                    "lat": data.get("lat"),
-                    "lon": data.get("lon"),
-                    "alt": data.get("alt", 0),
-                    "status": "ACTIVE",
-                }
-                #print(f"[UI] 🟢 Новый дрон зарегистрирован: {drone_id}")
-
-            # Если уже есть — обновляем координаты
-            elif isinstance(data, dict):
-                d = app.state.active_drones[drone_id]
-                d["lat"] = data.get("lat", d.get("lat"))
-                d["lon"] = data.get("lon", d.get("lon"))
-                d["alt"] = data.get("alt", d.get("alt"))
-
-            # Лог для проверки
-            #if isinstance(data, dict):
-                #print(f"[UI] 📡 Telemetry from {drone_id}: lat={data.get('lat')} lon={data.get('lon')}")
-
-        elif topic.endswith("/planned"):
-            msg["type"] = "mission_planned"
-            mid = topic.split("/")[1] if len(topic.split("/")) > 1 else None
-            if mid and isinstance(data, dict):
-                _update_mission(
-                    mid,
-                    status="PLANNED",
-                    waypoints=data.get("waypoints", []),
-                )
-        elif topic.endswith("/assigned"):
-            msg["type"] = "mission_assigned"
-            mid = topic.split("/")[1] if len(topic.split("/")) > 1 else None
-            if mid and isinstance(data, dict):
-                _update_mission(
-                    mid,
-                    status="ASSIGNED",
-                    vehicle_id=data.get("vehicle_id"),
-                )
-        elif topic.endswith("/status"):
-            msg["type"] = "mission_status"
-            mid = topic.split("/")[1] if len(topic.split("/")) > 1 else None
-            if mid and isinstance(data, dict):
-                status = data.get("status")
-                _update_mission(mid, status=status, vehicle_id=data.get("vehicle_id"))
-        elif topic.endswith("/progress"):
-            msg["type"] = "mission_progress"
-            mid = topic.split("/")[1] if len(topic.split("/")) > 1 else None
-            if mid and isinstance(data, dict):
-                _update_mission(
-                    mid,
-                    progress_current=data.get("current", 0),
-                    progress_total=data.get("total", 0),
-                    vehicle_id=data.get("vehicle_id"),
-                    status="IN_PROGRESS" if int(data.get("current", 0)) > 0 else None,
-                )
-
-        # --- Отправка всем WebSocket клиентам ---
-        async def _send_to_all():
-            text = json.dumps(msg)
-            for c in list(telemetry_clients):
-                try:
-                    await c.send_text(text)
-                except Exception:
-                    telemetry_clients.discard(c)
-
-        main_loop.call_soon_threadsafe(asyncio.create_task, _send_to_all())
-
-    # --- подписки на MQTT ---
-    bus.subscribe("fleet/active", _mqtt_handler, qos=1)
-    bus.subscribe("telem/+/+", _mqtt_handler, qos=0)
-    bus.subscribe("mission/+/planned", _mqtt_handler, qos=1)
-    bus.subscribe("mission/+/status", _mqtt_handler, qos=1)
-    bus.subscribe("mission/+/assigned", _mqtt_handler, qos=1)
-    bus.subscribe("mission/+/progress", _mqtt_handler, qos=0)
+    if settings.REPO_IMPL.lower() == "pg":
+        from drone_core.infra.db.change_feed import ChangeFeed
+        from drone_core.infra.repositories.live_view import LiveView
+        global live_view
+        await init_repos()
+        live_view = LiveView(fleet_repo, missions_repo, ChangeFeed())
+        # кэширующие репозитории (REPO_CACHE) сбрасываем по тем же событиям,
+        # до того как LiveView перечитает через них изменённые строки
+        for repo in (fleet_repo, missions_repo):
+            if hasattr(repo, "on_change"):
+                live_view.add_invalidator(repo.on_change)
+        app.state.live_task = _background(live_view.run(), "live_view")
+
+    # активные дроны + активные миссии (словари ui_state — общие с кадрами и REST)
+    app.state.active_drones = ui_state.drones
+    app.state.active_missions = ui_state.missions  # {mission_id: {...}}
+    app.state.frames_task = _background(frames.run(
+        publish=lambda payload, key, clients: broadcaster.publish(payload, key, targets=clients),
+        pending=lambda ws: broadcaster.pending(ws, FRAME_KEY) or broadcaster.pending(ws, FRAME_BIN_KEY),
+        visible_for=subscriptions.visible_for,
+    ), "frames")
+
+    # Сообщения MQTT -> кольцо -> ui_state; при UI_WORKERS > 1 MQTT читает только лидер
+    app.state.shared_task = _background(shared.run(), "shared_state")
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    for name in ("shared_task", "frames_task", "live_task"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+    bus.stop()
+    # сегменты shm остаются — их подхватит следующий лидер
+    shared.close()
+
+
+def _on_event(ev: Event) -> None:
+    """Журнал SSE и поток сообщений raw-клиентам /ws (остальные получают кадры frames); event loop."""
+    text = None
+    if ev.chan in ("fleet", "mission"):
+        text = json.dumps(ev.msg)
+        sse_log.append(ev.seq, ev.msg.get("type", ev.chan), text)
+    else:
+        sse_log.advance(ev.seq)
+    if not subscriptions.raw_clients:
+        return
+    # состояние борта коалесцируется по топику (fleet/active — по id борта), события миссий — нет
+    if ev.chan == "fleet":
+        key = f"fleet/{ev.drone_id}"
+    else:
+        key = ev.msg["topic"] if ev.chan != "mission" else None
+    lags = ((f"hop.bus_to_ws.{ev.chan}", ev.ts), (f"hop.bridge_to_ws.{ev.chan}", ev.src_ts))
+    _dispatch(text or json.dumps(ev.msg), key, lags, ui_state.route(ev))
 
 
 # === Маршруты API ===
+DEFAULT_BASE = {"lat": 43.07470, "lon": -89.38420}
+
+
+def _active_missions_sorted() -> Dict[str, Any]:
+    # порядок держит индекс: невыполненные сверху, COMPLETED в конце
+    return {"missions": list(ui_state.mission_view.ordered())}
+
+
+# готовые тела ответов: пересобираются при смене версии состояния (frames.kind_version)
+# или конфига (mtime), запросы с совпавшим If-None-Match получают 304
+_bodies = {
+    "base": CachedBody("base", lambda: read_cfg().get("base", DEFAULT_BASE)),
+    "settings": CachedBody("settings", lambda count: {
+        "base": read_cfg().get("base", DEFAULT_BASE),
+        "drone_count": count,
+    }),
+    "drones": CachedBody("drones", lambda: {"drones": list(app.state.active_drones.values())}),
+    "fleet": CachedBody("fleet", lambda: {"fleet": list(app.state.active_drones.values())}),
+    "free_drones": CachedBody("free_drones", lambda: {"drones": [
+        d for d in app.state.active_drones.values() if d.get("status") in ("IDLE", "ACTIVE")
+    ]}),
+    "active_missions": CachedBody("active_missions", _active_missions_sorted),
+}
+
+
 @app.get("/")
 async def index():
     return FileResponse(str(APP_ROOT / "web_ui" / "static" / "index.html"))
 
 
 @app.get("/api/base")
-async def api_base():
-    cfg = read_cfg()
-    return cfg.get("base", {"lat": 43.07470, "lon": -89.38420})
+async def api_base(request: Request):
+    return conditional(request, _bodies["base"], sim_cfg.version)
 
 
 @app.get("/api/drones")
-async def api_drones():
+async def api_drones(request: Request):
     """Возвращает список активных дронов, полученных по MQTT"""
-    return {"drones": list(app.state.active_drones.values())}
+    return conditional(request, _bodies["drones"], frames.kind_version["drones"])
 
 
 @app.get("/api/missions")
-async def api_missions():
-    ms = await missions_repo.list_active()
-    return [m.dict() for m in ms]
+async def api_missions(limit: Optional[int] = None, cursor: Optional[str] = None, status: Optional[str] = None,
+                       vehicle_id: Optional[str] = None, fields: Optional[str] = None):
+    """
+    Активные миссии из репозитория. Без limit — весь список (как раньше);
+    с limit — страница {"items", "next_cursor"} в порядке (created_at, id),
+    фильтры status=A,B / vehicle_id, проекция fields=id,status.
+    """
+    if live_view is not None:
+        ms = live_view.list_active_missions()
+    else:
+        ms = await missions_repo.list_active()
+    statuses = set(split_fields(status) or ())
+    if statuses or vehicle_id is not None:
+        ms = [m for m in ms if (not statuses or getattr(m.status, "value", m.status) in statuses)
+              and (vehicle_id is None or m.vehicle_id == vehicle_id)]
+    cols = split_fields(fields)
+    if limit is None and cursor is None:
+        return [project(m.dict(), cols) for m in ms]
+    try:
+        page, nxt = paginate(ms, lambda m: (m.created_at.isoformat(), m.id), cursor,
+                             max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": [project(m.dict(), cols) for m in page], "next_cursor": nxt}
 
 
 @app.get("/api/settings")
-async def api_settings():
-    cfg = read_cfg()
-    return {
-        "base": cfg.get("base", {"lat": 43.07470, "lon": -89.38420}),
-        "drone_count": len((await fleet_repo.list_all()) or []),
-    }
+async def api_settings(request: Request):
+    count = (len(live_view.vehicles) if live_view is not None
+             else len((await fleet_repo.list_all()) or []))
+    return conditional(request, _bodies["settings"], (sim_cfg.version, count), count)
 
 
 @app.post("/api/orders")
 async def api_orders(body: Dict[str, Any]):
     """Создаёт заказ, публикует его в MQTT → orchestrator"""
     cfg = read_cfg()
-    base_cfg = cfg.get("base", {"lat": 43.07470, "lon": -89.38420})
+    base_cfg = cfg.get("base", DEFAULT_BASE)
     base = LLA(lat=float(base_cfg["lat"]), lon=float(base_cfg["lon"]), alt=60.0)
 
     addr1 = body.get("from") or {
@@ -260,30 +285,269 @@ async def api_orders(body: Dict[str, Any]):
     return {"status": "ok", "order_id": order.id}
 
 
+async def _publish_orders(items: list, base: Dict[str, Any], offset: int, results: list) -> None:
+    """Проверка куска пакета и публикация его заказов в orders/new (в потоке — не держим event loop)."""
+    orders, res = validate_batch(items, base, offset)
+    if orders:
+        errors = await asyncio.to_thread(lambda: bus.publish_many("orders/new", encode_orders(orders)))
+        it = iter(errors)
+        for r in res:
+            if "order_id" in r:
+                err = next(it)
+                if err is not None:
+                    r["error"] = f"publish failed: {err}"
+                    del r["order_id"]
+    results.extend(res)
+
+
+@app.post("/api/orders/batch")
+async def api_orders_batch(request: Request, results: str = Query("all", pattern="^(all|errors)$")):
+    """
+    Пакет заказов: JSON-массив или NDJSON (Content-Type application/x-ndjson,
+    разбирается и публикуется кусками по мере приёма). Каждый заказ — как у
+    /api/orders; ответ — результат по каждому элементу (?results=errors —
+    только отказы). Массив длиннее ORDERS_BATCH_MAX — 413; в NDJSON заказы
+    сверх лимита отклоняются поэлементно (предыдущие куски уже опубликованы).
+    """
+    cfg = read_cfg()
+    base = cfg.get("base", DEFAULT_BASE)
+    chunk, limit = settings.ORDERS_BATCH_CHUNK, settings.ORDERS_BATCH_MAX
+    out: list = []
+    total = 0
+    if "ndjson" in request.headers.get("content-type", ""):
+        async def flush(batch: list) -> None:
+            nonlocal total
+            room = max(0, min(len(batch), limit - total))
+            if room:
+                await _publish_orders(batch[:room], base, total, out)
+            out.extend({"index": total + k, "error": f"batch exceeds {limit} orders"}
+                       for k in range(room, len(batch)))
+            total += len(batch)
+
+        tail = b""
+        items: list = []
+        async for data in request.stream():
+            lines = (tail + data).split(b"\n")
+            tail = lines.pop()
+            items.extend(iter_ndjson(lines))
+            while len(items) >= chunk:
+                await flush(items[:chunk])
+                items = items[chunk:]
+        items.extend(iter_ndjson([tail]))
+        await flush(items)
+    else:
+        try:
+            items = parse_array(await request.body())
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        if len(items) > limit:
+            raise HTTPException(413, f"batch exceeds {limit} orders")
+        for i in range(0, len(items), chunk):
+            await _publish_orders(items[i:i + chunk], base, i, out)
+        total = len(items)
+
+    failed = [r for r in out if "error" in r]
+    REGISTRY.counter("orders.batch.accepted").inc(total - len(failed))
+    REGISTRY.counter("orders.batch.rejected").inc(len(failed))
+    return {
+        "status": "ok",
+        "total": total,
+        "accepted": total - len(failed),
+        "rejected": len(failed),
+        "results": failed if results == "errors" else out,
+    }
+
+
 @app.post("/api/start_mission")
 async def start_mission():
     return {"status": "not_implemented"}
 
 
 # === WebSocket ===
+def _dispatch(text: str, key: Optional[str], lags: tuple, route: Route) -> None:
+    """Кадр — только клиентам, чьи подписки совпали с маршрутом (event loop)."""
+    broadcaster.publish(text, key, lags, targets=subscriptions.match(route))
+
+
 @app.websocket("/ws")
 async def ws(websocket: WebSocket):
     await websocket.accept()
-    telemetry_clients.add(websocket)
+    broadcaster.add(websocket)
+    subscriptions.add(websocket)
+    # первый кадр — keyframe; ?format=binary — позы бортов бинарными кадрами
+    frames.add(websocket, binary=websocket.query_params.get("format") == "binary")
     print("🌐 WebSocket клиент подключен")
 
     try:
-        # просто держим соединение живым
+        # команды подписки; кадры шлёт отправитель клиента в broadcaster
         while True:
-            await asyncio.sleep(30)
-    except WebSocketDisconnect:
-        telemetry_clients.discard(websocket)
+            text = await websocket.receive_text()
+            try:
+                req = json.loads(text)
+                if not isinstance(req, dict):
+                    raise ValueError("expected JSON object")
+                before = subscriptions.get(websocket)
+                scope = (before.vehicles, before.missions, before.bbox) if before else None
+                flt = subscriptions.apply(websocket, req)
+                if (flt.vehicles, flt.missions, flt.bbox) != scope:
+                    frames.reset(websocket)  # другой набор сущностей — заново keyframe
+                reply = {"type": "subscription", "filter": flt.to_dict()}
+            except (ValueError, TypeError) as e:
+                reply = {"type": "error", "error": str(e)}
+            broadcaster.publish(json.dumps(reply), targets=[websocket])
+    except (WebSocketDisconnect, RuntimeError):
         print("❌ WebSocket отключен")
+    finally:
+        frames.remove(websocket)
+        subscriptions.remove(websocket)
+        broadcaster.remove(websocket)
+
+# готовые тела SSE: (версия, текст) — при штормах переподключений snapshot собирается один раз
+_sse_bodies: Dict[str, tuple] = {}
+
+
+def _sse_cached(name: str, version: Any, build) -> str:
+    cached = _sse_bodies.get(name)
+    if cached is None or cached[0] != version:
+        cached = _sse_bodies[name] = (version, build())
+    return cached[1]
+
+
+def _sse_snapshot() -> tuple:
+    seq = sse_log.last
+    return seq, _sse_cached("snapshot", (shared.stream, shared.pos, seq), lambda: dumps({
+        "drones": list(ui_state.drones.values()),
+        "missions": list(ui_state.mission_view.ordered()),
+    }))
+
+
+def _sse_poses() -> tuple:
+    version = frames.kind_version["drones"]
+    return version, _sse_cached("poses", version, lambda: dumps({
+        vid: [d.get("lat"), d.get("lon"), d.get("alt")] for vid, d in ui_state.drones.items()
+    }))
+
+
+@app.get("/api/events")
+async def api_events(request: Request, last_event_id: Optional[str] = None):
+    """
+    Server-Sent Events: drone_active / mission_* с id (Last-Event-ID — досылка
+    пропущенного), poses — позиции бортов раз в SSE_POSE_SEC, snapshot — полное
+    состояние при первом подключении или если история уже недоступна.
+    """
+    return StreamingResponse(
+        event_stream(
+            sse_log, lambda: shared.stream, _sse_snapshot, _sse_poses,
+            request.headers.get("last-event-id") or last_event_id,
+            request.is_disconnected,
+            heartbeat_sec=settings.SSE_HEARTBEAT_SEC,
+            pose_sec=settings.SSE_POSE_SEC,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/trajectory/{vehicle_id}")
+async def api_trajectory(vehicle_id: str, max_points: int = 300, t_from: Optional[float] = None,
+                         t_to: Optional[float] = None, encoding: str = "json"):
+    """Упрощённый трек борта: не больше max_points точек при любой длительности полёта."""
+    res = trajectories.vehicle(vehicle_id, max(2, min(max_points, 5000)), t_from, t_to)
+    if res is None:
+        raise HTTPException(status_code=404, detail="no trajectory")
+    return {"vehicle_id": vehicle_id, **track_payload(*res, encoding=encoding)}
+
+
+@app.get("/api/trajectory/mission/{mission_id}")
+async def api_mission_trajectory(mission_id: str, max_points: int = 300, encoding: str = "json"):
+    """Упрощённый фактический трек миссии (с момента назначения борта)."""
+    res = trajectories.mission(mission_id, max(2, min(max_points, 5000)))
+    if res is None:
+        raise HTTPException(status_code=404, detail="no trajectory")
+    return {"mission_id": mission_id, **track_payload(*res, encoding=encoding)}
+
+
+def _track_response(key: str, ident: str, res: Any, encoding: str) -> Dict[str, Any]:
+    if res is None:
+        raise HTTPException(status_code=404, detail="no track")
+    points, tolerance_m, source = res
+    body = {key: ident, "source": source, **track_payload(points, tolerance_m, encoding=encoding)}
+    if len(points):
+        body["from"], body["to"] = float(points[0, 0]), float(points[-1, 0])
+    return body
+
+
+@app.get("/api/vehicles/{vehicle_id}/track")
+async def api_vehicle_track(vehicle_id: str, t_from: Optional[float] = Query(None, alias="from"),
+                            t_to: Optional[float] = Query(None, alias="to"), max_points: int = 1000,
+                            encoding: str = "polyline"):
+    """
+    История трека борта за [from, to] (unix-секунды), не больше max_points точек;
+    encoding — json / polyline / packed. Источник: сырые позы, упрощённые
+    уровни или Parquet-архив (поле source).
+    """
+    max_points = max(2, min(max_points, 20_000))
+    res = ui_state.tracks.vehicle(vehicle_id, max_points, t_from, t_to)
+    if res is None:
+        res = await ui_state.tracks.archive(vehicle_id, max_points, t_from, t_to)
+    return _track_response("vehicle_id", vehicle_id, res, encoding)
+
+
+@app.get("/api/vehicles/{vehicle_id}/telemetry")
+async def api_vehicle_telemetry(vehicle_id: str, channel: str = "pose", seconds: Optional[float] = None,
+                                t_from: Optional[float] = Query(None, alias="from"),
+                                t_to: Optional[float] = Query(None, alias="to"), max_points: int = 1000):
+    """
+    История канала (pose / battery / health) из колец telemetry_ingest: за
+    последние seconds, за [from, to] или последний сэмпл. columns — по колонке
+    на поле, null — нет значения.
+    """
+    res = await telem_query.query(vehicle_id, channel, seconds=seconds, t_from=t_from, t_to=t_to,
+                                  max_points=max(1, min(max_points, TELEM_MAX_POINTS)))
+    if res is None:
+        raise HTTPException(504, "telemetry_ingest did not answer")
+    if res.get("error"):
+        raise HTTPException(400, res["error"])
+    if res.get("columns") is None:
+        raise HTTPException(404, f"no {channel} history for {vehicle_id}")
+    return res
+
+
+@app.get("/api/missions/{mission_id}/track")
+async def api_mission_track(mission_id: str, max_points: int = 1000, encoding: str = "polyline"):
+    """Фактический трек миссии — позы её борта от назначения до завершения."""
+    max_points = max(2, min(max_points, 20_000))
+    tracks = ui_state.tracks
+    res = tracks.mission(mission_id, max_points)
+    if res is None:
+        w = tracks.mission_window(mission_id)
+        if w is not None:
+            res = await tracks.archive(w[0], max_points, w[1], w[2])
+    return _track_response("mission_id", mission_id, res, encoding)
+
+
+@app.get("/api/metrics")
+async def api_metrics(prefix: str = ""):
+    """Метрики UI-процесса и последние снапшоты сервисов из metrics/+ (лаги hop.*, БД)."""
+    return {
+        "web_ui": {
+            **REGISTRY.snapshot(prefix),
+            "ws": {**broadcaster.stats(), "frames_sent": frames.frames_sent},
+            "state": shared.stats(),
+            "sse": {"log": len(sse_log), "floor": sse_log.floor, "last": sse_log.last, "appended": sse_log.appended},
+        },
+        "services": {
+            name: {**snap, "histograms": {k: v for k, v in snap.get("histograms", {}).items()
+                                          if k.startswith(prefix)}}
+            for name, snap in service_metrics.items()
+        },
+    }
+
 
 @app.get("/api/fleet")
-async def api_fleet():
+async def api_fleet(request: Request):
     """Возвращает весь флот с актуальной телеметрией"""
-    return {"fleet": list(app.state.active_drones.values())}
+    return conditional(request, _bodies["fleet"], frames.kind_version["drones"])
 
 @app.get("/api/system/mode")
 async def api_system_mode():
@@ -292,16 +556,29 @@ async def api_system_mode():
 
 
 @app.get("/api/free_drones")
-async def api_free_drones():
+async def api_free_drones(request: Request):
     """Возвращает только свободных дронов"""
-    free = [d for d in app.state.active_drones.values() if d.get("status") in ("IDLE", "ACTIVE")]
-    return {"drones": free}
+    return conditional(request, _bodies["free_drones"], frames.kind_version["drones"])
 
 
 @app.get("/api/active_missions")
-async def api_active_missions():
-    """Возвращает список активных миссий с их текущим прогрессом."""
-    ms = list(app.state.active_missions.values())
-    # сортируем: невыполненные сверху, COMPLETED в конце
-    ms.sort(key=lambda m: (m.get("status") == "COMPLETED", -m.get("updated", 0)))
-    return {"missions": ms}
+async def api_active_missions(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None,
+                              status: Optional[str] = None, vehicle_id: Optional[str] = None,
+                              updated_since: Optional[float] = None, fields: Optional[str] = None):
+    """
+    Активные миссии с их текущим прогрессом (невыполненные сверху, COMPLETED в конце).
+    Без параметров — весь список (кэшированное тело + ETag). С limit/cursor/фильтрами —
+    страница по индексам: status=A,B, vehicle_id, updated_since, fields=mission_id,status;
+    next_cursor — для следующей страницы.
+    """
+    if limit is None and cursor is None and status is None and vehicle_id is None \
+            and updated_since is None and fields is None:
+        return conditional(request, _bodies["active_missions"], frames.kind_version["missions"])
+    view = ui_state.mission_view
+    try:
+        page, nxt = view.query(status=split_fields(status), vehicle_id=vehicle_id,
+                               updated_since=updated_since, cursor=cursor,
+                               limit=limit or DEFAULT_LIMIT, fields=split_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"missions": page, "next_cursor": nxt, "total": len(view), "by_status": view.counts()}
@@ -0,0 +1,249 @@
+"""
+mission_view.py — индексы миссий дашборда и их постраничная выдача.
+
+MissionView держит поверх словаря {mission_id: dict} (UiState.missions):
+  * порядок выдачи — отсортированный список ключей (COMPLETED в конце,
+    свежие сверху): (завершена, -updated, mission_id); вставка/удаление —
+    bisect, без сортировки всего словаря на каждый запрос;
+  * индексы status -> {mission_id} и vehicle_id -> {mission_id}.
+
+Пагинация по курсору (keyset): курсор — ключ последней выданной миссии,
+следующая страница начинается строго после него, поэтому обновления миссий
+между запросами не дают дублей/пропусков среди не изменившихся миссий.
+
+TtlWheel — хешированное колесо таймеров: снятие завершённых миссий с показа
+одним проходом по слотам вместо задачи на каждую миссию.
+Не потокобезопасны — только event loop.
+"""
+from __future__ import annotations
+import base64
+import bisect
+import heapq
+import json
+import math
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+Key = Tuple[bool, float, str]
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key), separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ...]:
+    """ValueError — битый курсор."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except Exception as e:
+        raise ValueError(f"bad cursor: {e}") from None
+    if not isinstance(key, list):
+        raise ValueError("bad cursor")
+    return tuple(key)
+
+
+def project(item: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Только поля fields (None — все)."""
+    if not fields:
+        return item
+    return {f: item[f] for f in fields if f in item}
+
+
+def split_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """'a,b' -> ['a', 'b']; пусто — None."""
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()] or None
+
+
+def paginate(items: Iterable[Any], key: Callable[[Any], Tuple[Any, ...]], cursor: Optional[str],
+             limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    Страница из произвольной коллекции без полной сортировки: limit + 1
+    наименьших ключей после курсора (heapq, O(N log limit)).
+    """
+    after = decode_cursor(cursor) if cursor else None
+    pool = items if after is None else (x for x in items if key(x) > after)
+    page = heapq.nsmallest(limit + 1, pool, key=key)
+    nxt = encode_cursor(key(page[limit - 1])) if len(page) > limit else None
+    return page[:limit], nxt
+
+
+class MissionView:
+    """Индексы миссий UI поверх словаря missions (словарь меняет UiState, затем touch/remove)."""
+
+    def __init__(self, missions: Dict[str, Dict[str, Any]]) -> None:
+        self.missions = missions
+        self._order: List[Key] = []
+        self._keys: Dict[str, Key] = {}
+        self._meta: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        self._by_vehicle: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    @staticmethod
+    def key(m: Dict[str, Any]) -> Key:
+        return (m.get("status") == "COMPLETED", -float(m.get("updated") or 0.0), str(m.get("mission_id")))
+
+    # --- индексы ---
+    def touch(self, mid: str) -> None:
+        """Миссия mid добавлена или изменена."""
+        m = self.missions.get(mid)
+        if m is None:
+            self.remove(mid)
+            return
+        key = self.key(m)
+        old = self._keys.get(mid)
+        if old != key:
+            if old is not None:
+                self._order.pop(bisect.bisect_left(self._order, old))
+            bisect.insort(self._order, key)
+            self._keys[mid] = key
+        meta = (m.get("status"), m.get("vehicle_id"))
+        old_meta = self._meta.get(mid)
+        if old_meta != meta:
+            if old_meta is not None:
+                self._unindex(mid, old_meta)
+            for index, value in zip((self._by_status, self._by_vehicle), meta):
+                if value is not None:
+                    index.setdefault(str(value), set()).add(mid)
+            self._meta[mid] = meta
+
+    def remove(self, mid: str) -> None:
+        key = self._keys.pop(mid, None)
+        if key is not None:
+            self._order.pop(bisect.bisect_left(self._order, key))
+        meta = self._meta.pop(mid, None)
+        if meta is not None:
+            self._unindex(mid, meta)
+
+    def _unindex(self, mid: str, meta: Tuple[Optional[str], Optional[str]]) -> None:
+        for index, value in zip((self._by_status, self._by_vehicle), meta):
+            if value is None:
+                continue
+            s = index.get(str(value))
+            if s is not None:
+                s.discard(mid)
+                if not s:
+                    del index[str(value)]
+
+    def rebuild(self) -> None:
+        """Индексы заново по словарю (после загрузки снапшота)."""
+        self._order, self._keys, self._meta = [], {}, {}
+        self._by_status, self._by_vehicle = {}, {}
+        for mid in self.missions:
+            self.touch(mid)
+
+    # --- выдача ---
+    def ordered(self) -> Iterator[Dict[str, Any]]:
+        for key in self._order:
+            yield self.missions[key[2]]
+
+    def counts(self) -> Dict[str, int]:
+        return {status: len(ids) for status, ids in self._by_status.items()}
+
+    def query(self, *, status: Optional[Sequence[str]] = None, vehicle_id: Optional[str] = None,
+              updated_since: Optional[float] = None, cursor: Optional[str] = None,
+              limit: int = DEFAULT_LIMIT, fields: Optional[Sequence[str]] = None
+              ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Страница миссий в порядке выдачи; (миссии, курсор следующей страницы или None)."""
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        after: Optional[Key] = None
+        if cursor:
+            k = decode_cursor(cursor)
+            if len(k) != 3:
+                raise ValueError("bad cursor")
+            after = (bool(k[0]), float(k[1]), str(k[2]))
+
+        # кандидаты из индексов — если есть фильтр по статусу/борту
+        candidates: Optional[Set[str]] = None
+        if status:
+            candidates = set().union(*(self._by_status.get(s, ()) for s in status))
+        if vehicle_id is not None:
+            by_vehicle = self._by_vehicle.get(vehicle_id, set())
+            candidates = by_vehicle if candidates is None else candidates & by_vehicle
+
+        page: List[Key] = []
+        if candidates is not None:
+            keys = (self._keys[mid] for mid in candidates)
+            if after is not None:
+                keys = (k for k in keys if k > after)
+            if updated_since is not None:
+                keys = (k for k in keys if -k[1] >= updated_since)
+            page = heapq.nsmallest(limit + 1, keys)
+        else:
+            i = 0 if after is None else bisect.bisect_right(self._order, after)
+            order = self._order
+            while i < len(order) and len(page) <= limit:
+                k = order[i]
+                i += 1
+                if updated_since is not None and -k[1] < updated_since:
+                    # внутри группы (активные / завершённые) дальше только старее
+                    if not k[0]:
+                        i = bisect.bisect_left(order, (True, -math.inf, ""))
+                        continue
+                    break
+                page.append(k)
+        nxt = encode_cursor(page[limit - 1]) if len(page) > limit else None
+        return [project(self.missions[k[2]], fields) for k in page[:limit]], nxt
+
+
+class TtlWheel:
+    """
+    Колесо таймеров: slots слотов по tick_sec. Ключ со сроком за пределами
+    оборота колеса лежит в своём слоте и пропускается, пока срок не наступит.
+    schedule() переносит срок, cancel() снимает — ленивое удаление из слотов.
+    """
+
+    def __init__(self, tick_sec: float = 1.0, slots: int = 64) -> None:
+        self.tick_sec = tick_sec
+        self.slots: List[Set[Hashable]] = [set() for _ in range(slots)]
+        self._deadline: Dict[Hashable, float] = {}
+        self._tick: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._deadline)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadline
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        self._deadline[key] = deadline
+        self.slots[int(deadline // self.tick_sec) % len(self.slots)].add(key)
+
+    def cancel(self, key: Hashable) -> None:
+        self._deadline.pop(key, None)
+
+    def clear(self) -> None:
+        for s in self.slots:
+            s.clear()
+        self._deadline.clear()
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Ключи с истёкшим сроком: слоты от прошлого тика (включительно — в нём
+        могли остаться сроки позже прошлого now) до текущего, не больше оборота."""
+        tick = int(now // self.tick_sec)
+        start = tick - len(self.slots) + 1 if self._tick is None else max(self._tick, tick - len(self.slots) + 1)
+        self._tick = tick
+        due: List[Hashable] = []
+        for t in range(start, tick + 1):
+            slot = self.slots[t % len(self.slots)]
+            keep = set()
+            for key in slot:
+                dl = self._deadline.get(key)
+                if dl is None:
+                    continue
+                if int(dl // self.tick_sec) % len(self.slots) != t % len(self.slots):
+                    continue  # перенесён в другой слот
+                if dl <= now:
+                    del self._deadline[key]
+                    due.append(key)
+                else:
+                    keep.add(key)
+            self.slots[t % len(self.slots)] = keep
+        return due
@@ -0,0 +1,156 @@
+"""
+orders.py — пакетный приём заказов для POST /api/orders/batch.
+
+Заказ пакета — тот же объект, что у POST /api/orders: from/to ({lat, lon,
+alt}) или pickup_lat/pickup_lon/drop_lat/drop_lon, weight. Пакет — JSON-массив
+или NDJSON (по объекту на строку); NDJSON разбирается и публикуется кусками
+по мере приёма тела.
+
+validate_batch() проверяет координаты куска одним проходом numpy (вместо
+pydantic на каждый заказ) и собирает словари заказов той же формы, что
+Order.dict(); база одна на весь пакет. Результат — по элементу пакета:
+{"index", "order_id"} или {"index", "error"}.
+"""
+from __future__ import annotations
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+DEFAULT_ALT = 60.0
+DEFAULT_WEIGHT = 2.0
+
+# столбцы матрицы куска
+_COLS = ("pickup_lat", "pickup_lon", "pickup_alt", "drop_lat", "drop_lon", "drop_alt", "weight")
+_NAN = float("nan")
+
+
+def _num(v: Any, default: float = _NAN) -> float:
+    if v is None:
+        return default
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return _NAN
+
+
+def _row(item: Any) -> Optional[Tuple[Any, ...]]:
+    """Сырые значения столбцов _COLS из заказа; None — не объект."""
+    if not isinstance(item, dict):
+        return None
+    a = item.get("from")
+    b = item.get("to")
+    if not isinstance(a, dict):
+        a = {"lat": item.get("pickup_lat"), "lon": item.get("pickup_lon")}
+    if not isinstance(b, dict):
+        b = {"lat": item.get("drop_lat"), "lon": item.get("drop_lon")}
+    return (a.get("lat"), a.get("lon"), a.get("alt", DEFAULT_ALT),
+            b.get("lat"), b.get("lon"), b.get("alt", DEFAULT_ALT),
+            item.get("weight", DEFAULT_WEIGHT))
+
+
+def _matrix(rows: List[Tuple[Any, ...]]) -> np.ndarray:
+    """(N, 7) float64; нечисловое — NaN."""
+    try:
+        m = np.array(rows, dtype=np.float64).reshape(len(rows), len(_COLS))
+    except (TypeError, ValueError):
+        m = np.array([[_num(v) for v in r] for r in rows], dtype=np.float64).reshape(len(rows), len(_COLS))
+    # явный null в alt/weight — значение по умолчанию, как у одиночного заказа
+    for col, default in ((2, DEFAULT_ALT), (5, DEFAULT_ALT), (6, DEFAULT_WEIGHT)):
+        nulls = [i for i, r in enumerate(rows) if r[col] is None]
+        if nulls:
+            m[nulls, col] = default
+    return m
+
+
+def validate_batch(items: Sequence[Any], base: Dict[str, Any],
+                   offset: int = 0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Проверить кусок пакета: (заказы к публикации, результаты по элементам).
+    offset — индекс первого элемента куска в пакете.
+    """
+    base_lla = {"lat": float(base["lat"]), "lon": float(base["lon"]), "alt": DEFAULT_ALT}
+    results: List[Dict[str, Any]] = [{"index": offset + i} for i in range(len(items))]
+    orders: List[Dict[str, Any]] = []
+    rows: List[Tuple[Any, ...]] = []
+    pos: List[int] = []
+    for i, item in enumerate(items):
+        if isinstance(item, BadLine):
+            results[i]["error"] = item.error
+            continue
+        r = _row(item)
+        if r is None:
+            results[i]["error"] = "order must be an object"
+        else:
+            rows.append(r)
+            pos.append(i)
+    if not rows:
+        return orders, results
+
+    m = _matrix(rows)
+    lat = m[:, [0, 3]]
+    lon = m[:, [1, 4]]
+    # первая сработавшая проверка — причина отказа
+    checks = (
+        (np.isnan(lat).any(axis=1) | np.isnan(lon).any(axis=1), "Missing coordinates"),
+        (~np.isfinite(lat).all(axis=1) | (np.abs(lat) > 90).any(axis=1), "lat out of range"),
+        (~np.isfinite(lon).all(axis=1) | (np.abs(lon) > 180).any(axis=1), "lon out of range"),
+        (~np.isfinite(m[:, [2, 5]]).all(axis=1), "bad alt"),
+        (~np.isfinite(m[:, 6]) | (m[:, 6] <= 0), "bad weight"),
+    )
+    reason = np.full(len(rows), -1, dtype=np.int8)
+    for k, (mask, _) in enumerate(checks):
+        reason[(reason < 0) & mask] = k
+
+    for i, r, row in zip(pos, reason.tolist(), m.tolist()):
+        if r >= 0:
+            results[i]["error"] = checks[r][1]
+            continue
+        oid = f"ord_{uuid4().hex[:8]}"
+        orders.append({
+            "id": oid,
+            "base": base_lla,
+            "addr1": {"lat": row[0], "lon": row[1], "alt": row[2]},
+            "addr2": {"lat": row[3], "lon": row[4], "alt": row[5]},
+            "payload_kg": row[6],
+            "priority": "normal",
+        })
+        results[i]["order_id"] = oid
+    return orders, results
+
+
+def encode_orders(orders: Sequence[Dict[str, Any]]) -> List[bytes]:
+    """Тела MQTT-сообщений orders/new (как MqttBus.publish для dict)."""
+    return [json.dumps(o, ensure_ascii=False).encode("utf-8") for o in orders]
+
+
+def parse_array(body: bytes) -> List[Any]:
+    """JSON-массив заказов; ValueError — не JSON или не массив."""
+    try:
+        items = json.loads(body)
+    except ValueError as e:
+        raise ValueError(f"invalid JSON: {e}") from None
+    if not isinstance(items, list):
+        raise ValueError("expected a JSON array of orders")
+    return items
+
+
+class BadLine:
+    """Строка NDJSON, которая не разобралась, — ошибка своего элемента пакета."""
+    __slots__ = ("error",)
+
+    def __init__(self, error: str) -> None:
+        self.error = error
+
+
+def iter_ndjson(lines: Iterable[bytes]) -> Iterator[Any]:
+    """Элементы NDJSON (пустые строки пропускаются, битые — BadLine)."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield BadLine(f"invalid JSON: {e}")
@@ -0,0 +1,551 @@
+"""
+shared_state.py — общее состояние нескольких воркеров UI (uvicorn --workers N).
+
+MQTT читает один воркер — лидер, выбранный блокировкой flock на файле
+<tmp>/<name>.lock (при падении лидера блокировку сразу берёт другой воркер).
+Лидер кладёт сырые сообщения (топик, payload, время приёма) в кольцо в
+shared memory; каждый воркер, включая лидера, читает кольцо по порядку и
+применяет сообщения к своему UiState — вид у всех воркеров одинаковый, а
+рассылка WebSocket-клиентам масштабируется по ядрам.
+
+Воркер, который отстал больше чем на размер кольца или только запустился,
+догоняет по снапшоту: лидер раз в snapshot_sec пишет JSON состояния с
+позицией кольца во второй сегмент (seqlock). Треки бортов в снапшот не
+входят — у догнавшего воркера они начинаются с момента догонки.
+
+Кольцо — поток записей, выровненных по 8 байт:
+    u4 длина записи | u4 длина payload | u2 длина топика | u2 — | f8 время приёма | топик | payload
+Нулевая длина — «перейти в начало буфера». head — позиция в байтах, только
+растёт; запись с маркером пишется не дальше head + 2 * max_record, поэтому
+читатель с позицией pos валиден, пока head + 2 * max_record <= pos + capacity.
+
+При одном воркере (UI_WORKERS=1) кольцо — обычный bytearray без shm и
+блокировок: путь сообщения тот же.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import struct
+import tempfile
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from drone_core.infra.telemetry.shm_snapshot import _attach_untracked
+from drone_core.utils.metrics import REGISTRY
+from web_ui.state import Event, UiState
+
+log = logging.getLogger("ui-shared-state")
+
+RING_MAGIC = 0x55_49_52_31      # "UIR1"
+SNAP_MAGIC = 0x55_49_53_31      # "UIS1"
+VERSION = 2
+
+RING_HEADER = np.dtype([
+    ("magic", "<u4"),
+    ("version", "<u2"),
+    ("_pad", "<u2"),
+    ("capacity", "<u8"),
+    ("head", "<u8"),
+    ("epoch", "<u4"),
+    ("writer_pid", "<u4"),
+    ("updated_ts", "<f8"),
+    ("stream_id", "<u4"),
+    ("_pad2", "<u4"),
+    ("_reserved", "<u8", (2,)),
+])  # 64 байта
+
+SNAP_HEADER = np.dtype([
+    ("magic", "<u4"),
+    ("version", "<u2"),
+    ("_pad", "<u2"),
+    ("capacity", "<u8"),
+    ("seq", "<u8"),
+    ("epoch", "<u4"),
+    ("length", "<u4"),
+    ("ring_pos", "<u8"),
+    ("updated_ts", "<f8"),
+    ("_reserved", "<u8", (2,)),
+])  # 64 байта
+
+_REC = struct.Struct("<IIHHd")  # 20 байт
+_SIZE = struct.Struct("<I")
+_ALIGN = 8
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) & ~(_ALIGN - 1)
+
+
+def _segment(name: str, size: int, create: bool) -> Tuple[shared_memory.SharedMemory, bool]:
+    """(сегмент, создан ли заново); create=False — только подключиться."""
+    if create:
+        try:
+            return shared_memory.SharedMemory(name=name, create=True, size=size), True
+        except FileExistsError:
+            pass
+    return _attach_untracked(name), False
+
+
+class EventRing:
+    """Кольцо сырых сообщений; писатель один (лидер), читателей сколько угодно."""
+
+    def __init__(self, buf: Any, shm: Optional[shared_memory.SharedMemory] = None) -> None:
+        self._shm = shm
+        self._header = np.ndarray((1,), dtype=RING_HEADER, buffer=buf)
+        cap = int(self._header[0]["capacity"])
+        self._data = memoryview(buf)[RING_HEADER.itemsize:RING_HEADER.itemsize + cap]
+        self.capacity = cap
+        self.max_record = min(cap // 8, 1 << 20)
+        self.oversize = 0
+
+    @classmethod
+    def local(cls, capacity: int) -> "EventRing":
+        """Кольцо в памяти процесса (один воркер)."""
+        buf = bytearray(RING_HEADER.itemsize + _aligned(capacity))
+        cls._init_header(buf, _aligned(capacity), epoch=1)
+        return cls(buf)
+
+    @classmethod
+    def open(cls, name: str, capacity: int, create: bool) -> Optional["EventRing"]:
+        """Сегмент name; None — сегмента нет, а create=False."""
+        capacity = _aligned(capacity)
+        try:
+            shm, fresh = _segment(name, RING_HEADER.itemsize + capacity, create)
+        except FileNotFoundError:
+            return None
+        header = np.ndarray((1,), dtype=RING_HEADER, buffer=shm.buf)
+        ok = fresh or (header[0]["magic"] == RING_MAGIC and header[0]["version"] == VERSION)
+        if ok and not fresh and create and int(header[0]["capacity"]) != capacity:
+            ok = False
+        if not ok:
+            del header
+            if not create:
+                shm.close()
+                return None
+            # сегмент другого формата/размера — пересоздаём
+            shm.close()
+            shm.unlink()
+            shm, fresh = _segment(name, RING_HEADER.itemsize + capacity, True)
+        else:
+            del header
+        if fresh:
+            cls._init_header(shm.buf, capacity, epoch=1)
+        return cls(shm.buf, shm)
+
+    @staticmethod
+    def _init_header(buf: Any, capacity: int, epoch: int) -> None:
+        h = np.ndarray((1,), dtype=RING_HEADER, buffer=buf)
+        h[0] = 0
+        h[0]["magic"] = RING_MAGIC
+        h[0]["version"] = VERSION
+        h[0]["capacity"] = capacity
+        h[0]["epoch"] = epoch
+        # позиции кольца — id событий (SSE); stream_id отличает новое кольцо от старого
+        h[0]["stream_id"] = int.from_bytes(os.urandom(4), "little")
+
+    @property
+    def head(self) -> int:
+        return int(self._header["head"][0])
+
+    @property
+    def epoch(self) -> int:
+        return int(self._header["epoch"][0])
+
+    @property
+    def stream_id(self) -> int:
+        return int(self._header["stream_id"][0])
+
+    def take_over(self) -> int:
+        """Стать писателем; новая эпоха — читатели догонят по снапшоту нового лидера."""
+        h = self._header
+        h["epoch"] = int(h["epoch"][0]) + 1
+        h["writer_pid"] = os.getpid()
+        h["updated_ts"] = time.time()
+        return int(h["epoch"][0])
+
+    # --- писатель (paho-поток лидера) ---
+    def append(self, topic: str, payload: bytes, ts: float) -> bool:
+        t = topic.encode("utf-8")
+        size = _aligned(_REC.size + len(t) + len(payload))
+        if size > self.max_record:
+            self.oversize += 1
+            return False
+        head = self.head
+        off = head % self.capacity
+        if off + size > self.capacity:
+            # не влезает до конца буфера — маркер перехода в начало (до конца >= 8 байт)
+            _SIZE.pack_into(self._data, off, 0)
+            head += self.capacity - off
+            off = 0
+        _REC.pack_into(self._data, off, size, len(payload), len(t), 0, ts)
+        start = off + _REC.size
+        self._data[start:start + len(t)] = t
+        self._data[start + len(t):start + len(t) + len(payload)] = payload
+        # запись видна читателям только после сдвига head
+        self._header["head"] = head + size
+        self._header["updated_ts"] = ts
+        return True
+
+    # --- читатель ---
+    def valid(self, pos: int, head: Optional[int] = None) -> bool:
+        head = self.head if head is None else head
+        return pos <= head and head + 2 * self.max_record <= pos + self.capacity
+
+    def read(self, pos: int, limit: int = 4096) -> Tuple[List[Tuple[str, bytes, float, int]], Optional[int]]:
+        """
+        Записи (топик, payload, время приёма, позиция конца записи) с позиции pos
+        (не больше limit) и новая позиция; None вместо позиции — писатель
+        перезаписал непрочитанное (догонять по снапшоту).
+        """
+        head = self.head
+        if not self.valid(pos, head):
+            return [], None
+        start_pos = pos
+        out: List[Tuple[str, bytes, float, int]] = []
+        while pos < head and len(out) < limit:
+            off = pos % self.capacity
+            if _SIZE.unpack_from(self._data, off)[0] == 0:
+                pos += self.capacity - off
+                continue
+            size, plen, tlen, _, ts = _REC.unpack_from(self._data, off)
+            start = off + _REC.size
+            topic = bytes(self._data[start:start + tlen]).decode("utf-8", errors="replace")
+            payload = bytes(self._data[start + tlen:start + tlen + plen])
+            pos += size
+            out.append((topic, payload, ts, pos))
+        # за время копирования писатель мог дойти до самой старой прочитанной записи
+        if not self.valid(start_pos):
+            return [], None
+        return out, pos
+
+    def close(self) -> None:
+        self._header = None
+        self._data.release()
+        if self._shm is not None:
+            self._shm.close()
+
+
+class StateSnapshot:
+    """Снапшот состояния (JSON) с позицией кольца; писатель — лидер (seqlock)."""
+
+    def __init__(self, buf: Any, shm: Optional[shared_memory.SharedMemory] = None) -> None:
+        self._shm = shm
+        self._header = np.ndarray((1,), dtype=SNAP_HEADER, buffer=buf)
+        cap = int(self._header[0]["capacity"])
+        self._data = memoryview(buf)[SNAP_HEADER.itemsize:SNAP_HEADER.itemsize + cap]
+        self.capacity = cap
+        self.too_large = 0
+
+    @classmethod
+    def open(cls, name: str, capacity: int, create: bool) -> Optional["StateSnapshot"]:
+        try:
+            shm, fresh = _segment(name, SNAP_HEADER.itemsize + capacity, create)
+        except FileNotFoundError:
+            return None
+        header = np.ndarray((1,), dtype=SNAP_HEADER, buffer=shm.buf)
+        ok = fresh or (header[0]["magic"] == SNAP_MAGIC and header[0]["version"] == VERSION
+                       and (not create or int(header[0]["capacity"]) == capacity))
+        del header
+        if not ok:
+            shm.close()
+            if not create:
+                return None
+            shm.unlink()
+            shm, fresh = _segment(name, SNAP_HEADER.itemsize + capacity, True)
+        if fresh:
+            h = np.ndarray((1,), dtype=SNAP_HEADER, buffer=shm.buf)
+            h[0] = 0
+            h[0]["magic"] = SNAP_MAGIC
+            h[0]["version"] = VERSION
+            h[0]["capacity"] = capacity
+            del h
+        return cls(shm.buf, shm)
+
+    def write(self, body: bytes, epoch: int, ring_pos: int) -> bool:
+        if len(body) > self.capacity:
+            self.too_large += 1
+            return False
+        h = self._header
+        h["seq"] += 1
+        self._data[:len(body)] = body
+        h["length"] = len(body)
+        h["epoch"] = epoch
+        h["ring_pos"] = ring_pos
+        h["updated_ts"] = time.time()
+        h["seq"] += 1
+        return True
+
+    def read(self, timeout: float = 0.5) -> Optional[Tuple[int, int, bytes]]:
+        """(эпоха, позиция кольца, тело) или None — снапшота ещё нет."""
+        h = self._header
+        deadline = time.monotonic() + timeout
+        while True:
+            s1 = int(h["seq"][0])
+            if not s1 & 1:
+                if s1 == 0:
+                    return None
+                n = int(h["length"][0])
+                out = (int(h["epoch"][0]), int(h["ring_pos"][0]), bytes(self._data[:n]))
+                if int(h["seq"][0]) == s1:
+                    return out
+            if time.monotonic() > deadline:
+                return None
+            time.sleep(0)
+
+    def close(self) -> None:
+        self._header = None
+        self._data.release()
+        if self._shm is not None:
+            self._shm.close()
+
+
+class LeaderLock:
+    """Неблокирующий flock: держит его ровно один воркер; снимается ядром при выходе процесса."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        try:
+            import fcntl
+        except ImportError:
+            # нет flock (Windows) — несколько воркеров не поддерживаются, каждый сам себе лидер
+            self._fd = -1
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None and self._fd >= 0:
+            os.close(self._fd)
+        self._fd = None
+
+
+class SharedState:
+    """
+    Поток MQTT -> кольцо -> UiState одного воркера.
+
+    workers == 1 — кольцо в памяти процесса, воркер всегда лидер.
+    Иначе роль определяется LeaderLock; последователи раз в секунду пробуют
+    взять блокировку и при успехе подписываются на MQTT сами.
+
+    Event.seq — позиция конца записи в кольце: общая для всех воркеров и
+    монотонная (id событий SSE). on_gap(pos) — состояние воркера перескочило
+    на позицию pos без применения промежуточных записей (снапшот, отставание).
+    """
+
+    def __init__(self, state: UiState, bus: Any, topics: Iterable[Tuple[str, int]],
+                 on_event: Callable[[Event], None], *, name: str = "drone_ui", workers: int = 1,
+                 ring_bytes: int = 16 << 20, snapshot_bytes: int = 8 << 20,
+                 snapshot_sec: float = 1.0, poll_s: float = 0.01,
+                 on_gap: Optional[Callable[[int], None]] = None) -> None:
+        self.state = state
+        self.bus = bus
+        self.topics = list(topics)
+        # в кольцо — только свои топики: через тот же клиент идут, например, ответы telem_query
+        roots = {t.split("/", 1)[0] for t, _ in self.topics}
+        self._roots = None if roots & {"+", "#"} else roots
+        self.on_event = on_event
+        self.on_gap = on_gap
+        self.name = name
+        self.workers = workers
+        self.ring_bytes = ring_bytes
+        self.snapshot_bytes = snapshot_bytes
+        self.snapshot_sec = snapshot_sec
+        self.poll_s = poll_s
+        self.lock = LeaderLock(os.path.join(tempfile.gettempdir(), f"{name}.lock"))
+        self.ring: Optional[EventRing] = None
+        self.snap: Optional[StateSnapshot] = None
+        self.pos: Optional[int] = None
+        self.epoch = 0
+        self.leader = False
+        self.resyncs = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._snap_applied = -1
+        self._snap_at = 0.0
+
+    @property
+    def stream(self) -> str:
+        """Идентификатор пространства позиций (новое кольцо — новый stream)."""
+        return f"{self.ring.stream_id:08x}" if self.ring is not None else ""
+
+    def _gap(self, pos: int) -> None:
+        self.pos = pos
+        if self.on_gap is not None:
+            self.on_gap(pos)
+
+    # --- роль ---
+    def _lead(self) -> None:
+        """Стать лидером: кольцо на запись, подписки MQTT."""
+        self.leader = True
+        if self.workers <= 1:
+            self.ring = EventRing.local(self.ring_bytes)
+            self._gap(0)
+        else:
+            promoted = self.ring is not None
+            if not promoted:
+                self.ring = EventRing.open(f"{self.name}.ring", self.ring_bytes, create=True)
+                self.snap = StateSnapshot.open(f"{self.name}.snap", self.snapshot_bytes, create=True)
+            self.epoch = self.ring.take_over()
+            if self.pos is None or not self.ring.valid(self.pos):
+                # свежий лидер начинает с пустого состояния (и retained-сообщений брокера)
+                self._gap(self.ring.head)
+            self._write_snapshot(force=True)
+            log.info(f"UI-воркер {os.getpid()} — лидер (epoch={self.epoch}, promoted={promoted})")
+        self.bus.add_tap(self._tap)
+        for topic, qos in self.topics:
+            self.bus.subscribe(topic, _ignore, qos=qos)
+
+    def _follow(self) -> bool:
+        """Подключиться к сегментам лидера; False — их ещё нет."""
+        if self.ring is None:
+            self.ring = EventRing.open(f"{self.name}.ring", self.ring_bytes, create=False)
+        if self.snap is None:
+            self.snap = StateSnapshot.open(f"{self.name}.snap", self.snapshot_bytes, create=False)
+        return self.ring is not None and self.snap is not None
+
+    def _tap(self, topic: str, payload: bytes, qos: int, retain: bool, ts: float) -> None:
+        """paho-поток лидера: сообщение в кольцо."""
+        if self._roots is not None and topic.split("/", 1)[0] not in self._roots:
+            return
+        self.ring.append(topic, payload, ts)
+        wake = self._wake
+        if wake is not None and not wake.is_set():
+            self._loop.call_soon_threadsafe(wake.set)
+
+    # --- догонка ---
+    def _resync(self) -> bool:
+        snap = self.snap.read() if self.snap is not None else None
+        if snap is None:
+            return False
+        epoch, ring_pos, body = snap
+        if epoch != self.ring.epoch or not self.ring.valid(ring_pos):
+            return False
+        self.state.load(json.loads(body))
+        self.epoch = epoch
+        self._gap(ring_pos)
+        self.resyncs += 1
+        REGISTRY.counter("ui.state.resyncs").inc()
+        return True
+
+    def _write_snapshot(self, force: bool = False) -> None:
+        if self.snap is None:
+            return
+        now = time.monotonic()
+        if not force and (now - self._snap_at < self.snapshot_sec or self._snap_applied == self.state.applied):
+            return
+        self._snap_at, self._snap_applied = now, self.state.applied
+        body = json.dumps(self.state.snapshot(), ensure_ascii=False).encode("utf-8")
+        if not self.snap.write(body, self.epoch, self.pos):
+            log.warning(f"снапшот UI {len(body)} B не влезает в {self.snap.capacity} B (UI_SNAPSHOT_MB)")
+
+    # --- цикл ---
+    def _drain(self) -> int:
+        n = 0
+        while True:
+            records, pos = self.ring.read(self.pos)
+            if pos is None:
+                REGISTRY.counter("ui.state.overruns").inc()
+                self.pos = None
+                return n
+            self.pos = pos
+            for topic, payload, ts, end in records:
+                # битое сообщение не должно терять остаток пачки (pos уже за ней)
+                try:
+                    ev = self.state.apply(topic, payload, ts)
+                    if ev is not None:
+                        ev.seq = end
+                        self.on_event(ev)
+                except Exception:
+                    REGISTRY.counter("ui.state.apply_errors").inc()
+                    log.exception(f"ошибка обработки сообщения {topic}")
+            n += len(records)
+            if not records or len(records) < 4096:
+                return n
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        if self.workers <= 1 or self.lock.try_acquire():
+            self._lead()
+        last_try = time.monotonic()
+        last_expire = 0.0
+        while True:
+            if self.leader:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+            else:
+                await asyncio.sleep(self.poll_s)
+                now = time.monotonic()
+                if now - last_try >= 1.0:
+                    last_try = now
+                    if self.lock.try_acquire():
+                        self._lead()
+                        continue
+                if not self._follow():
+                    continue
+                if self.pos is None or self.ring.epoch != self.epoch:
+                    if not self._resync():
+                        continue
+            if self.pos is None:
+                # лидер сам отстал от своего кольца — продолжаем с головы
+                self._gap(self.ring.head)
+            try:
+                self._drain()
+            except Exception as e:
+                log.exception(f"ошибка применения сообщений UI: {e}")
+            now = time.time()
+            if now - last_expire >= 1.0:
+                last_expire = now
+                self.state.expire(now)
+            if self.leader:
+                self._write_snapshot()
+            # отдать loop рассылке между пачками
+            await asyncio.sleep(0)
+
+    def stats(self) -> dict:
+        ring = self.ring
+        return {
+            "pid": os.getpid(),
+            "leader": self.leader,
+            "workers": self.workers,
+            "epoch": self.epoch,
+            "lag_bytes": (ring.head - self.pos) if ring is not None and self.pos is not None else None,
+            "resyncs": self.resyncs,
+            "oversize": ring.oversize if ring is not None else 0,
+        }
+
+    def close(self) -> None:
+        self.lock.release()
+        for seg in (self.ring, self.snap):
+            if seg is not None:
+                seg.close()
+        self.ring = self.snap = None
+
+
+def _ignore(message: Any) -> None:
+    """Обработчик-заглушка: сообщения UI читает из кольца (tap), не через bus."""
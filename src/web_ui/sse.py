@@ -0,0 +1,169 @@
+"""
+sse.py — Server-Sent Events для дашборда (/api/events), рядом с /ws.
+
+EventLog — ограниченный журнал событий в памяти воркера. id события —
+"<stream>-<seq>", где seq — позиция сообщения в общем потоке shared_state:
+монотонна и одинакова у всех воркеров, поэтому клиент может переподключиться
+к любому воркеру. В журнал попадают события бортов (drone_active) и миссий;
+поток поз (telemetry_update) не журналируется — позиции бортов приходят
+событием poses раз в pose_sec (без id: это текущее состояние, не история).
+
+Переподключение: браузер сам шлёт Last-Event-ID (или ?last_event_id=).
+Если журнал ещё держит все события после этого id — клиенту досылаются
+только они; иначе (чужой stream, вытеснено, воркер догонял по снапшоту)
+приходит событие snapshot с полным состоянием и id текущей позиции.
+
+Клиенты не держат своих очередей: у каждого только курсор в журнале, на
+новое событие просыпаются все ожидающие. Медленный клиент, отставший больше
+чем на журнал, получает snapshot вместо накопленной истории.
+"""
+from __future__ import annotations
+import asyncio
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, List, Optional, Tuple
+
+from drone_core.utils.metrics import REGISTRY
+
+# (seq, событие, JSON данных)
+Entry = Tuple[int, str, str]
+
+
+class EventLog:
+    """Журнал событий с монотонными seq; floor — seq, до которого (включительно) истории нет."""
+
+    def __init__(self, maxlen: int = 10_000) -> None:
+        self.maxlen = maxlen
+        self._items: Deque[Entry] = deque()
+        self.floor = 0
+        self.last = 0
+        self.appended = 0
+        self._changed: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def reset(self, pos: int) -> None:
+        """История до pos недоступна (воркер перескочил на pos, см. SharedState.on_gap)."""
+        self._items.clear()
+        self.floor = self.last = pos
+        self._notify()
+
+    def append(self, seq: int, event: str, data: str) -> None:
+        if len(self._items) >= self.maxlen:
+            self.floor = self._items.popleft()[0]
+        self._items.append((seq, event, data))
+        self.last = seq
+        self.appended += 1
+        self._notify()
+
+    def advance(self, pos: int) -> None:
+        """Поток дошёл до pos без журналируемых событий — курсор snapshot'а не отстаёт."""
+        if pos > self.last:
+            self.last = pos
+
+    def since(self, seq: int) -> Optional[List[Entry]]:
+        """События после seq; None — часть их уже недоступна (нужен snapshot)."""
+        if seq < self.floor or seq > self.last:
+            return None
+        out: List[Entry] = []
+        for e in reversed(self._items):
+            if e[0] <= seq:
+                break
+            out.append(e)
+        out.reverse()
+        return out
+
+    def _notify(self) -> None:
+        ev = self._changed
+        if ev is not None:
+            self._changed = None
+            ev.set()
+
+    async def wait(self, timeout: float) -> None:
+        """До следующего append/reset или timeout."""
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+def format_event(event: str, data: str, eid: Optional[str] = None) -> str:
+    """Кадр text/event-stream (data — одна строка JSON)."""
+    head = f"id: {eid}\n" if eid is not None else ""
+    return f"{head}event: {event}\ndata: {data}\n\n"
+
+
+def parse_event_id(value: Optional[str], stream: str) -> Optional[int]:
+    """seq из Last-Event-ID; None — нет, битый или другой stream."""
+    if not value:
+        return None
+    s, _, seq = value.strip().rpartition("-")
+    if s != stream:
+        return None
+    try:
+        return int(seq)
+    except ValueError:
+        return None
+
+
+async def event_stream(
+    log: EventLog,
+    stream: Callable[[], str],
+    snapshot: Callable[[], Tuple[int, str]],
+    poses: Callable[[], Tuple[Any, str]],
+    last_event_id: Optional[str],
+    is_disconnected: Callable[[], Any],
+    heartbeat_sec: float = 15.0,
+    pose_sec: float = 1.0,
+    retry_ms: int = 2000,
+) -> AsyncIterator[str]:
+    """
+    Генератор кадров одного SSE-клиента. snapshot() -> (seq, JSON состояния)
+    (seq — последнее учтённое в состоянии событие журнала); poses() ->
+    (версия, JSON позиций бортов) — отправляется, когда версия сменилась.
+    """
+    loop = asyncio.get_running_loop()
+    yield f"retry: {retry_ms}\n\n"
+    cursor = parse_event_id(last_event_id, stream())
+    missed = log.since(cursor) if cursor is not None else None
+    upto = log.last
+    REGISTRY.counter("sse.resumed" if missed is not None else "sse.connects").inc()
+    pose_version: Any = None
+    last_sent = last_pose = loop.time()
+    while True:
+        out: List[str] = []
+        if missed is None:
+            REGISTRY.counter("sse.snapshots").inc()
+            cursor, body = snapshot()
+            out.append(format_event("snapshot", body, f"{stream()}-{cursor}"))
+        elif missed:
+            s = stream()
+            out.extend(format_event(ev, data, f"{s}-{seq}") for seq, ev, data in missed)
+            cursor = upto
+        else:
+            cursor = upto
+        now = loop.time()
+        if now - last_pose >= pose_sec:
+            last_pose = now
+            version, body = poses()
+            if version != pose_version:
+                pose_version = version
+                out.append(format_event("poses", body))
+        if not out and now - last_sent >= heartbeat_sec:
+            out.append(": ping\n\n")
+        if out:
+            last_sent = now
+            yield "".join(out)
+        if await is_disconnected():
+            return
+        if log.last == cursor:
+            await log.wait(max(0.0, pose_sec - (loop.time() - last_pose)) or pose_sec)
+        missed = log.since(cursor)
+        upto = log.last
+
+
+def dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
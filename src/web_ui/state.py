@@ -0,0 +1,235 @@
+"""
+state.py — состояние дашборда, собираемое из MQTT-сообщений.
+
+UiState.apply() разбирает одно сообщение (топик, сырой payload, время приёма)
+и обновляет борта, миссии, треки и метрики сервисов. Все воркеры UI
+применяют один и тот же упорядоченный поток сообщений (см. shared_state),
+поэтому время берётся из сообщения, а не из часов процесса: вид у воркеров
+совпадает.
+
+snapshot()/load() — полное состояние без самих треков (только окна миссий) —
+для догоняющих воркеров.
+Не потокобезопасен — только event loop.
+"""
+from __future__ import annotations
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from drone_core.utils.metrics import observe_lag, payload_ts
+from web_ui.mission_view import MissionView, TtlWheel
+from web_ui.subscriptions import Route
+from web_ui.tracks import TrackHistory
+
+log = logging.getLogger("ui-state")
+
+# COMPLETED-миссия видна в UI ещё столько секунд
+COMPLETED_TTL_SEC = 30.0
+
+
+@dataclass
+class Event:
+    """Разобранное сообщение — для потока raw-клиентам /ws."""
+    msg: Dict[str, Any]
+    chan: str
+    drone_id: Optional[str]
+    mission_id: Optional[str]
+    ts: float
+    src_ts: Optional[float]
+    # позиция в общем потоке сообщений (shared_state) — id события
+    seq: int = 0
+
+
+def _parse(raw: Any) -> Any:
+    """Универсальный парсер payload."""
+    try:
+        if isinstance(raw, (bytes, bytearray, memoryview)):
+            text = bytes(raw).decode("utf-8", errors="ignore").strip()
+            return json.loads(text) if text.startswith("{") else {"raw": text}
+        if isinstance(raw, (dict, list)):
+            return raw
+        if isinstance(raw, str):
+            text = raw.strip()
+            return json.loads(text) if text.startswith("{") else {"raw": text}
+    except Exception as e:
+        log.warning(f"ошибка парсинга MQTT payload: {e}")
+    return {}
+
+
+class UiState:
+    """Борта, миссии, треки и метрики сервисов одного воркера UI."""
+
+    def __init__(self, track_bytes_per_vehicle: int = 512 * 1024, archive_dir: str = "") -> None:
+        self.drones: Dict[str, Dict[str, Any]] = {}
+        self.missions: Dict[str, Dict[str, Any]] = {}  # {mission_id: {...}}
+        # порядок выдачи и индексы status / vehicle_id для /api/active_missions
+        self.mission_view = MissionView(self.missions)
+        # сырые позы + упрощённые многоуровневые треки бортов и миссий (кормятся telem/+/pose)
+        self.tracks = TrackHistory(track_bytes_per_vehicle, archive_dir)
+        self.trajectories = self.tracks.index
+        # последние снапшоты metrics/<service> других процессов
+        self.service_metrics: Dict[str, Dict[str, Any]] = {}
+        # сроки снятия COMPLETED-миссий с показа
+        self._expire = TtlWheel()
+        self.applied = 0
+
+    # --- применение сообщений ---
+    def apply(self, topic: str, raw: Any, ts: float) -> Optional[Event]:
+        """Применить сообщение; Event — если его нужно переслать raw-клиентам."""
+        self.applied += 1
+        data = _parse(raw)
+        if topic.startswith("metrics/"):
+            if isinstance(data, dict):
+                self.service_metrics[topic.split("/", 1)[1]] = data
+            return None
+
+        msg: Dict[str, Any] = {"topic": topic, "payload": data}
+        # канал для гистограмм лага: fleet / pose / battery / ... / mission
+        if topic == "fleet/active":
+            chan = "fleet"
+        elif topic.startswith("telem/"):
+            chan = topic.rsplit("/", 1)[-1]
+        else:
+            chan = "mission"
+        observe_lag(f"hop.bus_to_ui.{chan}", ts)
+        drone_id = mid = None
+        d = data if isinstance(data, dict) else None
+
+        if topic == "fleet/active":
+            msg["type"] = "drone_active"
+            d = d or {}
+            drone_id = d.get("id", f"drone_{len(self.drones)}")
+            self.drones[drone_id] = {
+                "id": drone_id,
+                "name": d.get("name", drone_id),
+                "lat": d.get("lat"),
+                "lon": d.get("lon"),
+                "alt": d.get("alt", 0),
+                "status": d.get("status", "IDLE"),
+            }
+
+        elif topic.startswith("telem/"):
+            msg["type"] = "telemetry_update"
+            # ID дрона из топика (например telem/veh_0/pose)
+            parts = topic.split("/")
+            drone_id = parts[1] if len(parts) > 1 else "unknown"
+            if d is not None:
+                cur = self.drones.get(drone_id)
+                if cur is None:
+                    self.drones[drone_id] = {
+                        "id": drone_id,
+                        "name": drone_id,
+                        "lat": d.get("lat"),
+                        "lon": d.get("lon"),
+                        "alt": d.get("alt", 0),
+                        "status": "ACTIVE",
+                    }
+                else:
+                    cur["lat"] = d.get("lat", cur.get("lat"))
+                    cur["lon"] = d.get("lon", cur.get("lon"))
+                    cur["alt"] = d.get("alt", cur.get("alt"))
+                if len(parts) == 3 and parts[2] == "pose":
+                    try:
+                        self.tracks.push(
+                            drone_id,
+                            float(d.get("ts") or ts),
+                            float(d["lat"]),
+                            float(d["lon"]),
+                            float(d.get("alt") or 0.0),
+                        )
+                    except (KeyError, TypeError, ValueError):
+                        pass
+
+        elif topic.startswith("mission/"):
+            parts = topic.split("/")
+            mid = parts[1] if len(parts) > 1 else None
+            kind = parts[-1]
+            msg["type"] = f"mission_{kind}"
+            if mid and d is not None:
+                if kind == "planned":
+                    self._update_mission(mid, ts, status="PLANNED", waypoints=d.get("waypoints", []))
+                elif kind == "assigned":
+                    self._update_mission(mid, ts, status="ASSIGNED", vehicle_id=d.get("vehicle_id"))
+                    if d.get("vehicle_id"):
+                        self.tracks.bind_mission(str(d["vehicle_id"]), mid, ts)
+                elif kind == "status":
+                    status = d.get("status")
+                    self._update_mission(mid, ts, status=status, vehicle_id=d.get("vehicle_id"))
+                    if status in ("COMPLETED", "ABORTED"):
+                        self.tracks.unbind_mission(mid, ts)
+                elif kind == "progress":
+                    self._update_mission(
+                        mid, ts,
+                        progress_current=d.get("current", 0),
+                        progress_total=d.get("total", 0),
+                        vehicle_id=d.get("vehicle_id"),
+                        status="IN_PROGRESS" if int(d.get("current", 0)) > 0 else None,
+                    )
+
+        return Event(msg, chan, drone_id, mid, ts, payload_ts(data))
+
+    def _update_mission(self, mid: str, ts: float, **fields: Any) -> None:
+        m = self.missions.setdefault(mid, {
+            "mission_id": mid,
+            "vehicle_id": None,
+            "status": "PLANNED",
+            "progress_current": 0,
+            "progress_total": 0,
+            "waypoints": [],
+        })
+        m.update({k: v for k, v in fields.items() if v is not None})
+        m["updated"] = ts
+        self.mission_view.touch(mid)
+        # завершённую миссию UI показывает «COMPLETED» ещё COMPLETED_TTL_SEC
+        if m["status"] == "COMPLETED":
+            self._expire.schedule(mid, ts + COMPLETED_TTL_SEC)
+        else:
+            self._expire.cancel(mid)
+
+    def expire(self, now: float) -> int:
+        """Убрать COMPLETED-миссии с истёкшим сроком показа."""
+        due = self._expire.advance(now)
+        for mid in due:
+            self.missions.pop(mid, None)
+            self.mission_view.remove(mid)
+        return len(due)
+
+    def route(self, ev: Event) -> Route:
+        """Борт, миссия и позиция сообщения — для фильтров подписок клиентов."""
+        data = ev.msg["payload"] if isinstance(ev.msg["payload"], dict) else {}
+        drone_id, mid = ev.drone_id, ev.mission_id
+        if drone_id is None and mid is not None:
+            m = self.missions.get(mid) or {}
+            drone_id = data.get("vehicle_id") or m.get("vehicle_id")
+        d = self.drones.get(drone_id) if drone_id else None
+        lat, lon = (d.get("lat"), d.get("lon")) if d else (None, None)
+        if lat is None and data.get("waypoints"):
+            wp = data["waypoints"][0]
+            # mission/+/planned — Mission.model_dump(): точка маршрута {"pos": {lat, lon, alt}}
+            pos = (wp.get("pos") if isinstance(wp.get("pos"), dict) else wp) if isinstance(wp, dict) else {}
+            lat, lon = pos.get("lat"), pos.get("lon")
+        try:
+            lat = float(lat) if lat is not None else None
+            lon = float(lon) if lon is not None else None
+        except (TypeError, ValueError):
+            lat = lon = None
+        return Route(ev.msg.get("type", ""), str(drone_id) if drone_id else None, mid, lat, lon)
+
+    # --- снапшот ---
+    def snapshot(self) -> Dict[str, Any]:
+        return {"drones": self.drones, "missions": self.missions, "metrics": self.service_metrics,
+                "windows": self.tracks.windows()}
+
+    def load(self, snap: Dict[str, Any]) -> None:
+        """Заменить состояние снапшотом; словари те же объекты (на них ссылаются кадры и REST)."""
+        for cur, new in ((self.drones, snap.get("drones")), (self.missions, snap.get("missions")),
+                         (self.service_metrics, snap.get("metrics"))):
+            cur.clear()
+            cur.update(new or {})
+        self.tracks.load_windows(snap.get("windows"))
+        self.mission_view.rebuild()
+        self._expire.clear()
+        for mid, m in self.missions.items():
+            if m.get("status") == "COMPLETED":
+                self._expire.schedule(mid, float(m.get("updated") or 0.0) + COMPLETED_TTL_SEC)
@@ -17,7 +17,7 @@ L.tileLayer("https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png", { maxZoom: 19
 // Держим ссылки
 let baseMarker = null;
 const droneMarkers = {};          // { [droneId]: L.Marker }
-const missionPolylines = {};      // { [droneId]: L.Polyline }
+const missionPolylines = {};      // { [missionId]: L.Polyline }
 
 // --- база ---
 async function loadBase() {
@@ -40,54 +40,108 @@ async function loadBase() {
 document.getElementById("reload-base").addEventListener("click", loadBase);
 loadBase();
 
-// ========== WebSocket ==========
-const socket = new WebSocket(`ws://${window.location.host}/ws`);
-socket.onopen = () => console.log("✅ WebSocket подключен");
-socket.onclose = () => console.log("❌ WebSocket закрыт");
+// ========== WebSocket: кадры состояния ==========
+// Сервер шлёт ~5 раз в секунду кадр с изменившимися полями бортов и миссий
+// (при подключении — keyframe со всем состоянием), см. web_ui/frames.py.
+// Позы бортов приходят отдельным бинарным кадром (format=binary).
+const drones = {};    // { [droneId]: {id, name, lat, lon, alt, status} }
+const missions = {};  // { [missionId]: {mission_id, vehicle_id, status, progress_*, waypoints} }
+let internedIds = []; // номер из бинарного кадра -> id борта
 
-// Живой кеш последней позиции каждого дрона (для таблицы миссий).
-const lastDronePos = {}; // { [vehId]: {lat, lon, alt} }
-
-socket.onmessage = (event) => {
-  const msg = JSON.parse(event.data);
+function connect() {
+  const socket = new WebSocket(`ws://${window.location.host}/ws?format=binary`);
+  socket.binaryType = "arraybuffer";
+  socket.onopen = () => {
+    console.log("✅ WebSocket подключен");
+    internedIds = [];
+  };
+  socket.onclose = () => {
+    console.log("❌ WebSocket закрыт, переподключение...");
+    setTimeout(connect, 2000);
+  };
+  socket.onmessage = (event) => {
+    if (event.data instanceof ArrayBuffer) {
+      applyPoses(event.data);
+      return;
+    }
+    const msg = JSON.parse(event.data);
+    if (msg.type === "frame") applyFrame(msg);
+  };
+}
+connect();
 
-  // ---- телеметрия ----
-  if (msg.type === "telemetry_update" && msg.payload?.lat && msg.payload?.lon) {
-    const id = msg.topic.split("/")[1]; // telem/<id>/...
-    const { lat, lon, alt } = msg.payload;
-    upsertDroneMarker(id, lat, lon);
-    lastDronePos[id] = { lat, lon, alt };
-    scheduleFleetRefreshSoon();
-    scheduleMissionsRefreshSoon();
+// [magic u8][flags u8][u16][seq u32][ts f64][n u32] id u32×n, lat i32×n, lon i32×n (1e-7°), alt f32×n
+const POSE_MAGIC = 0x50;
+function applyPoses(buf) {
+  const dv = new DataView(buf);
+  if (dv.getUint8(0) !== POSE_MAGIC) return;
+  const n = dv.getUint32(16, true);
+  const idOff = 20, latOff = idOff + 4 * n, lonOff = latOff + 4 * n, altOff = lonOff + 4 * n;
+  for (let i = 0; i < n; i++) {
+    const id = internedIds[dv.getUint32(idOff + 4 * i, true)];
+    if (id === undefined) continue;
+    const d = drones[id] || (drones[id] = { id });
+    d.lat = dv.getInt32(latOff + 4 * i, true) / 1e7;
+    d.lon = dv.getInt32(lonOff + 4 * i, true) / 1e7;
+    d.alt = dv.getFloat32(altOff + 4 * i, true);
+    upsertDroneMarker(id, d.lat, d.lon);
   }
-
-  // ---- появление активного дрона ----
-  if (msg.type === "drone_active" && msg.payload) {
-    const d = msg.payload;
-    if (d.lat && d.lon) {
-      upsertDroneMarker(d.id || "drone", d.lat, d.lon);
-      lastDronePos[d.id] = { lat: d.lat, lon: d.lon, alt: d.alt };
-    }
-    scheduleFleetRefreshSoon();
+  if (n) {
+    renderFleet();
+    renderActiveMissions();
   }
+}
 
-  // ---- план миссии (линия маршрута) ----
-  if (msg.type === "mission_planned" && msg.payload?.waypoints) {
-    const id = msg.topic.split("/")[1]; // mission/<id>/planned
-    const coords = msg.payload.waypoints.map((w) => [
-      w.pos?.lat ?? w.lat,
-      w.pos?.lon ?? w.lon,
-    ]);
-    drawMissionPolyline(id, coords);
-    scheduleMissionsRefreshSoon();
+function mergeDelta(store, delta, removed, keyframe) {
+  const changed = new Set();
+  if (keyframe) {
+    Object.keys(store).forEach((id) => {
+      if (!(id in (delta || {}))) { delete store[id]; changed.add(id); }
+    });
   }
+  Object.entries(delta || {}).forEach(([id, fields]) => {
+    store[id] = Object.assign(keyframe ? {} : (store[id] || {}), fields);
+    changed.add(id);
+  });
+  (removed || []).forEach((id) => { delete store[id]; changed.add(id); });
+  return changed;
+}
+
+function applyFrame(f) {
+  Object.entries(f.intern || {}).forEach(([id, idx]) => { internedIds[idx] = id; });
+  const removed = f.removed || {};
+  const changedDrones = mergeDelta(drones, f.drones, removed.drones, f.keyframe);
+  const changedMissions = mergeDelta(missions, f.missions, removed.missions, f.keyframe);
+
+  changedDrones.forEach((id) => {
+    const d = drones[id];
+    if (d && d.lat != null && d.lon != null) {
+      upsertDroneMarker(id, d.lat, d.lon);
+    } else if (!d && droneMarkers[id]) {
+      map.removeLayer(droneMarkers[id]);
+      delete droneMarkers[id];
+    }
+  });
+  changedMissions.forEach((id) => {
+    const m = missions[id];
+    const fields = (f.missions || {})[id] || {};
+    if (m && fields.waypoints && fields.waypoints.length) {
+      drawMissionPolyline(id, fields.waypoints.map((w) => [
+        w.pos?.lat ?? w.lat,
+        w.pos?.lon ?? w.lon,
+      ]));
+    } else if (!m && missionPolylines[id]) {
+      map.removeLayer(missionPolylines[id]);
+      delete missionPolylines[id];
+    }
+  });
 
-  // ---- progress / status / assigned — обновляем таблицу миссий ----
-  if (msg.type === "mission_progress" || msg.type === "mission_status" ||
-      msg.type === "mission_assigned") {
-    scheduleMissionsRefreshSoon();
+  if (changedDrones.size) {
+    renderFleet();
+    renderFreeDrones();
   }
-};
+  if (changedDrones.size || changedMissions.size) renderActiveMissions();
+}
 
 function upsertDroneMarker(id, lat, lon) {
   if (!droneMarkers[id]) {
@@ -97,14 +151,14 @@ function upsertDroneMarker(id, lat, lon) {
   }
 }
 
-function drawMissionPolyline(droneId, coords) {
+function drawMissionPolyline(missionId, coords) {
   // удалим предыдущую линию, если есть, чтобы не плодить
-  if (missionPolylines[droneId]) {
-    map.removeLayer(missionPolylines[droneId]);
+  if (missionPolylines[missionId]) {
+    map.removeLayer(missionPolylines[missionId]);
   }
   const pl = L.polyline(coords, { weight: 3 }); // цвет по умолчанию из темы
-  pl.addTo(map).bindPopup(`📦 Маршрут дрона ${droneId}`);
-  missionPolylines[droneId] = pl;
+  pl.addTo(map).bindPopup(`📦 Маршрут миссии ${missionId}`);
+  missionPolylines[missionId] = pl;
 }
 
 // Мягкое авто-центрирование по всем маркерам раз в 5 c (без дёрганья)
@@ -163,101 +217,76 @@ map.on("click", (e) => {
 function setInput(id, v) { document.getElementById(id).value = (+v).toFixed(6); }
 
 // ========== Fleet ==========
-async function loadFleet() {
-  try {
-    const res = await fetch("/api/fleet"); // если нет — /api/drones с адаптацией ниже
-    let data = await res.json();
-    const list = Array.isArray(data) ? data : (data.fleet || data.drones || []);
-    const tbody = document.querySelector("#fleet-table tbody");
-    tbody.innerHTML = "";
-    list.forEach((d) => {
-      const tr = document.createElement("tr");
-      tr.innerHTML = `
-        <td>${d.name || d.id}</td>
-        <td>${d.status || ""}</td>
-        <td>${fmtCoord(d.lat)}, ${fmtCoord(d.lon)}</td>
-        <td>${d.alt != null ? (+d.alt).toFixed(1) : ""}</td>
-      `;
-      tbody.appendChild(tr);
-    });
-  } catch (e) {
-    console.error("Не удалось загрузить флот:", e);
-  }
+function renderFleet() {
+  const tbody = document.querySelector("#fleet-table tbody");
+  tbody.innerHTML = "";
+  Object.values(drones).forEach((d) => {
+    const tr = document.createElement("tr");
+    tr.innerHTML = `
+      <td>${d.name || d.id}</td>
+      <td>${d.status || ""}</td>
+      <td>${fmtCoord(d.lat)}, ${fmtCoord(d.lon)}</td>
+      <td>${d.alt != null ? (+d.alt).toFixed(1) : ""}</td>
+    `;
+    tbody.appendChild(tr);
+  });
 }
 function fmtCoord(x){ return x!=null ? (+x).toFixed(6) : ""; }
-loadFleet();
-let fleetRefreshTimer = null;
-function scheduleFleetRefreshSoon(){
-  clearTimeout(fleetRefreshTimer);
-  fleetRefreshTimer = setTimeout(loadFleet, 300);
-}
 
-// Свободные дроны в выпадающем списке Orders
-async function loadFreeDrones() {
-  try {
-    const res = await fetch("/api/drones");
-    const data = await res.json();
-    const list = Array.isArray(data) ? data : (data.drones || []);
-    const free = list.filter(d => !["BUSY","IN_MISSION","ERROR"].includes((d.status||"").toUpperCase()));
-    const select = document.getElementById("droneSelect");
-    select.innerHTML = "";
-    free.forEach((d) => {
-      const opt = document.createElement("option");
-      opt.value = d.id;
-      opt.textContent = `${d.name || d.id} (${d.status || "IDLE"})`;
-      select.appendChild(opt);
-    });
-  } catch (e) {
-    console.error("Не удалось загрузить свободных дронов:", e);
-  }
+// Свободные дроны в выпадающем списке Orders (перестраиваем только при изменении состава)
+let freeDronesKey = "";
+function renderFreeDrones() {
+  const free = Object.values(drones).filter(
+    (d) => !["BUSY","IN_MISSION","ERROR"].includes((d.status||"").toUpperCase())
+  );
+  const key = free.map((d) => `${d.id}:${d.status}`).join("|");
+  if (key === freeDronesKey) return;
+  freeDronesKey = key;
+  const select = document.getElementById("droneSelect");
+  const selected = select.value;
+  select.innerHTML = "";
+  free.forEach((d) => {
+    const opt = document.createElement("option");
+    opt.value = d.id;
+    opt.textContent = `${d.name || d.id} (${d.status || "IDLE"})`;
+    select.appendChild(opt);
+  });
+  if (free.some((d) => d.id === selected)) select.value = selected;
 }
-loadFreeDrones();
-// периодически актуализируем
-setInterval(loadFreeDrones, 4000);
 
 // ========== Active Missions (под активными заказами) ==========
-async function loadActiveMissions() {
-  try {
-    const res = await fetch("/api/active_missions");
-    const data = await res.json();
-    const missions = data.missions || [];
-    const tbody = document.querySelector("#missions-table tbody");
-    tbody.innerHTML = "";
-    if (missions.length === 0) {
-      tbody.innerHTML = `<tr><td colspan="5" style="color:#999;text-align:center;">— нет активных миссий —</td></tr>`;
-      return;
-    }
-    missions.forEach((m) => {
-      const total = m.progress_total || 0;
-      const cur = m.progress_current || 0;
-      const pct = total > 0 ? Math.round((cur / total) * 100) : 0;
-      const pos = lastDronePos[m.vehicle_id];
-      const posStr = pos
-        ? `${(+pos.lat).toFixed(5)}, ${(+pos.lon).toFixed(5)} / ${(+pos.alt).toFixed(1)}m`
-        : "—";
-      const statusClass = `m-status-${m.status || "PLANNED"}`;
-      const tr = document.createElement("tr");
-      tr.innerHTML = `
-        <td>${m.mission_id}</td>
-        <td>${m.vehicle_id || "—"}</td>
-        <td class="${statusClass}">${m.status || ""}</td>
-        <td>
-          <span class="progress-bar"><span style="width:${pct}%"></span></span>
-          ${cur}/${total}
-        </td>
-        <td>${posStr}</td>
-      `;
-      tbody.appendChild(tr);
-    });
-  } catch (e) {
-    console.error("Не удалось загрузить активные миссии:", e);
+function renderActiveMissions() {
+  const list = Object.values(missions);
+  // невыполненные сверху, COMPLETED в конце
+  list.sort((a, b) => ((a.status === "COMPLETED") - (b.status === "COMPLETED")) ||
+                      ((b.updated || 0) - (a.updated || 0)));
+  const tbody = document.querySelector("#missions-table tbody");
+  tbody.innerHTML = "";
+  if (list.length === 0) {
+    tbody.innerHTML = `<tr><td colspan="5" style="color:#999;text-align:center;">— нет активных миссий —</td></tr>`;
+    return;
   }
+  list.forEach((m) => {
+    const total = m.progress_total || 0;
+    const cur = m.progress_current || 0;
+    const pct = total > 0 ? Math.round((cur / total) * 100) : 0;
+    const pos = drones[m.vehicle_id];
+    const posStr = pos && pos.lat != null
+      ? `${(+pos.lat).toFixed(5)}, ${(+pos.lon).toFixed(5)} / ${(+(pos.alt || 0)).toFixed(1)}m`
+      : "—";
+    const statusClass = `m-status-${m.status || "PLANNED"}`;
+    const tr = document.createElement("tr");
+    tr.innerHTML = `
+      <td>${m.mission_id}</td>
+      <td>${m.vehicle_id || "—"}</td>
+      <td class="${statusClass}">${m.status || ""}</td>
+      <td>
+        <span class="progress-bar"><span style="width:${pct}%"></span></span>
+        ${cur}/${total}
+      </td>
+      <td>${posStr}</td>
+    `;
+    tbody.appendChild(tr);
+  });
 }
-loadActiveMissions();
-setInterval(loadActiveMissions, 2000);
-
-let missionsRefreshTimer = null;
-function scheduleMissionsRefreshSoon() {
-  clearTimeout(missionsRefreshTimer);
-  missionsRefreshTimer = setTimeout(loadActiveMissions, 200);
-}
+renderActiveMissions();
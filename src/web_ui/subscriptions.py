@@ -0,0 +1,267 @@
+"""
+subscriptions.py — подписки WebSocket-клиентов дашборда и маршрутизация.
+
+Протокол (клиент -> сервер, JSON-текст):
+    {"op": "subscribe",   "vehicles": [...], "missions": [...],
+                          "bbox": [min_lat, min_lon, max_lat, max_lon], "types": [...],
+                          "raw": true}
+    {"op": "unsubscribe", "vehicles": [...], "missions": [...], "bbox": null, "types": [...]}
+    {"op": "reset"}       — снова получать всё (так ведёт себя клиент без подписки)
+
+Все клиенты получают кадры состояния (см. frames): в них попадают борта из
+vehicles, миссии из missions или их борта из vehicles, сущности внутри bbox
+(без ограничений — все). raw: true — дополнительно поток MQTT-сообщений
+как есть; сообщение доходит до такого клиента, если его тип (msg.type:
+drone_active, telemetry_update, mission_status, ...) входит в types (пустой —
+любой) и выполнено одно из: клиент не ограничивал борта/миссии/область; борт
+сообщения в vehicles; миссия в missions; позиция борта внутри bbox.
+
+Индексы raw-клиентов: борт -> клиенты, миссия -> клиенты, сетка ячеек
+CELL_DEG -> клиенты с bbox (широкие bbox — отдельным списком). Маршрут
+считается за O(число подходящих клиентов), а не всех подключённых. Не
+потокобезопасен — только event loop.
+"""
+from __future__ import annotations
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
+
+CELL_DEG = 0.05         # ~5 км по широте
+MAX_CELLS_PER_BBOX = 400
+
+BBox = Tuple[float, float, float, float]
+
+
+@dataclass(frozen=True)
+class Route:
+    """Что известно о сообщении для маршрутизации."""
+    type: str
+    vehicle_id: Optional[str] = None
+    mission_id: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+
+@dataclass
+class ClientFilter:
+    vehicles: Set[str] = field(default_factory=set)
+    missions: Set[str] = field(default_factory=set)
+    bbox: Optional[BBox] = None
+    types: Set[str] = field(default_factory=set)
+    raw: bool = False
+
+    @property
+    def unrestricted(self) -> bool:
+        """Нет ограничений по борту/миссии/области."""
+        return not self.vehicles and not self.missions and self.bbox is None
+
+    def in_bbox(self, lat: Any, lon: Any) -> bool:
+        if self.bbox is None or lat is None or lon is None:
+            return False
+        try:
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            return False
+        b = self.bbox
+        return b[0] <= lat <= b[2] and b[1] <= lon <= b[3]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "vehicles": sorted(self.vehicles),
+            "missions": sorted(self.missions),
+            "bbox": list(self.bbox) if self.bbox else None,
+            "types": sorted(self.types),
+            "raw": self.raw,
+        }
+
+
+def _cell(lat: float, lon: float) -> Tuple[int, int]:
+    return math.floor(lat / CELL_DEG), math.floor(lon / CELL_DEG)
+
+
+def _parse_bbox(v: Any) -> Optional[BBox]:
+    if v is None:
+        return None
+    if isinstance(v, dict):
+        v = [v.get("min_lat"), v.get("min_lon"), v.get("max_lat"), v.get("max_lon")]
+    a, b, c, d = (float(x) for x in v)
+    if a > c or b > d:
+        raise ValueError("bbox: min > max")
+    return a, b, c, d
+
+
+def _ids(v: Any) -> Set[str]:
+    if v is None:
+        return set()
+    if isinstance(v, (str, int)):
+        v = [v]
+    return {str(x) for x in v}
+
+
+class SubscriptionIndex:
+    """Фильтры клиентов (ключ — объект WebSocket) и индексы для маршрутизации."""
+
+    def __init__(self, drone_lookup: Optional[Callable[[str], Optional[Mapping[str, Any]]]] = None) -> None:
+        # позиция борта по id — для фильтра миссий по bbox
+        self._drone_lookup = drone_lookup or (lambda vehicle_id: None)
+        self._filters: Dict[Hashable, ClientFilter] = {}
+        self._all: Set[Hashable] = set()
+        self._by_vehicle: Dict[str, Set[Hashable]] = {}
+        self._by_mission: Dict[str, Set[Hashable]] = {}
+        self._by_cell: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self._wide: Set[Hashable] = set()
+        self._typed = 0  # raw-клиентов с фильтром по типам
+        self._raw: Set[Hashable] = set()
+
+    def __len__(self) -> int:
+        return len(self._filters)
+
+    @property
+    def raw_clients(self) -> int:
+        """Сколько клиентов хотят поток MQTT-сообщений (читается и из paho-потока)."""
+        return len(self._raw)
+
+    def add(self, client: Hashable) -> None:
+        self._filters[client] = ClientFilter()
+
+    def remove(self, client: Hashable) -> None:
+        f = self._filters.pop(client, None)
+        if f is not None:
+            self._unindex(client, f)
+
+    def get(self, client: Hashable) -> Optional[ClientFilter]:
+        return self._filters.get(client)
+
+    # --- индексы ---
+    def _index(self, client: Hashable, f: ClientFilter) -> None:
+        if not f.raw:
+            return
+        self._raw.add(client)
+        if f.types:
+            self._typed += 1
+        if f.unrestricted:
+            self._all.add(client)
+            return
+        for vid in f.vehicles:
+            self._by_vehicle.setdefault(vid, set()).add(client)
+        for mid in f.missions:
+            self._by_mission.setdefault(mid, set()).add(client)
+        if f.bbox is not None:
+            cells = self._cells(f.bbox)
+            if cells is None:
+                self._wide.add(client)
+            else:
+                for c in cells:
+                    self._by_cell.setdefault(c, set()).add(client)
+
+    def _unindex(self, client: Hashable, f: ClientFilter) -> None:
+        if not f.raw:
+            return
+        self._raw.discard(client)
+        if f.types:
+            self._typed -= 1
+        self._all.discard(client)
+        for index, keys in ((self._by_vehicle, f.vehicles), (self._by_mission, f.missions)):
+            for k in keys:
+                s = index.get(k)
+                if s is not None:
+                    s.discard(client)
+                    if not s:
+                        del index[k]
+        if f.bbox is not None:
+            self._wide.discard(client)
+            for c in self._cells(f.bbox) or ():
+                s = self._by_cell.get(c)
+                if s is not None:
+                    s.discard(client)
+                    if not s:
+                        del self._by_cell[c]
+
+    @staticmethod
+    def _cells(bbox: BBox) -> Optional[List[Tuple[int, int]]]:
+        (r0, c0), (r1, c1) = _cell(bbox[0], bbox[1]), _cell(bbox[2], bbox[3])
+        if (r1 - r0 + 1) * (c1 - c0 + 1) > MAX_CELLS_PER_BBOX:
+            return None
+        return [(r, c) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)]
+
+    # --- протокол ---
+    def apply(self, client: Hashable, req: Dict[str, Any]) -> ClientFilter:
+        """Применить команду клиента; ValueError — некорректный запрос."""
+        op = req.get("op", "subscribe")
+        old = self._filters.get(client)
+        if old is None:
+            raise ValueError("unknown client")
+        new = ClientFilter(set(old.vehicles), set(old.missions), old.bbox, set(old.types))
+        if op == "reset":
+            new = ClientFilter()
+        elif op == "subscribe":
+            new.vehicles |= _ids(req.get("vehicles"))
+            new.missions |= _ids(req.get("missions"))
+            new.types |= _ids(req.get("types"))
+            if "bbox" in req:
+                new.bbox = _parse_bbox(req["bbox"])
+            if "raw" in req:
+                new.raw = bool(req["raw"])
+        elif op == "unsubscribe":
+            new.vehicles -= _ids(req.get("vehicles"))
+            new.missions -= _ids(req.get("missions"))
+            new.types -= _ids(req.get("types"))
+            if "bbox" in req:
+                new.bbox = None
+            if "raw" in req:
+                new.raw = False
+        else:
+            raise ValueError(f"unknown op: {op}")
+        self._unindex(client, old)
+        self._filters[client] = new
+        self._index(client, new)
+        return new
+
+    # --- маршрутизация ---
+    def match(self, route: Route) -> Set[Hashable]:
+        """raw-клиенты, которым нужно сообщение."""
+        if not self._raw:
+            return set()
+        out: Set[Hashable] = set(self._all)
+        if route.vehicle_id is not None:
+            out |= self._by_vehicle.get(route.vehicle_id, set())
+        if route.mission_id is not None:
+            out |= self._by_mission.get(route.mission_id, set())
+        if route.lat is not None and route.lon is not None:
+            for group in (self._by_cell.get(_cell(route.lat, route.lon), ()), self._wide):
+                for client in group:
+                    b = self._filters[client].bbox
+                    if b[0] <= route.lat <= b[2] and b[1] <= route.lon <= b[3]:
+                        out.add(client)
+        if self._typed:
+            out = {c for c in out if not self._filters[c].types or route.type in self._filters[c].types}
+        return out
+
+    def filters(self) -> Iterable[Tuple[Hashable, ClientFilter]]:
+        return list(self._filters.items())
+
+    def visible_for(self, client: Hashable) -> Optional[Callable[[str, str, Mapping[str, Any]], bool]]:
+        """Предикат сущностей кадра для клиента (None — видно всё)."""
+        f = self._filters.get(client)
+        if f is None or f.unrestricted:
+            return None
+        drone_pos = self._drone_lookup
+
+        def visible(kind: str, eid: str, ent: Mapping[str, Any]) -> bool:
+            if kind == "drones":
+                return eid in f.vehicles or f.in_bbox(ent.get("lat"), ent.get("lon"))
+            vid = ent.get("vehicle_id")
+            if eid in f.missions or (vid is not None and str(vid) in f.vehicles):
+                return True
+            if f.bbox is not None:
+                d = drone_pos(str(vid)) if vid is not None else None
+                if d is not None:
+                    return f.in_bbox(d.get("lat"), d.get("lon"))
+                wps = ent.get("waypoints") or []
+                wp = wps[0] if wps and isinstance(wps[0], dict) else None
+                if wp is not None:
+                    pos = wp.get("pos") if isinstance(wp.get("pos"), dict) else wp
+                    return f.in_bbox(pos.get("lat"), pos.get("lon"))
+            return False
+
+        return visible
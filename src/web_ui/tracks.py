@@ -0,0 +1,131 @@
+"""
+tracks.py — история треков бортов и миссий для /api/vehicles/{id}/track и
+/api/missions/{id}/track.
+
+Три уровня источников, от точного к дальнему:
+  raw        — сырые позы в TelemetryStore (кольцо на борт, ограничено
+               bytes_per_vehicle); годится, если кольцо покрывает запрошенный
+               интервал целиком;
+  simplified — многоуровневые упрощённые треки TrajectoryIndex (допуск
+               2…250 м, покрывают часы полёта);
+  archive    — Parquet-архив ingest (TELEM_ARCHIVE_DIR), если борта нет в
+               памяти процесса (например, после рестарта UI).
+Ответ всегда укладывается в max_points (trajectory.downsample).
+
+Окно миссии (борт, назначение, завершение) запоминается по событиям
+assigned/status — трек миссии берётся из сырых поз борта за это окно.
+Не потокобезопасен — только event loop (архив читается в отдельном потоке).
+"""
+from __future__ import annotations
+import asyncio
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from drone_core.domain.services.trajectory import TrajectoryIndex, downsample
+from drone_core.infra.telemetry.ring_store import CHANNELS, TelemetryStore
+
+# (точки [ts, lat, lon, alt], допуск в метрах, источник)
+Track = Tuple[np.ndarray, float, str]
+
+
+class TrackHistory:
+    """Сырые позы + упрощённые треки + окна миссий."""
+
+    def __init__(self, bytes_per_vehicle: int = 512 * 1024, archive_dir: str = "",
+                 max_missions: int = 10_000) -> None:
+        self.store = TelemetryStore(bytes_per_vehicle, channels={"pose": CHANNELS["pose"]})
+        self.index = TrajectoryIndex()
+        self.archive_dir = archive_dir
+        self.max_missions = max_missions
+        # mission_id -> [vehicle_id, t_assigned, t_finished | None]
+        self._windows: "OrderedDict[str, List[Any]]" = OrderedDict()
+
+    # --- запись ---
+    def push(self, vehicle_id: str, ts: float, lat: float, lon: float, alt: float) -> None:
+        self.store.ring(vehicle_id, "pose", create=True).append(ts, (lat, lon, alt))
+        self.index.push(vehicle_id, ts, lat, lon, alt)
+
+    def bind_mission(self, vehicle_id: str, mission_id: str, ts: float) -> None:
+        self.index.bind_mission(vehicle_id, mission_id)
+        w = self._windows.get(mission_id)
+        if w is None or w[0] != vehicle_id:
+            self._windows[mission_id] = [vehicle_id, ts, None]
+            while len(self._windows) > self.max_missions:
+                self._windows.popitem(last=False)
+
+    def unbind_mission(self, mission_id: str, ts: float) -> None:
+        self.index.unbind_mission(mission_id)
+        w = self._windows.get(mission_id)
+        if w is not None and w[2] is None:
+            w[2] = ts
+
+    def mission_window(self, mission_id: str) -> Optional[Tuple[str, float, Optional[float]]]:
+        w = self._windows.get(mission_id)
+        return (w[0], w[1], w[2]) if w is not None else None
+
+    def windows(self) -> Dict[str, List[Any]]:
+        return dict(self._windows)
+
+    def load_windows(self, windows: Optional[Dict[str, List[Any]]]) -> None:
+        self._windows = OrderedDict((mid, list(w)) for mid, w in (windows or {}).items())
+
+    # --- запросы ---
+    def _raw(self, vehicle_id: str, t_from: Optional[float], t_to: Optional[float]) -> Optional[np.ndarray]:
+        """Сырые позы за интервал, если кольцо покрывает его целиком."""
+        ring = self.store.ring(vehicle_id, "pose")
+        if ring is None or len(ring) == 0:
+            return None
+        v = ring.view()
+        # кольцо уже перезаписывалось — старше первого сэмпла истории в нём нет
+        if len(ring) >= ring.capacity and (t_from is None or t_from < v[0, 0]):
+            return None
+        lo = 0 if t_from is None else int(np.searchsorted(v[0], t_from, side="left"))
+        hi = v.shape[1] if t_to is None else int(np.searchsorted(v[0], t_to, side="right"))
+        pts = v[:, lo:hi].T
+        return pts[~np.isnan(pts[:, 1]) & ~np.isnan(pts[:, 2])]
+
+    def vehicle(self, vehicle_id: str, max_points: int, t_from: Optional[float] = None,
+                t_to: Optional[float] = None) -> Optional[Track]:
+        pts = self._raw(vehicle_id, t_from, t_to)
+        if pts is not None:
+            out = downsample(pts, max_points)
+            return out, 0.0 if len(out) == len(pts) else float("inf"), "raw"
+        res = self.index.vehicle(vehicle_id, max_points, t_from, t_to)
+        return (res[0], res[1], "simplified") if res is not None else None
+
+    def mission(self, mission_id: str, max_points: int) -> Optional[Track]:
+        w = self.mission_window(mission_id)
+        if w is not None:
+            vid, t0, t1 = w
+            pts = self._raw(vid, t0, t1)
+            if pts is not None and len(pts):
+                out = downsample(pts, max_points)
+                return out, 0.0 if len(out) == len(pts) else float("inf"), "raw"
+        res = self.index.mission(mission_id, max_points)
+        return (res[0], res[1], "simplified") if res is not None else None
+
+    async def archive(self, vehicle_id: str, max_points: int, t_from: Optional[float] = None,
+                      t_to: Optional[float] = None) -> Optional[Track]:
+        """Трек из Parquet-архива (None — архива нет или в нём нет борта)."""
+        if not self.archive_dir or not Path(self.archive_dir).exists():
+            return None
+        pts = await asyncio.to_thread(self._read_archive, vehicle_id, t_from, t_to)
+        if pts is None or not len(pts):
+            return None
+        out = downsample(pts, max_points)
+        return out, 0.0 if len(out) == len(pts) else float("inf"), "archive"
+
+    def _read_archive(self, vehicle_id: str, t_from: Optional[float], t_to: Optional[float]) -> Optional[np.ndarray]:
+        try:
+            from drone_core.infra.telemetry.archive import read_telemetry
+            table = read_telemetry(self.archive_dir, "pose", [vehicle_id], t_from, t_to, ["lat", "lon", "alt"])
+        except ImportError:
+            return None
+        if table is None or table.num_rows == 0:
+            return None
+        pts = np.column_stack([table.column(c).to_numpy(zero_copy_only=False).astype(np.float64)
+                               for c in ("ts", "lat", "lon", "alt")])
+        return pts[~np.isnan(pts[:, 1]) & ~np.isnan(pts[:, 2])]
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# пакеты лежат в src/ (сервисы запускаются из src, см. run.py)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
@@ -0,0 +1,32 @@
+"""Оценка SoC: число банок и SoC из fleet/active."""
+from drone_core.domain.services.battery import BatteryBook, SocEstimator, cells_for_voltage
+from drone_core.workers.telemetry_ingest import vehicle_from_fleet_active
+
+
+def test_cells_from_full_pack():
+    assert cells_for_voltage(25.2) == 6
+    assert cells_for_voltage(16.8) == 4
+    assert cells_for_voltage(4.2) == 1
+
+
+def test_cells_recheck_on_higher_voltage():
+    est = SocEstimator()
+    est.update(0.0, voltage_v=20.0)   # разряженная 6S, по сэмплу — 5S
+    assert est.cells == 5
+    est.update(1.0, voltage_v=24.0)
+    assert est.cells == 6
+    assert est.soc < 100.0
+
+
+def test_configured_cells_win():
+    book = BatteryBook(cells=6)
+    est = book.update("v1", 0.0, {"voltage_v": 20.0})
+    assert est.cells == 6
+    est = book.update("v2", 0.0, {"voltage_v": 20.0, "cells": 12})
+    assert est.cells == 12
+
+
+def test_fleet_active_zero_soc():
+    v = vehicle_from_fleet_active({"id": "v1", "soc": 0.0})
+    assert v.soc == 0.0
+    assert vehicle_from_fleet_active({"id": "v1"}).soc == 100.0
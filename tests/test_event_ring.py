@@ -0,0 +1,54 @@
+"""Кольцо сообщений shared_state: переход через конец буфера и отставание читателя."""
+from web_ui.shared_state import EventRing
+
+
+def test_wrap_around_keeps_order():
+    ring = EventRing.local(4096)
+    pos, got, sent = 0, [], []
+    for i in range(300):
+        # разная длина — маркеры перехода на разных смещениях
+        payload = b"x" * (i % 37)
+        assert ring.append(f"telem/v{i}/pose", payload, float(i))
+        sent.append((f"telem/v{i}/pose", payload, float(i)))
+        if i % 5 == 4:
+            recs, pos = ring.read(pos)
+            assert pos is not None
+            got += [(t, p, ts) for t, p, ts, _ in recs]
+    recs, pos = ring.read(pos)
+    got += [(t, p, ts) for t, p, ts, _ in recs]
+    assert ring.head > 2 * ring.capacity
+    assert got == sent
+    assert pos == ring.head
+
+
+def test_record_end_positions_are_resume_points():
+    ring = EventRing.local(4096)
+    for i in range(10):
+        ring.append("mission/m/status", b"{}", float(i))
+    recs, _ = ring.read(0)
+    # позиция конца записи — id события: чтение с неё продолжает поток
+    mid = recs[4][3]
+    rest, _ = ring.read(mid)
+    assert [r[2] for r in rest] == [5.0, 6.0, 7.0, 8.0, 9.0]
+
+
+def test_overrun_is_detected():
+    ring = EventRing.local(4096)
+    ring.append("a", b"1", 0.0)
+    pos = 0
+    while ring.head < ring.capacity:
+        ring.append("b", b"y" * 100, 1.0)
+    recs, new_pos = ring.read(pos)
+    assert recs == [] and new_pos is None
+    assert not ring.valid(pos)
+    # свежий читатель с head читает дальше
+    head = ring.head
+    ring.append("c", b"z", 2.0)
+    recs, new_pos = ring.read(head)
+    assert [r[0] for r in recs] == ["c"] and new_pos == ring.head
+
+
+def test_oversize_record_rejected():
+    ring = EventRing.local(4096)
+    assert not ring.append("big", b"x" * ring.max_record, 0.0)
+    assert ring.oversize == 1 and ring.head == 0
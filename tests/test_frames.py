@@ -0,0 +1,134 @@
+"""Кадры дашборда: keyframe, дельты по версии клиента, removed."""
+import json
+
+from web_ui.frames import FRAME_BIN_KEY, FRAME_KEY, StateFrames, decode_poses
+
+
+def _setup():
+    drones = {"veh_1": {"lat": 43.0, "lon": -89.0, "status": "IDLE"}}
+    missions = {"m_1": {"status": "CREATED"}}
+    frames = StateFrames({"drones": lambda: drones, "missions": lambda: missions})
+    frames.tick()
+    return frames, drones, missions
+
+
+def _json(msgs):
+    return [json.loads(p) for k, p in msgs if k == FRAME_KEY]
+
+
+def test_keyframe_then_delta():
+    frames, drones, missions = _setup()
+    frames.add("c")
+    f, = _json(frames.frame("c"))
+    assert f["keyframe"] is True
+    assert f["drones"] == {"veh_1": {"lat": 43.0, "lon": -89.0, "status": "IDLE"}}
+    assert f["missions"] == {"m_1": {"status": "CREATED"}}
+    assert frames.frame("c") == []          # версия не менялась
+
+    drones["veh_1"]["lat"] = 43.1
+    missions["m_2"] = {"status": "PLANNED"}
+    assert frames.tick()
+    f, = _json(frames.frame("c"))
+    assert f["keyframe"] is False
+    assert f["drones"] == {"veh_1": {"lat": 43.1}}
+    assert f["missions"] == {"m_2": {"status": "PLANNED"}}
+    assert f["removed"] == {"drones": [], "missions": []}
+
+
+def test_removed_and_dropped_field():
+    frames, drones, missions = _setup()
+    frames.add("c")
+    frames.frame("c")
+    del missions["m_1"]
+    del drones["veh_1"]["status"]
+    frames.tick()
+    f, = _json(frames.frame("c"))
+    assert f["removed"] == {"drones": [], "missions": ["m_1"]}
+    assert f["drones"] == {"veh_1": {"status": None}}
+    # надгробие видели все клиенты — новый получает keyframe без него
+    frames.push(lambda *a: None, lambda c: False, lambda c: None)
+    frames.add("late")
+    f, = _json(frames.frame("late"))
+    assert f["missions"] == {} and f["removed"] == {"drones": [], "missions": []}
+
+
+def test_lagging_client_gets_accumulated_delta():
+    frames, drones, _ = _setup()
+    frames.add("fast")
+    frames.add("slow")
+    frames.frame("fast")
+    frames.frame("slow")
+    drones["veh_1"]["lat"] = 1.0
+    frames.tick()
+    frames.frame("fast")
+    drones["veh_1"]["status"] = "BUSY"
+    frames.tick()
+    f, = _json(frames.frame("slow"))
+    assert f["drones"] == {"veh_1": {"lat": 1.0, "status": "BUSY"}}
+
+
+def test_filtered_client_sees_exit_as_removed():
+    frames, drones, _ = _setup()
+    drones["veh_2"] = {"lat": 10.0, "lon": 10.0}
+    frames.tick()
+    frames.add("c")
+    near = lambda kind, eid, f: kind != "drones" or (f.get("lat") or 0) < 50
+
+    f, = _json(frames.frame("c", near))
+    assert set(f["drones"]) == {"veh_1", "veh_2"}
+    drones["veh_2"]["lat"] = 60.0
+    frames.tick()
+    f, = _json(frames.frame("c", near))
+    assert f["removed"]["drones"] == ["veh_2"] and f["drones"] == {}
+    # вернулся в фильтр — приходит целиком
+    drones["veh_2"]["lat"] = 11.0
+    frames.tick()
+    f, = _json(frames.frame("c", near))
+    assert f["drones"] == {"veh_2": {"lat": 11.0, "lon": 10.0}}
+
+
+def test_binary_poses():
+    frames, drones, _ = _setup()
+    frames.add("b", binary=True)
+    msgs = dict(frames.frame("b"))
+    head = json.loads(msgs[FRAME_KEY])
+    assert head["intern"] == {"veh_1": 0}
+    assert head["drones"] == {"veh_1": {"status": "IDLE"}}
+    poses = decode_poses(msgs[FRAME_BIN_KEY])
+    assert poses["keyframe"] and list(poses["ids"]) == [0]
+    assert abs(poses["lat"][0] - 43.0) < 1e-6
+
+
+def test_filtered_delta_checks_only_changed_entities():
+    drones = {f"veh_{i}": {"lat": 10.0, "lon": 10.0} for i in range(500)}
+    missions = {"m_1": {"status": "STARTED", "vehicle_id": "veh_1"}}
+    frames = StateFrames({"drones": lambda: drones, "missions": lambda: missions})
+    frames.add("c")
+    frames.tick()
+    calls = []
+
+    def in_box(kind, eid, f):
+        calls.append(eid)
+        pos = drones.get(f.get("vehicle_id"), {}) if kind == "missions" else f
+        return (pos.get("lat") or 0) > 40
+
+    assert _json(frames.frame("c", in_box))[0]["drones"] == {}
+    assert len(calls) == 501                 # keyframe — полный проход
+    calls.clear()
+
+    # борт миссии въехал в область: миссия проверяется заново, хотя сама не менялась
+    drones["veh_1"]["lat"] = 43.0
+    frames.tick()
+    f, = _json(frames.frame("c", in_box))
+    assert set(f["drones"]) == {"veh_1"}
+    assert f["missions"] == {"m_1": {"status": "STARTED", "vehicle_id": "veh_1"}}
+    assert sorted(calls) == ["m_1", "veh_1"]
+
+    calls.clear()
+    drones["veh_1"]["lat"] = 10.0
+    frames.tick()
+    f, = _json(frames.frame("c", in_box))
+    assert f["removed"] == {"drones": ["veh_1"], "missions": ["m_1"]}
+    assert sorted(calls) == ["m_1", "veh_1"]
+    frames.push(lambda *a: None, lambda c: False, lambda c: in_box)
+    assert frames._changes == {}
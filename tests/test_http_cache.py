@@ -0,0 +1,19 @@
+"""ETag кэшированных тел: зависит от содержимого, а не от воркера/версии."""
+import pytest
+
+pytest.importorskip("fastapi")
+
+from web_ui.http_cache import CachedBody
+
+
+def test_etag_from_body():
+    data = {"drones": [1, 2]}
+    a = CachedBody("drones", lambda: data)
+    b = CachedBody("drones", lambda: data)   # другой воркер: своя нумерация версий
+    body_a, tag_a = a.get(3)
+    body_b, tag_b = b.get((7, 1))
+    assert body_a == body_b and tag_a == tag_b
+
+    data = {"drones": [1, 2, 3]}
+    assert a.get(4)[1] != tag_a
+    assert a.get(4)[1] == a.get(4)[1] and a.builds == 2
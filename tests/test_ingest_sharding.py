@@ -0,0 +1,63 @@
+"""Шардированный ingest (hash): алерты по борту поднимает только шард-владелец."""
+import time
+
+from drone_core.infra.messaging.bus import Message
+from drone_core.infra.repositories.fleet_mem import FleetMem
+from drone_core.workers.telemetry_ingest import TelemetryIngest, shard_of
+
+
+class _Bus:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload, qos=1, retain=False):
+        self.published.append((topic, payload))
+
+    def subscribe(self, *a, **k):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def _msg(topic, payload, ts):
+    return Message(topic=topic, payload=payload, qos=1, retain=False, ts=ts)
+
+
+def test_only_owner_shard_alerts():
+    shards = [TelemetryIngest(bus=_Bus(), fleet_repo=FleetMem(), shm_name="", shard=i, shards=2)
+              for i in range(2)]
+    vid = "veh_1"
+    owner = shard_of(vid, 2)
+    t0 = time.time() - 1000
+    batch = [
+        _msg("mission/m1/planned", {"mission_id": "m1", "eta_s": 60.0}, t0),
+        _msg("mission/m1/assigned", {"mission_id": "m1", "vehicle_id": vid}, t0),
+        # статус оркестратора — без vehicle_id
+        _msg("mission/m1/status", {"mission_id": "m1", "status": "STARTED", "ts": t0}, t0),
+        _msg(f"telem/{vid}/pose", {"lat": 43.0, "lon": -89.0, "alt": 50.0, "ts": t0 + 1}, t0 + 1),
+    ]
+    for ing in shards:
+        # фильтр топиков шарда (в проде — в MqttBus до разбора JSON)
+        ing._process([m for m in batch if ing.owns_topic(m.topic)])
+
+    alerts = {i: ing.anomaly.sweep(t0 + 500) for i, ing in enumerate(shards)}
+    assert {a.kind for a in alerts[owner]} >= {"ETA_OVERRUN"}
+    assert all(a.vehicle_id == vid for a in alerts[owner])
+    assert alerts[1 - owner] == []
+    assert shards[1 - owner].anomaly.vehicle_of("m1") is None
+
+
+def test_terminal_status_on_non_owner_drops_eta():
+    ing = TelemetryIngest(bus=_Bus(), fleet_repo=FleetMem(), shm_name="", shard=0, shards=2)
+    vid = next(f"veh_{i}" for i in range(100) if shard_of(f"veh_{i}", 2) == 1)
+    ing._process([
+        _msg("mission/m2/planned", {"mission_id": "m2", "eta_s": 60.0}, 1.0),
+        _msg("mission/m2/assigned", {"mission_id": "m2", "vehicle_id": vid}, 1.0),
+        _msg("mission/m2/status", {"mission_id": "m2", "status": "COMPLETED"}, 2.0),
+    ])
+    assert "m2" not in ing.anomaly._mission_eta
+    assert ing.anomaly._vehicles == {}
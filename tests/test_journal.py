@@ -0,0 +1,93 @@
+"""Журнал in-memory репозиториев: group commit и восстановление."""
+import asyncio
+import os
+import threading
+
+from drone_core.infra.repositories.journal import Journal
+
+
+def _records(directory):
+    j = Journal(directory)
+    state, records = j.recover()
+    out = list(records)
+    j.close()
+    return state, out
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    j = Journal(tmp_path)
+    j.recover()
+    for i in range(3):
+        j.append("put", i)
+    j.close()
+    seg = next(tmp_path.glob("journal.*.log"))
+    size = seg.stat().st_size
+    # запись оборвалась посередине: заголовок есть, тела нет целиком
+    with open(seg, "ab") as f:
+        f.write(b"\x40\x00\x00\x00\x00\x00\x00\x00partial")
+
+    state, records = _records(tmp_path)
+    assert state is None
+    assert records == [("put", (0,)), ("put", (1,)), ("put", (2,))]
+    assert seg.stat().st_size == size
+
+    # после обрезки журнал продолжается с целой записи
+    j = Journal(tmp_path)
+    list(j.recover()[1])
+    j.append("put", 3)
+    j.close()
+    assert _records(tmp_path)[1][-1] == ("put", (3,))
+
+
+def test_corrupt_record_stops_replay(tmp_path):
+    j = Journal(tmp_path)
+    j.recover()
+    j.append("put", 0)
+    j.flush()
+    j.append("put", 1)
+    j.close()
+    seg = next(tmp_path.glob("journal.*.log"))
+    data = bytearray(seg.read_bytes())
+    data[-1] ^= 0xFF  # crc второй записи не сойдётся
+    seg.write_bytes(bytes(data))
+    assert _records(tmp_path)[1] == [("put", (0,))]
+
+
+def test_flush_under_loop_is_off_loop_and_ordered(tmp_path):
+    threads = []
+
+    async def main():
+        j = Journal(tmp_path, fsync_interval=0.0, fsync_batch=1)
+        j.recover()
+        drain = j._drain
+
+        def spy():
+            threads.append(threading.get_ident())
+            drain()
+
+        j._drain = spy
+        for i in range(200):
+            j.append("put", i)
+            if i % 50 == 0:
+                await asyncio.sleep(0.01)
+        await j.aclose()
+
+    asyncio.run(main())
+    main_thread = threading.get_ident()
+    # фоновые записи — не в потоке loop; последний синхронный — из close()
+    assert any(t != main_thread for t in threads)
+    assert _records(tmp_path)[1] == [("put", (i,)) for i in range(200)]
+
+
+def test_snapshot_and_tail(tmp_path):
+    j = Journal(tmp_path)
+    j.recover()
+    j.append("put", 1)
+    j.snapshot({"a": 1})
+    j.append("put", 2)
+    j.close()
+    state, records = _records(tmp_path)
+    assert state == {"a": 1}
+    assert records == [("put", (2,))]
+    assert len(list(tmp_path.glob("journal.*.log"))) == 1
+    assert os.path.exists(tmp_path / "snapshot.pkl")
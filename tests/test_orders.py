@@ -0,0 +1,71 @@
+"""Пакетные заказы: ошибки по элементам и форма принятых заказов."""
+import pytest
+
+from web_ui.orders import BadLine, iter_ndjson, parse_array, validate_batch
+
+BASE = {"lat": 43.07, "lon": -89.38}
+
+
+def _ok(**kw):
+    item = {"from": {"lat": 43.0, "lon": -89.0}, "to": {"lat": 43.1, "lon": -89.1}}
+    item.update(kw)
+    return item
+
+
+def test_errors_per_item():
+    items = [
+        _ok(),
+        "not an object",
+        {"from": {"lat": 43.0}, "to": {"lat": 43.1, "lon": -89.1}},
+        _ok(to={"lat": 91.0, "lon": -89.1}),
+        _ok(to={"lat": 43.1, "lon": 181.0}),
+        _ok(to={"lat": 43.1, "lon": -89.1, "alt": "high"}),
+        _ok(weight=0),
+        _ok(weight="abc"),
+        BadLine("invalid JSON: x"),
+        _ok(to={"lat": float("inf"), "lon": -89.1}),
+    ]
+    orders, results = validate_batch(items, BASE, offset=100)
+    assert [r["index"] for r in results] == list(range(100, 110))
+    assert [r.get("error") for r in results] == [
+        None,
+        "order must be an object",
+        "Missing coordinates",
+        "lat out of range",
+        "lon out of range",
+        "bad alt",
+        "bad weight",
+        "bad weight",
+        "invalid JSON: x",
+        "lat out of range",
+    ]
+    assert len(orders) == 1
+    assert results[0]["order_id"] == orders[0]["id"]
+
+
+def test_order_shape_and_defaults():
+    orders, _ = validate_batch([
+        {"pickup_lat": 43.0, "pickup_lon": -89.0, "drop_lat": "43.2", "drop_lon": -89.2, "weight": None},
+        _ok(**{"from": {"lat": 43.0, "lon": -89.0, "alt": None}}),
+    ], BASE)
+    o = orders[0]
+    assert o["base"] == {"lat": 43.07, "lon": -89.38, "alt": 60.0}
+    assert o["addr2"] == {"lat": 43.2, "lon": -89.2, "alt": 60.0}
+    assert o["payload_kg"] == 2.0 and o["priority"] == "normal"
+    assert orders[1]["addr1"]["alt"] == 60.0
+
+
+def test_empty_and_all_bad():
+    assert validate_batch([], BASE) == ([], [])
+    orders, results = validate_batch([1, None], BASE)
+    assert orders == [] and all("error" in r for r in results)
+
+
+def test_parsers():
+    assert parse_array(b"[1, 2]") == [1, 2]
+    with pytest.raises(ValueError):
+        parse_array(b'{"a": 1}')
+    with pytest.raises(ValueError):
+        parse_array(b"[")
+    items = list(iter_ndjson([b'{"a": 1}\n', b"\n", b"{bad\n"]))
+    assert items[0] == {"a": 1} and isinstance(items[1], BadLine) and len(items) == 2
@@ -0,0 +1,96 @@
+"""Кэширующие репозитории: инвалидация не должна теряться из-за загрузки в полёте."""
+import asyncio
+
+from drone_core.domain.models import Vehicle, VehicleStatus
+from drone_core.infra.db.change_feed import ChangeEvent
+from drone_core.infra.repositories.cached import CachedFleetRepo, CachedMissionRepo
+from drone_core.infra.repositories.live_view import LiveView
+
+
+class _Fleet:
+    """Внутренний репозиторий: отдаёт копии, get можно придержать."""
+
+    def __init__(self):
+        self.rows = {"v1": Vehicle(id="v1", status=VehicleStatus.IDLE)}
+        self.gets = 0
+        self.gate = None
+
+    async def get(self, vehicle_id):
+        self.gets += 1
+        row = self.rows.get(vehicle_id)
+        row = row.copy() if row is not None else None
+        if self.gate is not None:
+            await self.gate.wait()
+        return row
+
+    async def list_all(self):
+        return [v.copy() for v in self.rows.values()]
+
+
+class _Missions:
+    async def get(self, mission_id):
+        return None
+
+    async def list_active(self):
+        return []
+
+
+def test_invalidate_during_load_is_not_undone():
+    async def main():
+        inner = _Fleet()
+        repo = CachedFleetRepo(inner)
+        inner.gate = asyncio.Event()
+        task = asyncio.create_task(repo.get("v1"))
+        await asyncio.sleep(0)
+        # строка поменялась, пока загрузка ждала БД
+        inner.rows["v1"] = Vehicle(id="v1", status=VehicleStatus.BUSY)
+        repo.on_change(ChangeEvent(table="vehiclerow", op="UPDATE", id="v1"))
+        inner.gate.set()
+        assert (await task).status == VehicleStatus.IDLE
+        assert (await repo.get("v1")).status == VehicleStatus.BUSY
+        assert inner.gets == 2
+
+    asyncio.run(main())
+
+
+def test_invalidate_all_during_list_load():
+    async def main():
+        inner = _Missions()
+        repo = CachedMissionRepo(inner)
+        calls = []
+
+        async def list_active():
+            calls.append(1)
+            await asyncio.sleep(0)
+            return []
+
+        inner.list_active = list_active
+        task = asyncio.create_task(repo.list_active())
+        await asyncio.sleep(0)
+        repo.on_change(ChangeEvent(table="*", op="RESYNC"))
+        await task
+        await repo.list_active()
+        assert len(calls) == 2
+
+    asyncio.run(main())
+
+
+def test_live_view_invalidates_before_reread():
+    async def main():
+        inner = _Fleet()
+        fleet = CachedFleetRepo(inner)
+        view = LiveView(fleet, CachedMissionRepo(_Missions()), feed=None)
+        view.add_invalidator(fleet.on_change)
+        seen = []
+        view.add_listener(lambda ev: seen.append(view.vehicles["v1"].status))
+        await view._resync()
+        await fleet.get("v1")  # в кэше — строка до изменения
+
+        inner.rows["v1"] = Vehicle(id="v1", status=VehicleStatus.BUSY)
+        await view._apply_batch([ChangeEvent(table="vehiclerow", op="UPDATE", id="v1")])
+        assert view.vehicles["v1"].status == VehicleStatus.BUSY
+        assert (await fleet.get("v1")).status == VehicleStatus.BUSY
+        # обычные слушатели видят уже применённое событие
+        assert seen == [VehicleStatus.BUSY]
+
+    asyncio.run(main())
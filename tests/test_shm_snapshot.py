@@ -0,0 +1,52 @@
+"""Сегмент снапшота флота: второй писатель не затирает живого."""
+import os
+import uuid
+
+import pytest
+
+from drone_core.infra.telemetry.shm_snapshot import FleetShmReader, FleetShmWriter, ShmWriterBusy
+
+DEAD_PID = 2 ** 22 + 1
+
+
+@pytest.fixture
+def name():
+    return f"test_fleet_{uuid.uuid4().hex[:8]}"
+
+
+def _owned_by(writer, pid):
+    writer._header[0]["writer_pid"] = pid
+    writer.put_pose("veh_1", 1.0, 43.0, -89.0, 50.0)
+
+
+def test_live_writer_is_kept(name):
+    first = FleetShmWriter(name, capacity=16)
+    try:
+        _owned_by(first, os.getppid())   # сегмент пишет другой живой процесс
+        with pytest.raises(ShmWriterBusy):
+            FleetShmWriter(name, capacity=16)
+        reader = FleetShmReader(name)
+        assert [v["id"] for v in reader.vehicles()] == ["veh_1"]
+        reader.close()
+    finally:
+        first.close()
+
+
+def test_dead_writer_segment_is_recreated(name):
+    first = FleetShmWriter(name, capacity=16)
+    _owned_by(first, DEAD_PID)
+    first.close(unlink=False)
+    second = FleetShmWriter(name, capacity=32)
+    try:
+        assert second._header[0]["writer_pid"] == os.getpid()
+        assert second.records.shape == (32,)
+    finally:
+        second.close()
+
+
+def test_explicit_take_over(name):
+    first = FleetShmWriter(name, capacity=16)
+    _owned_by(first, os.getppid())
+    first.close(unlink=False)
+    second = FleetShmWriter(name, capacity=16, take_over=True)
+    second.close()
@@ -0,0 +1,44 @@
+"""Журнал SSE: досылка после Last-Event-ID и граница вытесненной истории."""
+from web_ui.sse import EventLog, parse_event_id
+
+
+def _log(n, maxlen=100):
+    log = EventLog(maxlen=maxlen)
+    for seq in range(10, 10 * (n + 1), 10):
+        log.append(seq, "mission", f'{{"seq": {seq}}}')
+    return log
+
+
+def test_since_returns_tail():
+    log = _log(5)
+    assert [e[0] for e in log.since(20)] == [30, 40, 50]
+    assert log.since(50) == []
+    # seq между событиями (advance без журналируемых) — с ближайшего следующего
+    assert [e[0] for e in log.since(35)] == [40, 50]
+
+
+def test_since_floor_after_eviction():
+    log = _log(5, maxlen=3)          # в журнале 30, 40, 50; 10 и 20 вытеснены
+    assert log.floor == 20
+    assert [e[0] for e in log.since(20)] == [30, 40, 50]
+    assert log.since(19) is None
+    assert log.since(10) is None
+
+
+def test_since_ahead_or_reset():
+    log = _log(3)
+    assert log.since(31) is None     # id из будущего — не наш поток
+    log.advance(70)
+    assert log.since(70) == []
+    log.reset(1000)
+    assert log.since(70) is None
+    assert log.since(1000) == []
+    log.append(1010, "mission", "{}")
+    assert [e[0] for e in log.since(1000)] == [1010]
+
+
+def test_parse_event_id():
+    assert parse_event_id("0000abcd-120", "0000abcd") == 120
+    assert parse_event_id("ffff0000-120", "0000abcd") is None
+    assert parse_event_id("0000abcd-x", "0000abcd") is None
+    assert parse_event_id(None, "0000abcd") is None
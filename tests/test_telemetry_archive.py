@@ -0,0 +1,71 @@
+"""Архив телеметрии: запись нескольких каналов и чтение каждого обратно."""
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from drone_core.infra.telemetry.archive import TelemetryArchiver, read_telemetry
+
+
+def test_round_trip_per_channel(tmp_path):
+    arch = TelemetryArchiver(str(tmp_path))
+    t0 = 1_760_000_000.0
+    for i in range(10):
+        arch.add("veh_1", "battery", t0 + i, {"voltage_v": 16.0 - i * 0.1, "current_a": 5.0, "remaining_pct": 90 - i})
+        arch.add("veh_1", "pose", t0 + i, {"lat": 43.0 + i * 1e-4, "lon": -89.0, "alt": 60.0})
+        arch.add("veh_2", "pose", t0 + i, {"lat": 44.0, "lon": -88.0, "alt": 50.0})
+    arch.close_sync()
+
+    pose = read_telemetry(str(tmp_path), "pose", columns=["lat", "lon"])
+    assert pose.num_rows == 20
+    assert pose.column("lat").to_pylist()[:2] == [43.0, 43.0001]
+
+    pose_v1 = read_telemetry(str(tmp_path), "pose", ["veh_1"], t0 + 2, t0 + 5)
+    assert {"ts", "lat", "lon", "alt"} <= set(pose_v1.column_names)
+    assert "voltage_v" not in pose_v1.column_names
+    assert pose_v1.column("ts").to_pylist() == [t0 + 2, t0 + 3, t0 + 4, t0 + 5]
+
+    battery = read_telemetry(str(tmp_path), "battery")
+    assert battery.num_rows == 10
+    assert "lat" not in battery.column_names
+    assert battery.column("remaining_pct").to_pylist()[0] == 90.0
+
+    assert read_telemetry(str(tmp_path), "health") is None
+
+
+def test_one_file_per_channel_hour(tmp_path):
+    arch = TelemetryArchiver(str(tmp_path))
+    t0 = 1_760_000_000.0
+    for v in range(50):
+        arch.add(f"veh_{v}", "pose", t0, {"lat": 43.0, "lon": -89.0, "alt": 60.0})
+    arch.close_sync()
+    files = list(tmp_path.glob("channel=pose/date=*/hour=*/*.parquet"))
+    assert len(files) == 1
+    assert read_telemetry(str(tmp_path), "pose", ["veh_7"]).column("vehicle").to_pylist() == ["veh_7"]
+
+
+def test_inprogress_left_by_crash(tmp_path):
+    import time
+
+    import pyarrow.parquet as pq
+
+    t0 = time.time()  # партиция текущего часа остаётся открытой
+    arch = TelemetryArchiver(str(tmp_path))
+    arch.add("veh_1", "pose", t0, {"lat": 43.0, "lon": -89.0, "alt": 60.0})
+    arch._write(arch._swap())
+    (writer, path), = arch._writers.values()
+    part = path.parent
+    # процесс упал: footer не дописан; второй файл закрыт, но не переименован
+    dead_pid = 2 ** 22 + 1
+    torn = part / f".part-{dead_pid}-1-1.inprogress"
+    path.rename(torn)
+    writer.close()
+    finished = part / f".part-{dead_pid}-1-2.inprogress"
+    with pq.ParquetWriter(str(finished), arch._schemas["pose"]) as w:
+        w.write_table(arch._schemas["pose"].empty_table())
+    torn.write_bytes(torn.read_bytes()[:-20])
+
+    TelemetryArchiver(str(tmp_path))
+    assert not torn.exists()
+    assert not finished.exists()
+    assert (part / f"part-{dead_pid}-1-2.parquet").exists()
+    assert read_telemetry(str(tmp_path), "pose").num_rows == 0